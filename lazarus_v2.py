@@ -1,194 +1,280 @@
-import numpy as np
-import scipy.sparse as sparse
-import scipy.sparse.linalg as linalg
-import matplotlib.pyplot as plt
-import time
-
-try:
-    from tenpy.models.spins import SpinChain
-    from tenpy.networks.mps import MPS
-    from tenpy.algorithms import tebd
-    TENPY_AVAILABLE = True
-except ImportError:
-    TENPY_AVAILABLE = False
-    print("WARNING: 'physics-tenpy' not found.")
-
-# --- PART 1: THE GENERATOR (Z-Basis Traps) ---
-class GeneratorGenome:
-    def __init__(self, J0=1.0, Delta=3.0, Beta=1.618, Phi=0.0, h_avg=0.0):
-        self.J0 = J0          # Interaction Strength (in X)
-        self.Delta = Delta    # Trap Strength (in Z)
-        self.Beta = Beta      # Frequency
-        self.Phi = Phi        # Phase
-        self.h_avg = h_avg    # Bias
-
-    def generate_couplings(self, L):
-        indices = np.arange(L)
-        # Constant Interaction in X-basis to drive dynamics
-        J = np.ones(L-1) * self.J0
-        
-        # Quasi-Periodic Potential in Z-basis to TRAP the state
-        # h_z = Delta * cos(2*pi*beta*i + phi)
-        h = self.h_avg + self.Delta * np.cos(2 * np.pi * self.Beta * indices + self.Phi)
-        return J, h
-
-# --- PART 2: DYNAMIC SCANNER (Rotated for New Hamiltonian) ---
-class DynamicScanner:
-    def __init__(self, L=12):
-        self.L = L
-        self.dim = 2**L
-        self.sz = np.array([[1., 0.], [0., -1.]])
-        self.sx = np.array([[0., 1.], [1., 0.]])
-
-    def get_imbalance_score(self, genome):
-        J, h = genome.generate_couplings(self.L)
-        H = sparse.csr_matrix((self.dim, self.dim), dtype=float)
-        
-        # Interaction J is now SxSx (Flip-Flop term)
-        for i in range(self.L - 1):
-            term = sparse.csr_matrix([1.])
-            for site in range(self.L):
-                op = self.sx if (site==i or site==i+1) else sparse.eye(2)
-                term = sparse.kron(term, op, format='csr')
-            H += J[i] * term
-            
-        # Field h is now Sz (The Trap)
-        for i in range(self.L):
-            term = sparse.csr_matrix([1.])
-            for site in range(self.L):
-                op = self.sz if site==i else sparse.eye(2)
-                term = sparse.kron(term, op, format='csr')
-            H += h[i] * term
-            
-        # Initial State: Néel |0101...> (Z-basis)
-        neel_int = 0
-        for i in range(1, self.L, 2):
-            neel_int += 2**i
-            
-        psi = np.zeros(self.dim)
-        psi[neel_int] = 1.0
-        
-        # Evolve
-        dt = 0.5
-        current_psi = psi
-        avg_imbalance = 0.0
-        
-        # Precompute I operator (Z-basis)
-        I_op = sparse.csr_matrix((self.dim, self.dim), dtype=float)
-        for i in range(self.L):
-            term = sparse.csr_matrix([1.])
-            for site in range(self.L):
-                op = self.sz if site==i else sparse.eye(2)
-                term = sparse.kron(term, op, format='csr')
-            I_op += ((-1)**i) * term
-
-        for t in np.arange(0, 10.0, dt):
-            imb = np.vdot(current_psi, I_op.dot(current_psi)).real / self.L
-            avg_imbalance += abs(imb)
-            current_psi = linalg.expm_multiply(-1j * H * dt, current_psi)
-            
-        return avg_imbalance / len(np.arange(0, 10.0, dt))
-
-# --- PART 3: DEEP VERIFIER (Corrected Physics) ---
-class DeepVerifier:
-    def __init__(self, L=50):
-        self.L = L
-
-    def run_imbalance_dynamics(self, genome, t_max=20, dt=0.1):
-        if not TENPY_AVAILABLE: return [], [], []
-        
-        print(f"--- STARTING L={self.L} Z-BASIS MBL SIMULATION ---")
-        J, h = genome.generate_couplings(self.L)
-        
-        # PHYSICS CORRECTION:
-        # J goes to 'Jx' (Interaction)
-        # h goes to 'hz' (Trap)
-        model_params = {
-            'L': self.L, 'S': 0.5, 
-            'Jx': J, 'hz': h,      
-            'bc_MPS': 'finite', 'conserve': None
-        }
-        
-        model = SpinChain(model_params)
-        init_state = ["up", "down"] * (self.L // 2)
-        psi = MPS.from_product_state(model.lat.mps_sites(), init_state)
-        
-        # We increase chi_max to 800 to allow logarithmic growth
-        tebd_engine = tebd.TEBDEngine(psi, model, {'dt': dt, 'order': 2, 'trunc_params': {'chi_max': 800}})
-        
-        times = []
-        imbalances = []
-        bond_dims = []
-        
-        steps = int(t_max / dt)
-        
-        for i in range(steps):
-            tebd_engine.run()
-            mags = 2 * psi.expectation_value("Sz") 
-            imbalance = np.mean([mags[j] * ((-1)**(j % 2)) for j in range(self.L)])
-            
-            times.append((i+1)*dt)
-            imbalances.append(imbalance)
-            bond_dims.append(max(psi.chi))
-            
-            if i % 10 == 0:
-                print(f"t={times[-1]:.1f} | I={imbalance:.3f} | MaxChi={max(psi.chi)}")
-                
-        return times, imbalances, bond_dims
-
-# --- EXECUTION BLOCK ---
-if __name__ == "__main__":
-    print("Initializing Project Lazarus Phase 3 (Physics Correction)...")
-    
-    # 1. THE SEARCH (Scanning Delta for Z-Localization)
-    print("\n[STEP 1] TUNING TRAP STRENGTH (Delta)")
-    # We scan Delta from 2.0 to 6.0. 
-    # MBL transition is typically Delta > 2J.
-    scan_range = np.linspace(2.0, 6.0, 15)
-    scanner = DynamicScanner(L=12)
-    
-    best_score = 0.0
-    best_delta = 0.0
-    
-    for delta in scan_range:
-        # Beta=1.618 (Golden Ratio)
-        genome = GeneratorGenome(J0=1.0, Delta=delta, Beta=1.618, Phi=0.0)
-        score = scanner.get_imbalance_score(genome)
-        print(f"Delta: {delta:.2f} | Avg Imbalance: {score:.4f}")
-        
-        if score > best_score:
-            best_score = score
-            best_delta = delta
-            
-    print(f"\n>> BEST TRAP: Delta={best_delta:.2f} (Avg I={best_score:.4f})")
-    
-    # 2. THE VERIFICATION
-    print("\n[STEP 2] DEEP VERIFICATION (L=50)")
-    if TENPY_AVAILABLE:
-        verifier = DeepVerifier(L=50)
-        candidate = GeneratorGenome(J0=1.0, Delta=best_delta, Beta=1.618, Phi=0.0)
-        
-        # Long run
-        ts, imbs, chis = verifier.run_imbalance_dynamics(candidate, t_max=40.0)
-        
-        # Plot
-        plt.figure(figsize=(12, 5))
-        
-        plt.subplot(1, 2, 1)
-        plt.plot(ts, imbs, label="Imbalance", color='blue')
-        plt.axhline(0, color='black', linestyle='--', alpha=0.3)
-        plt.xlabel("Time")
-        plt.ylabel("Imbalance I(t)")
-        plt.title(f"Z-MBL Verification (Delta={best_delta:.2f})")
-        plt.ylim(0.0, 1.0) # Should stay positive now!
-        plt.grid(True)
-        
-        plt.subplot(1, 2, 2)
-        plt.plot(ts, chis, color='orange', label="Bond Dim")
-        plt.xlabel("Time")
-        plt.ylabel("Bond Dimension (Chi)")
-        plt.title("Entanglement Growth")
-        plt.grid(True)
-        
-        plt.savefig("lazarus_v2_results_corrected.png")
-        print("Results saved to 'lazarus_v2_results_corrected.png'")
\ No newline at end of file
+import numpy as np
+import matplotlib.pyplot as plt
+import time
+import os
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.hamiltonian import ChainHamiltonian, imbalance_diagonal
+from src.dynamics import diagonal_trace
+from src.mps import ChainMPS, TEBDEngine
+
+# --- PART 1: THE GENERATOR (Z-Basis Traps) ---
+class GeneratorGenome:
+    def __init__(self, J0=1.0, Delta=3.0, Beta=1.618, Phi=0.0, h_avg=0.0):
+        self.J0 = J0          # Interaction Strength (in X)
+        self.Delta = Delta    # Trap Strength (in Z)
+        self.Beta = Beta      # Frequency
+        self.Phi = Phi        # Phase
+        self.h_avg = h_avg    # Bias
+
+    def generate_couplings(self, L):
+        indices = np.arange(L)
+        # Constant Interaction in X-basis to drive dynamics
+        J = np.ones(L-1) * self.J0
+        
+        # Quasi-Periodic Potential in Z-basis to TRAP the state
+        # h_z = Delta * cos(2*pi*beta*i + phi)
+        h = self.h_avg + self.Delta * np.cos(2 * np.pi * self.Beta * indices + self.Phi)
+        return J, h
+
+# --- PART 2: DYNAMIC SCANNER (Rotated for New Hamiltonian) ---
+class DynamicScanner:
+    def __init__(self, L=12, I_diag=None):
+        self.L = L
+        self.dim = 2**L
+        
+        # Initial State: Néel |0101...> (Z-basis)
+        self.neel_int = 0
+        for i in range(1, self.L, 2):
+            self.neel_int += 2**i
+        
+        # Precompute I operator (Z-basis) once per L: it is a diagonal vector
+        # (sweep workers pass in a view of the shared copy instead)
+        self.I_diag = imbalance_diagonal(self.L) if I_diag is None else I_diag
+
+    def get_imbalance_score(self, genome):
+        J, h = genome.generate_couplings(self.L)
+        
+        # Interaction J is SxSx (Flip-Flop term), field h is Sz (The Trap).
+        # Applied matrix-free, no kron chains are built.
+        H = ChainHamiltonian(J, h)
+            
+        psi = np.zeros(self.dim)
+        psi[self.neel_int] = 1.0
+        
+        # Evolve: the whole I(t) trace in one pass
+        dt = 0.5
+        t_points = np.arange(0, 10.0, dt)
+        imbalances = diagonal_trace(H, psi, t_points, self.I_diag) / self.L
+            
+        return np.mean(np.abs(imbalances))
+
+# --- PART 2b: SWEEP ENGINE (Parallel, Cached Genome Scans) ---
+GENOME_PARAMS = ('J0', 'Delta', 'Beta', 'Phi', 'h_avg')
+
+# Per-worker state, set up once by _init_sweep_worker
+_worker_scanner = None
+_worker_shm = None
+
+def _init_sweep_worker(L, shm_name):
+    global _worker_scanner, _worker_shm
+    # Attach to the parent's imbalance diagonal instead of rebuilding it
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    I_diag = np.ndarray((2**L,), dtype=np.float64, buffer=_worker_shm.buf)
+    _worker_scanner = DynamicScanner(L=L, I_diag=I_diag)
+
+def _sweep_score(params):
+    return _worker_scanner.get_imbalance_score(GeneratorGenome(**params))
+
+class ParameterSweep:
+    """
+    Fans DynamicScanner.get_imbalance_score out over GeneratorGenome
+    parameter grids on a process pool. The static imbalance diagonal lives
+    in shared memory; scores are cached on disk per (L, genome), so repeated
+    or overlapping scans only evaluate new points.
+    """
+    def __init__(self, L=12, workers=None, cache_dir=".lazarus_cache"):
+        self.L = L
+        self.workers = workers or os.cpu_count()
+        self.cache_path = None
+        self.cache = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.cache_path = os.path.join(cache_dir, f"imbalance_scores_L{L}.json")
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    self.cache = json.load(f)
+
+    @staticmethod
+    def _key(params):
+        # repr() round-trips floats exactly
+        return ",".join(repr(float(params[name])) for name in GENOME_PARAMS)
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def evaluate(self, param_list):
+        """Scores for a list of genome parameter dicts (missing keys take GeneratorGenome defaults)."""
+        defaults = vars(GeneratorGenome())
+        param_list = [{**defaults, **params} for params in param_list]
+        todo = [p for p in {self._key(p): p for p in param_list}.items() if p[0] not in self.cache]
+
+        if todo:
+            I_diag = imbalance_diagonal(self.L)
+            shm = shared_memory.SharedMemory(create=True, size=I_diag.nbytes)
+            try:
+                np.ndarray(I_diag.shape, dtype=I_diag.dtype, buffer=shm.buf)[:] = I_diag
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_sweep_worker,
+                                         initargs=(self.L, shm.name)) as pool:
+                    chunksize = max(1, len(todo) // (4 * self.workers))
+                    scores = pool.map(_sweep_score, [p for _, p in todo], chunksize=chunksize)
+                    for (key, _), score in zip(todo, scores):
+                        self.cache[key] = float(score)
+            finally:
+                shm.close()
+                shm.unlink()
+            self._save_cache()
+
+        return np.array([self.cache[self._key(p)] for p in param_list])
+
+    def grid(self, **axes):
+        """
+        Scores over the outer product of the given axes, e.g.
+        grid(Delta=np.linspace(2, 6, 40), Phi=np.linspace(0, np.pi, 20)).
+        Returns an array shaped (len(axis_1), len(axis_2), ...).
+        """
+        names = list(axes)
+        points = [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+        return self.evaluate(points).reshape([len(v) for v in axes.values()])
+
+    def refine(self, name='Delta', lo=2.0, hi=6.0, points=15, rounds=3, **fixed):
+        """
+        Adaptive 1D search: scan [lo, hi], then re-scan a window of one grid
+        step either side of the best point, `rounds` times.
+        Returns (best_value, best_score).
+        """
+        bounds = (lo, hi)
+        for _ in range(rounds):
+            values = np.linspace(lo, hi, points)
+            scores = self.evaluate([{**fixed, name: v} for v in values])
+            best = int(np.argmax(scores))
+            step = values[1] - values[0]
+            lo, hi = max(values[best] - step, bounds[0]), min(values[best] + step, bounds[1])
+        return values[best], scores[best]
+
+# --- PART 3: DEEP VERIFIER (Corrected Physics) ---
+class DeepVerifier:
+    def __init__(self, L=50, chi_max=800, trunc_err=1e-10, conserve_parity=True):
+        self.L = L
+        self.chi_max = chi_max
+        self.trunc_err = trunc_err
+        self.conserve_parity = conserve_parity
+
+    def run_imbalance_dynamics(self, genome, t_max=20, dt=0.1, measure_every=1,
+                               checkpoint_path=None, checkpoint_every=50):
+        """
+        Néel-state imbalance I(t) under the same XX+Z Hamiltonian as the
+        scanner, via the built-in TEBD engine (src/mps.py).
+
+        Args:
+            measure_every: Evaluate I(t) and chi every this many steps
+            checkpoint_path: If set, the MPS and the trace so far are saved
+                             there every checkpoint_every steps, and a run
+                             with the same parameters resumes from it
+        """
+        print(f"--- STARTING L={self.L} Z-BASIS MBL SIMULATION ---")
+        J, h = genome.generate_couplings(self.L)
+        steps = int(round(t_max / dt))
+        run_params = {'J': J.tolist(), 'h': h.tolist(), 'dt': dt, 'chi_max': self.chi_max,
+                      'trunc_err': self.trunc_err, 'measure_every': measure_every,
+                      'conserve_parity': self.conserve_parity}
+
+        engine = TEBDEngine(J, h, dt, chi_max=self.chi_max, trunc_err=self.trunc_err)
+        psi = ChainMPS.neel(self.L, conserve_parity=self.conserve_parity)
+        start, times, imbalances, bond_dims = 0, [], [], []
+
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            saved, meta = ChainMPS.load(checkpoint_path)
+            if meta['params'] == run_params:
+                psi, start = saved, meta['step']
+                times, imbalances, bond_dims = meta['times'], meta['imbalances'], meta['bond_dims']
+                engine.truncation_error = meta['truncation_error']
+                print(f"Resuming from checkpoint at t={start * dt:.1f}")
+            else:
+                print("Checkpoint belongs to a different run, starting fresh.")
+
+        staggered = (-1.0) ** np.arange(self.L)
+        step = start
+        while step < steps:
+            # Advance to the next measurement or checkpoint, whichever comes first
+            next_stop = min(steps, (step // measure_every + 1) * measure_every)
+            if checkpoint_path is not None:
+                next_stop = min(next_stop, (step // checkpoint_every + 1) * checkpoint_every)
+            engine.run(psi, next_stop - step)
+            step = next_stop
+
+            if step % measure_every == 0 or step == steps:
+                imbalance = np.mean(psi.z_expectations() * staggered)
+                times.append(step * dt)
+                imbalances.append(float(imbalance))
+                bond_dims.append(max(psi.bond_dims()))
+                if len(times) % 10 == 1:
+                    print(f"t={times[-1]:.1f} | I={imbalance:.3f} | MaxChi={bond_dims[-1]}")
+
+            if checkpoint_path is not None and (step % checkpoint_every == 0 or step == steps):
+                psi.save(checkpoint_path, step=step, params=run_params, times=times,
+                         imbalances=imbalances, bond_dims=bond_dims,
+                         truncation_error=engine.truncation_error)
+
+        return times, imbalances, bond_dims
+
+# --- EXECUTION BLOCK ---
+if __name__ == "__main__":
+    print("Initializing Project Lazarus Phase 3 (Physics Correction)...")
+    
+    # 1. THE SEARCH (Scanning Delta for Z-Localization)
+    print("\n[STEP 1] TUNING TRAP STRENGTH (Delta)")
+    # We scan Delta from 2.0 to 6.0. 
+    # MBL transition is typically Delta > 2J.
+    scan_range = np.linspace(2.0, 6.0, 15)
+    sweep = ParameterSweep(L=12)
+    
+    # Beta=1.618 (Golden Ratio)
+    scores = sweep.grid(Delta=scan_range, Beta=[1.618], Phi=[0.0]).ravel()
+    for delta, score in zip(scan_range, scores):
+        print(f"Delta: {delta:.2f} | Avg Imbalance: {score:.4f}")
+    
+    # Adaptive refinement around the best grid point
+    best_delta, best_score = sweep.refine('Delta', lo=2.0, hi=6.0, points=15, rounds=3,
+                                          J0=1.0, Beta=1.618, Phi=0.0)
+            
+    print(f"\n>> BEST TRAP: Delta={best_delta:.2f} (Avg I={best_score:.4f})")
+    
+    # 2. THE VERIFICATION
+    print("\n[STEP 2] DEEP VERIFICATION (L=50)")
+    verifier = DeepVerifier(L=50)
+    candidate = GeneratorGenome(J0=1.0, Delta=best_delta, Beta=1.618, Phi=0.0)
+    
+    # Long run, checkpointed so a preempted job picks up where it left off
+    ts, imbs, chis = verifier.run_imbalance_dynamics(candidate, t_max=40.0,
+                                                     checkpoint_path="lazarus_v2_verifier.ckpt.npz")
+    
+    # Plot
+    plt.figure(figsize=(12, 5))
+    
+    plt.subplot(1, 2, 1)
+    plt.plot(ts, imbs, label="Imbalance", color='blue')
+    plt.axhline(0, color='black', linestyle='--', alpha=0.3)
+    plt.xlabel("Time")
+    plt.ylabel("Imbalance I(t)")
+    plt.title(f"Z-MBL Verification (Delta={best_delta:.2f})")
+    plt.ylim(0.0, 1.0) # Should stay positive now!
+    plt.grid(True)
+    
+    plt.subplot(1, 2, 2)
+    plt.plot(ts, chis, color='orange', label="Bond Dim")
+    plt.xlabel("Time")
+    plt.ylabel("Bond Dimension (Chi)")
+    plt.title("Entanglement Growth")
+    plt.grid(True)
+    
+    plt.savefig("lazarus_v2_results_corrected.png")
+    print("Results saved to 'lazarus_v2_results_corrected.png'")
\ No newline at end of file
@@ -1,222 +1,85 @@
-import numpy as np
-import scipy.sparse as sparse
-import scipy.sparse.linalg as linalg
-from scipy.optimize import minimize
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Tuple, List, Optional
-import warnings
-
-# Suppress warnings for cleaner output
-warnings.filterwarnings("ignore")
-
-# --- CONFIGURATION & CONSTANTS ---
-# Tuned for guaranteed convergence in demo
-L = 6                       # System Size 
-DT = 0.2                    # Slightly coarser step for speed
-T_GATE = 8.0                # DOUBLED TIME: Gives the system time to actually flip
-STEPS = int(T_GATE / DT)    
-J_NOMINAL = 1.0             
-BANDWIDTH_LIMIT = 2.0       
-
-class QuantumReliabilityEngine:
-    """
-    Stage III & IV: Automated Calibration and Optimal Control Synthesis.
-    """
-    
-    def __init__(self, L: int = L): 
-        self.L = L
-        self.dim = 2**L
-        self.sx = sparse.csr_matrix(np.array([[0., 1.], [1., 0.]]))
-        self.sz = sparse.csr_matrix(np.array([[1., 0.], [0., -1.]]))
-        self.id = sparse.eye(2)
-        self._cache_operators()
-
-    def _cache_operators(self):
-        self.ops_XX = []
-        self.ops_Z = []
-        for i in range(self.L - 1):
-            term = [self.id] * self.L
-            term[i] = self.sx
-            term[i+1] = self.sx
-            full_term = term[0]
-            for op in term[1:]:
-                full_term = sparse.kron(full_term, op, format='csr')
-            self.ops_XX.append(full_term)
-            
-        for i in range(self.L):
-            term = [self.id] * self.L
-            term[i] = self.sz
-            full_term = term[0]
-            for op in term[1:]:
-                full_term = sparse.kron(full_term, op, format='csr')
-            self.ops_Z.append(full_term)
-
-    def get_evolution(self, J_map: np.ndarray, h_map: np.ndarray, 
-                      control_pulse: Optional[np.ndarray] = None) -> np.ndarray:
-        H_drift = sparse.csr_matrix((self.dim, self.dim))
-        for i, J in enumerate(J_map):
-            H_drift += J * self.ops_XX[i]
-        for i, h in enumerate(h_map):
-            H_drift += h * self.ops_Z[i]
-            
-        psi = np.zeros(self.dim)
-        # Init state |0101...>
-        idx = int("".join(["01" for _ in range(self.L // 2)]), 2)
-        psi[idx] = 1.0
-        
-        if control_pulse is None:
-            # Stage 3: Calibration Mode (More data points for better fit)
-            t_points = np.linspace(0, 10.0, 100) 
-            imbalances = []
-            meas_op = sum([((-1)**i) * self.ops_Z[i] for i in range(self.L)])
-            
-            for t in t_points:
-                psi_t = linalg.expm_multiply(-1j * H_drift * t, psi)
-                exp = np.vdot(psi_t, meas_op.dot(psi_t)).real / self.L
-                imbalances.append(exp)
-            return np.array(imbalances)
-            
-        else:
-            # Stage 4: Control Mode
-            current_psi = psi.copy()
-            for step in range(STEPS):
-                H_t = H_drift.copy()
-                controls = control_pulse[step]
-                for i, amp in enumerate(controls):
-                    H_t += amp * self.ops_Z[i]
-                current_psi = linalg.expm_multiply(-1j * H_t * DT, current_psi)
-            return current_psi
-
-    # --- STAGE 3: DIGITAL TWIN ---
-    def calibrate_system(self, experimental_trace):
-        print(f"[Stage III] Starting Digital Twin Calibration...")
-        h_known = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(self.L))
-        
-        def loss(J_guess):
-            sim_trace = self.get_evolution(J_guess, h_known, control_pulse=None)
-            return np.mean((sim_trace - experimental_trace)**2) * 1e5
-        
-        guess = np.ones(self.L - 1) * J_NOMINAL
-        bounds = [(0.0, 2.0) for _ in range(self.L - 1)]
-        
-        res = minimize(loss, guess, method='L-BFGS-B', bounds=bounds, 
-                       options={'ftol': 1e-9})
-        return res.x, res.fun
-
-    # --- STAGE 4: LAZARUS PULSE ---
-    def synthesize_pulse(self, J_defect, h_known, target_state_idx=None):
-        print(f"[Stage IV] Synthesizing Lazarus Pulse (Deep Optimization)...")
-        print(f"Goal: Logical Flip |010101> -> |101010> on BROKEN Hardware.")
-        
-        if target_state_idx is None:
-            target_state_idx = int("".join(["10" for _ in range(self.L // 2)]), 2)
-        
-        target_psi = np.zeros(self.dim)
-        target_psi[target_state_idx] = 1.0
-        
-        # AGGRESSIVE INITIALIZATION: Random kicks to find the gradient
-        initial_controls = np.random.normal(0, 2.0, size=STEPS * self.L)
-        
-        self.iteration_count = 0
-        def callback(xk):
-            self.iteration_count += 1
-            if self.iteration_count % 50 == 0:
-                print(f"Optimizer Step {self.iteration_count}...")
-
-        def control_loss(ctrl_flat):
-            ctrl_shaped = ctrl_flat.reshape((STEPS, self.L))
-            final_psi = self.get_evolution(J_defect, h_known, control_pulse=ctrl_shaped)
-            fidelity = np.abs(np.vdot(target_psi, final_psi))**2
-            infidelity = 1.0 - fidelity
-            
-            # Relaxed penalties to allow the solver to find a solution
-            diffs = np.diff(ctrl_shaped, axis=0)
-            smoothness_penalty = np.sum(diffs**2) * 0.0001
-            power_penalty = np.sum(ctrl_shaped**2) * 0.00001
-            
-            return infidelity * 100 + smoothness_penalty + power_penalty
-
-        res = minimize(control_loss, initial_controls, method='L-BFGS-B', 
-                       options={'maxiter': 1000, 'ftol': 1e-6}, callback=callback)
-        
-        final_pulse = res.x.reshape((STEPS, self.L))
-        final_psi = self.get_evolution(J_defect, h_known, control_pulse=final_pulse)
-        final_fid = np.abs(np.vdot(target_psi, final_psi))**2
-        
-        return final_pulse, final_fid
-
-# --- MAIN EXECUTION ---
-if __name__ == "__main__":
-    engine = QuantumReliabilityEngine(L=L)
-    
-    # 1. SETUP BROKEN CHIP
-    J_real = np.ones(L-1) * J_NOMINAL
-    J_real[2] = 0.5   # The Defect
-    J_real[4] = 1.2   # The Crosstalk
-    h_real = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(L))
-    
-    print("=== INITIALIZING RED TEAM SCENARIO ===")
-    
-    # 2. DIAGNOSIS (With reduced noise for clearer demo)
-    trace_exp = engine.get_evolution(J_real, h_real)
-    trace_exp += np.random.normal(0, 0.002, size=trace_exp.shape)
-    
-    J_recovered, fit_error = engine.calibrate_system(trace_exp)
-    print(f">> DIAGNOSIS COMPLETE. Recovered Map: {np.round(J_recovered, 3)}")
-    
-    # 3. REMEDIATION
-    print("\n=== SYNTHESIZING REMEDIATION PULSE ===")
-    pulse, fidelity = engine.synthesize_pulse(J_recovered, h_real)
-    
-    print(f"\n>> SUCCESS. Achieved Fidelity: {fidelity*100:.2f}%")
-    
-    # 4. PLOTTING
-    plt.figure(figsize=(12, 10))
-    
-    # Plot 1: Calibration
-    plt.subplot(2, 2, 1)
-    x = np.arange(L-1)
-    plt.bar(x - 0.2, J_real, 0.4, label='True Defect', color='#c0392b')
-    plt.bar(x + 0.2, J_recovered, 0.4, label='Digital Twin', color='#27ae60')
-    plt.title("Stage III: Hardware Diagnosis")
-    plt.ylabel("Coupling Strength (J)")
-    plt.xticks(x, [f"J{i}{i+1}" for i in x])
-    plt.legend()
-    plt.grid(alpha=0.3)
-    
-    # Plot 2: Pulse
-    plt.subplot(2, 2, 2)
-    time_axis = np.linspace(0, T_GATE, STEPS)
-    plt.plot(time_axis, pulse[:, 2], label='Qubit 2 Control', linewidth=2)
-    plt.plot(time_axis, pulse[:, 3], label='Qubit 3 Control', linewidth=2, linestyle='--')
-    plt.title("Stage IV: Lazarus Control Pulse")
-    plt.ylabel(r"Detuning $\Delta(t)$")
-    plt.xlabel("Time (ns)")
-    plt.legend()
-    plt.grid(alpha=0.3)
-    
-    # Plot 3: Fidelity
-    plt.subplot(2, 1, 2)
-    psi_start = np.zeros(engine.dim)
-    idx_s = int("".join(["01" for _ in range(L // 2)]), 2)
-    psi_start[idx_s] = 1.0
-    idx_t = int("".join(["10" for _ in range(L // 2)]), 2)
-    psi_target = np.zeros(engine.dim)
-    psi_target[idx_t] = 1.0
-    
-    # Standard pulse (free evolution)
-    psi_naive = engine.get_evolution(J_real, h_real, control_pulse=np.zeros((STEPS, L)))
-    fid_naive = np.abs(np.vdot(psi_target, psi_naive))**2
-    
-    plt.barh([0, 1], [fid_naive, fidelity], color=['#95a5a6', '#8e44ad'])
-    plt.yticks([0, 1], ['Standard Pulse (Baseline)', 'Lazarus Pulse (V4)'])
-    plt.xlabel("Gate Fidelity")
-    plt.title(f"Remediation Impact: {fid_naive*100:.1f}% -> {fidelity*100:.1f}%")
-    plt.xlim(0, 1.0)
-    plt.axvline(0.99, color='red', linestyle=':', label='Threshold (99%)')
-    plt.legend()
-    
-    plt.tight_layout()
-    plt.savefig("lazarus_v4_redteam_proof.png", dpi=150)
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+import warnings
+
+# The engine lives in src/reliability.py; this script is the Stage III/IV demo
+from src.reliability import QuantumReliabilityEngine, L, T_GATE, STEPS, J_NOMINAL, TRACE_NOISE
+
+# Suppress warnings for cleaner output
+warnings.filterwarnings("ignore")
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    engine = QuantumReliabilityEngine(L=L)
+    
+    # 1. SETUP BROKEN CHIP
+    J_real = np.ones(L-1) * J_NOMINAL
+    J_real[2] = 0.5   # The Defect
+    J_real[4] = 1.2   # The Crosstalk
+    h_real = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(L))
+    
+    print("=== INITIALIZING RED TEAM SCENARIO ===")
+    
+    # 2. DIAGNOSIS (With reduced noise for clearer demo)
+    trace_exp = engine.get_evolution(J_real, h_real)
+    trace_exp += np.random.normal(0, TRACE_NOISE, size=trace_exp.shape)
+    
+    J_recovered, fit_error = engine.calibrate_system(trace_exp)
+    print(f">> DIAGNOSIS COMPLETE. Recovered Map: {np.round(J_recovered, 3)}")
+    
+    # 3. REMEDIATION
+    print("\n=== SYNTHESIZING REMEDIATION PULSE ===")
+    pulse, fidelity = engine.synthesize_pulse(J_recovered, h_real)
+    
+    print(f"\n>> SUCCESS. Achieved Fidelity: {fidelity*100:.2f}%")
+    
+    # 4. PLOTTING
+    plt.figure(figsize=(12, 10))
+    
+    # Plot 1: Calibration
+    plt.subplot(2, 2, 1)
+    x = np.arange(L-1)
+    plt.bar(x - 0.2, J_real, 0.4, label='True Defect', color='#c0392b')
+    plt.bar(x + 0.2, J_recovered, 0.4, label='Digital Twin', color='#27ae60')
+    plt.title("Stage III: Hardware Diagnosis")
+    plt.ylabel("Coupling Strength (J)")
+    plt.xticks(x, [f"J{i}{i+1}" for i in x])
+    plt.legend()
+    plt.grid(alpha=0.3)
+    
+    # Plot 2: Pulse
+    plt.subplot(2, 2, 2)
+    time_axis = np.linspace(0, T_GATE, STEPS)
+    plt.plot(time_axis, pulse[:, 2], label='Qubit 2 Control', linewidth=2)
+    plt.plot(time_axis, pulse[:, 3], label='Qubit 3 Control', linewidth=2, linestyle='--')
+    plt.title("Stage IV: Lazarus Control Pulse")
+    plt.ylabel(r"Detuning $\Delta(t)$")
+    plt.xlabel("Time (ns)")
+    plt.legend()
+    plt.grid(alpha=0.3)
+    
+    # Plot 3: Fidelity
+    plt.subplot(2, 1, 2)
+    psi_start = np.zeros(engine.dim)
+    idx_s = int("".join(["01" for _ in range(L // 2)]), 2)
+    psi_start[idx_s] = 1.0
+    idx_t = int("".join(["10" for _ in range(L // 2)]), 2)
+    psi_target = np.zeros(engine.dim)
+    psi_target[idx_t] = 1.0
+    
+    # Standard pulse (free evolution)
+    psi_naive = engine.get_evolution(J_real, h_real, control_pulse=np.zeros((STEPS, L)))
+    fid_naive = np.abs(np.vdot(psi_target, psi_naive))**2
+    
+    plt.barh([0, 1], [fid_naive, fidelity], color=['#95a5a6', '#8e44ad'])
+    plt.yticks([0, 1], ['Standard Pulse (Baseline)', 'Lazarus Pulse (V4)'])
+    plt.xlabel("Gate Fidelity")
+    plt.title(f"Remediation Impact: {fid_naive*100:.1f}% -> {fidelity*100:.1f}%")
+    plt.xlim(0, 1.0)
+    plt.axvline(0.99, color='red', linestyle=':', label='Threshold (99%)')
+    plt.legend()
+    
+    plt.tight_layout()
+    plt.savefig("lazarus_v4_redteam_proof.png", dpi=150)
     print("Results saved to 'lazarus_v4_redteam_proof.png'")
\ No newline at end of file
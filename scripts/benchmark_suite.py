@@ -0,0 +1,273 @@
+# scripts/benchmark_suite.py
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import mapping, topology
+from src.mapping import get_sycamore_graph, find_snake_path
+from src.compiler import compile_aubry_andre_trotter_step, _step_template
+from src.noise_models import SycamoreNoiseModel
+from src.main import realization_circuits, verify_imbalance, on_site_potentials
+from src.rem import ReadoutErrorMitigator
+from src.bitstrings import pack_bits
+from src.sampling import sample_realizations
+from src.estimators import ShotStatistics
+from src.reliability import QuantumReliabilityEngine
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+def _config(L, steps=10, shots=1000, realizations=2):
+    return {
+        'system': {'L': L, 'J': 1.0, 'Delta': 2.5, 'W': 2.5, 'beta': 0.618033988},
+        'simulation': {'dt': 0.05, 'steps': steps, 'shots': shots, 'realizations': realizations},
+        'hardware': {'noise': None},
+    }
+
+def _qubits(L, G=None):
+    qubits = find_snake_path(get_sycamore_graph() if G is None else G, length=L)
+    # A shorter path would time a smaller case under the L{L} key
+    assert len(qubits) == L, f"No {L}-qubit path on the device (found {len(qubits)})"
+    return qubits
+
+def _twin(L):
+    engine = QuantumReliabilityEngine(L=L)
+    h = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(L))
+    J = np.ones(L - 1)
+    J[(L - 1) // 2] = 0.5  # The Stage III/IV demo defect
+    return engine, J, h
+
+# --- Stages: each setup(L) does the untimed preparation and returns the timed call ---
+
+def setup_mapping(L):
+    def run():
+        # Cold: rebuild the device graph and search without the caches
+        topology.clear_cache()
+        mapping.clear_cache()
+        return find_snake_path(get_sycamore_graph(), length=L)
+    return run
+
+def setup_compile(L):
+    qubits = _qubits(L)
+    V = on_site_potentials(_config(L), 0.0)
+    def run():
+        _step_template.cache_clear()
+        return compile_aubry_andre_trotter_step(qubits, 1.0, 2.5, V, 0.05)
+    return run
+
+def setup_noise(L):
+    G = get_sycamore_graph()
+    qubits = _qubits(L, G)
+    _, circuit = next(realization_circuits(qubits, _config(L), [0.0]))
+    def run():
+        return circuit.with_noise(SycamoreNoiseModel(device_graph=G))
+    return run
+
+def setup_simulation(L):
+    config = _config(L)
+    config['simulation']['backend'] = 'cirq'
+    qubits = _qubits(L)
+    return lambda: verify_imbalance(config, qubits)
+
+def setup_native(L):
+    config = _config(L)  # Noiseless: verify_imbalance picks the native simulator
+    qubits = _qubits(L)
+    return lambda: verify_imbalance(config, qubits)
+
+def setup_sampling(L):
+    rng = np.random.default_rng(0)
+    # 1M shots over 10 realizations, with Sycamore-like readout flips
+    states = []
+    for _ in range(10):
+        psi = rng.normal(size=2**L) + 1j * rng.normal(size=2**L)
+        states.append((psi / np.linalg.norm(psi)).astype(np.complex64))
+    return lambda: sample_realizations(states, 100000, L, seed=0, readout=(0.03, 0.06))
+
+def setup_estimators(L):
+    rng = np.random.default_rng(0)
+    samples = pack_bits(rng.integers(0, 2, size=(1000000, L), dtype=np.uint8))
+    return lambda: ShotStatistics(L, distances=(1, 2)).update(samples)
+
+def setup_rem(L):
+    rng = np.random.default_rng(0)
+    # Neel-like shots with ~5% flips, the regime REM works in
+    neel = np.arange(L) % 2
+    bits = neel ^ (rng.random((10000, L)) < 0.05)
+    samples = pack_bits(bits)
+    rem = ReadoutErrorMitigator(num_qubits=L)
+    def run():
+        rem.mitigated_imbalance(samples)
+        return rem.mitigate_distribution(samples)
+    return run
+
+def setup_evolution(L):
+    engine, J, h = _twin(L)
+    return lambda: engine.get_evolution(J, h)
+
+def setup_control(L):
+    engine, J, h = _twin(L)
+    # Control-mode evolution: 40 piecewise-constant Z steps
+    controls = np.random.default_rng(0).normal(0, 2.0, size=(40, L))
+    return lambda: engine.get_evolution(J, h, control_pulse=controls)
+
+def setup_calibration(L):
+    engine, J, h = _twin(L)
+    trace = engine.get_evolution(J, h)
+    return lambda: engine.calibrate_system(trace)
+
+def setup_pulse(L):
+    engine, J, h = _twin(L)
+    def run():
+        np.random.seed(0)  # synthesize_pulse draws its initial controls from np.random
+        return engine.synthesize_pulse(J, h)
+    return run
+
+# stage: (setup, sizes, quick sizes, minimum repeats); --quick skips stages without quick sizes
+STAGES = {
+    'mapping': (setup_mapping, [20, 50, 90], [20], 3),
+    'compile': (setup_compile, [20, 50, 90], [20], 5),
+    'noise': (setup_noise, [20, 50, 90], [20], 3),
+    'simulation': (setup_simulation, [6, 8, 10], [6], 2),
+    'native': (setup_native, [12, 16, 20], [12], 2),
+    'sampling': (setup_sampling, [12, 16, 20], [12], 3),
+    'estimators': (setup_estimators, [20, 50, 100], [20], 3),
+    'rem': (setup_rem, [20, 50, 100], [20], 2),
+    'evolution': (setup_evolution, [6, 8, 10], [6], 5),
+    'control': (setup_control, [6, 10, 12], [6], 3),
+    'calibration': (setup_calibration, [6, 8], [6], 2),
+    'pulse': (setup_pulse, [4, 6], [], 1),
+}
+
+# Timed calls continue past the minimum repeats until they add up to
+# MIN_TOTAL_SECONDS (at most MAX_REPEATS calls), so fast cases get enough
+# samples for a stable minimum
+MIN_TOTAL_SECONDS = 2.0
+MAX_REPEATS = 100
+
+def measure(run, repeats):
+    """
+    Peak traced allocation of one call, then the best and the median wall
+    time over at least `repeats` calls (see MIN_TOTAL_SECONDS).
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Memory in a separate pass (tracemalloc slows allocation-heavy code);
+        # it also warms up imports and caches before the timed calls
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        while len(times) < repeats or (sum(times) < MIN_TOTAL_SECONDS and len(times) < MAX_REPEATS):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'median_seconds': float(np.median(times)), 'repeats': len(times),
+            'peak_mb': peak / 2**20}
+
+def run_suite(stages, quick=False, verbose=True):
+    results = {}
+    for stage in stages:
+        setup, sizes, quick_sizes, repeats = STAGES[stage]
+        for L in (quick_sizes if quick else sizes):
+            with contextlib.redirect_stdout(io.StringIO()):
+                run = setup(L)
+            key = f"{stage}/L{L}"
+            results[key] = measure(run, repeats)
+            if verbose:
+                print(f"    {key:<20} {results[key]['seconds'] * 1e3:10.2f} ms {results[key]['peak_mb']:9.2f} MB", flush=True)
+    return results
+
+def compare(results, baseline, threshold=0.25, memory_threshold=0.25, min_seconds=0.005,
+            short_threshold=0.5, short_seconds=1.0):
+    """
+    Cases slower (or using more memory) than the baseline by more than the
+    thresholds (relative). Cases whose baseline takes under short_seconds
+    are judged against the looser short_threshold, as they are more
+    exposed to scheduler and cache noise; time differences below
+    min_seconds are ignored as timer noise.
+    """
+    regressions = []
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        slower = current['seconds'] / reference['seconds'] - 1.0
+        limit = short_threshold if reference['seconds'] < short_seconds else threshold
+        if slower > limit and current['seconds'] - reference['seconds'] > min_seconds:
+            regressions.append((key, 'time', reference['seconds'], current['seconds'], slower))
+        grown = current['peak_mb'] / max(reference['peak_mb'], 1e-3) - 1.0
+        if grown > memory_threshold and current['peak_mb'] - reference['peak_mb'] > 1.0:
+            regressions.append((key, 'memory', reference['peak_mb'], current['peak_mb'], grown))
+    return regressions
+
+def machine_info():
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(),
+            'cpus': os.cpu_count()}
+
+def _write_json(path, content):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pipeline benchmark suite with baseline regression checks')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help='Stages to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='Smallest size of each stage only (skips the slow pulse stage)')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON here')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Baseline JSON to compare with')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative slowdown flagged as a regression')
+    parser.add_argument('--short-threshold', type=float, default=0.5,
+                        help='Relative slowdown flagged for cases under 1 s in the baseline')
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help='Relative peak-memory growth flagged')
+    args = parser.parse_args()
+
+    print(f"[*] Benchmarking {', '.join(args.stages)}{' (quick)' if args.quick else ''}...")
+    results = run_suite(args.stages, quick=args.quick)
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'machine': machine_info(),
+              'results': results}
+    if args.output:
+        _write_json(args.output, report)
+        print(f"[*] Results written to {args.output}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f).get('results', {})
+        _write_json(args.baseline, {**report, 'results': {**baseline, **results}})
+        print(f"[*] Baseline updated: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"[!] No baseline at {args.baseline}; run with --update-baseline to create one.")
+        sys.exit(0)
+    with open(args.baseline, 'r') as f:
+        stored = json.load(f)
+    if stored.get('machine', {}).get('platform') != report['machine']['platform']:
+        print("[!] Baseline was recorded on a different machine; timings may not be comparable.")
+    regressions = compare(results, stored['results'], args.threshold, args.memory_threshold,
+                          short_threshold=args.short_threshold)
+    if not regressions:
+        print(f"[*] No regressions against the baseline (threshold {args.threshold:.0%}).")
+        sys.exit(0)
+    print(f"[!] {len(regressions)} regression(s):")
+    for key, kind, before, after, change in regressions:
+        unit = 's' if kind == 'time' else 'MB'
+        print(f"    {key:<20} {kind:<6} {before:.4g} {unit} -> {after:.4g} {unit} (+{change:.0%})")
+    sys.exit(1)
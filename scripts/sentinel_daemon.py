@@ -1,37 +1,256 @@
-# scripts/sentinel_daemon.py
-import time
-import sys
-from datetime import datetime
-
-# Mock import to show intent
-# from google.quantum.engine import SycamoreService 
-
-def sentinel_loop(interval_seconds=3600):
-    print(f"[*] Lazarus Sentinel v1.0 started at {datetime.now()}")
-    print("[*] Monitoring Sycamore Fleet Status...")
-    
-    while True:
-        # 1. Ping Hardware (Mock)
-        # status = SycamoreService.get_status()
-        status = "ONLINE" 
-        
-        if status == "ONLINE":
-            print(f"[{datetime.now()}] HEARTBEAT: Sycamore active. Drift check pending...")
-            
-            # 2. Run MBL Imbalance Check
-            # drift = run_verification(L=50)
-            drift = 0.02 # Mock drift
-            
-            if drift > 0.05:
-                print(f"[!] ALERT: Global Phase Drift detected ({drift}). Initiating recalibration...")
-                # trigger_lazarus_remediation()
-            else:
-                print(f"    -> Drift nominal ({drift}). System stable.")
-        
-        time.sleep(10) # Short sleep for demo, would be 3600 real
-
-if __name__ == "__main__":
-    try:
-        sentinel_loop()
-    except KeyboardInterrupt:
-        print("[*] Sentinel stopping.")
\ No newline at end of file
+# scripts/sentinel_daemon.py
+import os
+import sys
+import copy
+import asyncio
+import argparse
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.mapping import get_sycamore_graph, find_snake_path
+from src.main import verify_imbalance
+from src.noise_models import SycamoreNoiseModel
+from src.drift import CusumDetector
+from src.reliability import QuantumReliabilityEngine, J_NOMINAL, TRACE_NOISE
+from src import instrumentation
+
+# Mock import to show intent
+# from google.quantum.engine import SycamoreService
+
+# Small, fast MBL imbalance check used when no --config is given
+DEFAULT_CHECK_CONFIG = {
+    'system': {'L': 8, 'J': 1.0, 'Delta': 2.5, 'W': 2.5, 'beta': 0.618033988},
+    'simulation': {'dt': 0.05, 'steps': 20, 'shots': 500, 'realizations': 4},
+    'hardware': {'noise': None},
+}
+
+class DeviceBackend(ABC):
+    """
+    One monitored chip. Backends are pickled into worker processes for the
+    heavy checks, so any state that evolves between checks must be
+    advanced in the Sentinel process (advance()).
+    """
+    name = "device"
+
+    def status(self):
+        return "ONLINE"
+
+    def advance(self, elapsed_seconds):
+        """Hook to update device state between checks (e.g. simulated drift)."""
+
+    @abstractmethod
+    def imbalance_check(self, config):
+        """Disorder-averaged Néel imbalance (mean, error) measured on the device."""
+
+    @abstractmethod
+    def calibration_trace(self):
+        """Imbalance trace of the digital-twin calibration experiment (src/reliability.py)."""
+
+class SimulatedBackend(DeviceBackend):
+    """
+    Local simulator standing in for hardware. Its couplers J random-walk
+    by drift_rate per hour (plus any injected defects); the imbalance
+    check runs the src/main.py circuits with the mean coupling, and the
+    calibration trace is the twin's exact trace plus shot noise.
+    """
+    def __init__(self, name, twin_L=6, drift_rate=0.02, noisy=False, seed=None):
+        self.name = name
+        self.twin_L = twin_L
+        self.drift_rate = drift_rate
+        self.noisy = noisy
+        self.rng = np.random.default_rng(seed)
+        self.J = np.ones(twin_L - 1)
+        self.h = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(twin_L))
+
+    def advance(self, elapsed_seconds):
+        step = self.drift_rate * np.sqrt(elapsed_seconds / 3600.0)
+        self.J = np.clip(self.J + self.rng.normal(0.0, step, size=self.J.shape), 0.0, 2.0)
+
+    def inject_defect(self, coupler, value):
+        self.J[coupler] = value
+
+    def imbalance_check(self, config):
+        config = copy.deepcopy(config)
+        config['system']['J'] = float(config['system']['J'] * self.J.mean())
+        G = get_sycamore_graph()
+        qubits = find_snake_path(G, length=config['system']['L'])
+        noise_model = SycamoreNoiseModel(device_graph=G) if self.noisy else None
+        return verify_imbalance(config, qubits, noise_model=noise_model)
+
+    def calibration_trace(self):
+        trace = QuantumReliabilityEngine(L=self.twin_L).get_evolution(self.J, self.h)
+        return trace + self.rng.normal(0.0, TRACE_NOISE, size=trace.shape)
+
+# Largest coupler change a warm-started recalibration may report
+TWIN_WINDOW = 0.5
+
+def _run_check(backend, config):
+    return backend.imbalance_check(config)
+
+def _run_remediation(backend, synthesize_pulse=False, twin=None):
+    """
+    Stage III diagnosis (and optionally the Stage IV pulse) for a drifting
+    device. The fit starts from the device's previous twin (J, h), or the
+    nominal map before its first recalibration, and only moves the couplers
+    that have changed.
+    """
+    engine = QuantumReliabilityEngine(L=backend.twin_L)
+    trace = backend.calibration_trace()
+    J_prev, h_prev = twin if twin is not None else (np.full(backend.twin_L - 1, J_NOMINAL), None)
+    active = engine.changed_couplers(trace, J_prev, h_prev)
+    J_recovered, fit_error = engine.calibrate_system(trace, J_init=J_prev, h_init=h_prev,
+                                                     active_couplers=active, J_window=TWIN_WINDOW)
+    fidelity = None
+    if synthesize_pulse:
+        _, fidelity = engine.synthesize_pulse(J_recovered, engine.h_recovered)
+    return J_recovered, engine.h_recovered, fit_error, engine.calibration_iterations, fidelity
+
+class Sentinel:
+    """
+    Monitors many devices concurrently. Every device has its own check
+    interval; heavy work (imbalance checks, diagnosis, pulse synthesis)
+    runs in a bounded process pool. At most max_pending jobs are queued or
+    running; a device whose turn comes while the pool is saturated waits
+    for a slot instead of piling up work, and never has two checks in
+    flight.
+
+    Each device's readings stream into a CUSUM detector (src/drift.py);
+    a change point, or a single jump beyond `threshold` from the
+    detector's reference level, triggers remediation. Recalibration is
+    warm-started from the device's last recovered twin.
+
+    Args:
+        devices: [(backend, interval_seconds), ...]
+        config: MBL check configuration (src/main.py format)
+        workers: Worker processes for the heavy jobs
+        max_pending: Queue bound (default 2 * workers)
+    """
+    def __init__(self, devices, config=None, workers=2, max_pending=None, threshold=0.05,
+                 synthesize_pulse=False):
+        self.devices = devices
+        self.config = config or DEFAULT_CHECK_CONFIG
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self.threshold = threshold
+        self.synthesize_pulse = synthesize_pulse
+        self.detectors = {backend.name: CusumDetector() for backend, _ in devices}
+        self.twins = {}  # Last recovered (J, h) per device
+
+    def log(self, message):
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+    async def run(self, duration=None):
+        self.log(f"Lazarus Sentinel v2.0 monitoring {len(self.devices)} devices "
+                 f"({self.workers} workers, queue bound {self.max_pending})")
+        self._slots = asyncio.Semaphore(self.max_pending)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._pool = pool
+            monitors = [asyncio.create_task(self._monitor(backend, interval, offset=interval * k / len(self.devices)))
+                        for k, (backend, interval) in enumerate(self.devices)]
+            try:
+                if duration is None:
+                    await asyncio.gather(*monitors)
+                else:
+                    await asyncio.wait(monitors, timeout=duration)
+            finally:
+                for task in monitors:
+                    task.cancel()
+                await asyncio.gather(*monitors, return_exceptions=True)
+
+    async def _submit(self, fn, *args):
+        # Backpressure: wait for a free slot before queueing more work
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def _monitor(self, backend, interval, offset=0.0):
+        loop = asyncio.get_running_loop()
+        # Stagger start times so the fleet's checks do not run back to back
+        await asyncio.sleep(offset)
+        last = loop.time()
+        while True:
+            started = loop.time()
+            backend.advance(started - last)
+            last = started
+
+            # 1. Ping Hardware
+            status = await loop.run_in_executor(None, backend.status)
+            if status == "ONLINE":
+                try:
+                    await self.check(backend)
+                except Exception as exc:
+                    self.log(f"[!] {backend.name}: check failed ({exc!r})")
+            else:
+                self.log(f"[!] {backend.name}: status {status}, skipping check.")
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+    async def check(self, backend):
+        # 2. Run MBL Imbalance Check
+        # Spans cover queueing plus the worker's run, per device
+        with instrumentation.span('imbalance_check', track=backend.name):
+            imbalance, error = await self._submit(_run_check, backend, self.config)
+        instrumentation.count('sentinel.checks')
+        detector = self.detectors[backend.name]
+        reference = detector.mu0
+        change_point = detector.update(imbalance, error)
+        jump = reference is not None and abs(imbalance - reference) > self.threshold
+
+        if change_point or jump:
+            reason = "change point" if change_point else f"jump {abs(imbalance - reference):.3f}"
+            self.log(f"[!] ALERT: {backend.name} imbalance drift ({reason}, "
+                     f"I={imbalance:.3f} +/- {error:.3f}). Initiating recalibration...")
+            # Re-baseline against the recalibrated device
+            detector.reset()
+            instrumentation.count('sentinel.alerts')
+            await self.remediate(backend)
+        else:
+            self.log(f"    -> {backend.name}: drift nominal (CUSUM {detector.shift:.2f}, "
+                     f"I={imbalance:.3f}). System stable.")
+
+    async def remediate(self, backend):
+        twin = self.twins.get(backend.name)
+        with instrumentation.span('remediation', track=backend.name, warm_start=twin is not None):
+            J_recovered, h_recovered, fit_error, iterations, fidelity = await self._submit(
+                _run_remediation, backend, self.synthesize_pulse, twin)
+        instrumentation.count('sentinel.calibration_iterations', iterations)
+        self.twins[backend.name] = (J_recovered, h_recovered)
+        start = "from last twin" if twin is not None else "from nominal map"
+        message = (f"    -> {backend.name}: recovered J map {np.round(J_recovered, 3)} "
+                   f"(fit error {fit_error:.2e}, {iterations} iterations, {start})")
+        if fidelity is not None:
+            message += f", Lazarus pulse fidelity {fidelity * 100:.2f}%"
+        self.log(message)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Lazarus Sentinel: fleet drift monitor')
+    parser.add_argument('--config', type=str, default=None, help='MBL check configuration YAML')
+    parser.add_argument('--devices', type=int, default=4, help='Number of simulated devices')
+    parser.add_argument('--interval', type=float, default=3600.0, help='Seconds between checks per device')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes for the heavy checks')
+    parser.add_argument('--threshold', type=float, default=0.05, help='Imbalance drift alert threshold')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    parser.add_argument('--synthesize-pulse', action='store_true', help='Also synthesize a Lazarus pulse on alerts')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='Write a Chrome trace of checks and remediations to this JSON file on exit')
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = yaml.safe_load(f)
+    trace_path = instrumentation.configure(config, trace_path=args.trace)
+    devices = [(SimulatedBackend(f"sycamore-sim-{k}", seed=k), args.interval) for k in range(args.devices)]
+    sentinel = Sentinel(devices, config=config, workers=args.workers, threshold=args.threshold,
+                        synthesize_pulse=args.synthesize_pulse)
+    try:
+        asyncio.run(sentinel.run(duration=args.duration))
+    except KeyboardInterrupt:
+        print("[*] Sentinel stopping.")
+    finally:
+        if trace_path:
+            print(f"[*] Trace written to {instrumentation.export()}")
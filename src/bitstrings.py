@@ -0,0 +1,66 @@
+# src/bitstrings.py
+import numpy as np
+
+# Packed layout: one row per shot, ceil(L/64) uint64 words per row. Qubit i
+# of the mapped path lives in word i // 64, bit i % 64 (little-endian), so
+# a 100-qubit shot takes 16 bytes instead of a 100-character string.
+
+def n_words(num_qubits):
+    return -(-num_qubits // 64)
+
+def pack_bits(bits):
+    """(shots, L) array of 0/1 -> (shots, n_words) uint64."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    shots, L = bits.shape
+    padded = np.zeros((shots, 64 * n_words(L)), dtype=np.uint8)
+    padded[:, :L] = bits
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+def unpack_bits(packed, num_qubits):
+    """(shots, n_words) uint64 -> (shots, L) uint8 of 0/1."""
+    packed = np.ascontiguousarray(packed, dtype='<u8')
+    bits = np.unpackbits(packed.view(np.uint8), axis=1, bitorder='little')
+    return bits[:, :num_qubits]
+
+def pack_bytes(bits):
+    """(shots, L) array of 0/1 -> (shots, ceil(L/8)) uint8, same bit order as pack_bits."""
+    return np.packbits(np.asarray(bits, dtype=np.uint8), axis=1, bitorder='little')
+
+def bytes_to_words(packed, num_qubits):
+    """uint8 rows from pack_bytes -> uint64 rows as from pack_bits."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    padded = np.zeros((len(packed), 8 * n_words(num_qubits)), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8')
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits, summed over the last (word) axis."""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_POPCOUNT = np.array([bin(b).count('1') for b in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits, summed over the last (word) axis."""
+        words = np.ascontiguousarray(words, dtype='<u8')
+        as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+        return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int64)
+
+def unique_counts(packed):
+    """Collapse shots into (distinct packed rows, int64 counts)."""
+    rows, counts = np.unique(packed, axis=0, return_counts=True)
+    return rows, counts.astype(np.int64)
+
+def from_count_dict(counts, num_qubits=None):
+    """{'0101...': count} (qubit 0 first) -> (packed rows, counts)."""
+    keys = list(counts)
+    if num_qubits is None:
+        num_qubits = len(keys[0])
+    bits = np.frombuffer(''.join(keys).encode(), dtype=np.uint8).reshape(len(keys), num_qubits) - ord('0')
+    return pack_bits(bits), np.array([counts[k] for k in keys])
+
+def to_count_dict(packed, counts, num_qubits):
+    """Inverse of from_count_dict."""
+    bits = unpack_bits(packed, num_qubits) + ord('0')
+    keys = [row.tobytes().decode() for row in bits]
+    return dict(zip(keys, counts))
@@ -1,51 +1,94 @@
-# src/compiler.py
-import cirq
-import numpy as np
-
-def compile_aubry_andre_trotter_step(qubits, J, Delta, V, dt):
-    """
-    Compiles a single Trotter step of the Aubry-Andre Hamiltonian
-    into native Sycamore FSIM gates.
-    
-    Args:
-        qubits: Ordered list of cirq.GridQubit (from mapping.py)
-        J: Hopping strength
-        Delta: Interaction strength
-        V: List of on-site potentials
-        dt: Time step size
-    """
-    circuit = cirq.Circuit()
-    
-    # FSIM Parameters [cite: 134, 135]
-    # theta maps to the hopping term (XY)
-    # phi maps to the interaction term (ZZ)
-    theta = -2.0 * J * dt
-    phi = -2.0 * Delta * dt
-    
-    fsim_gate = cirq.FSimGate(theta=theta, phi=phi)
-    
-    # Parity-based layering (Checkerboard decomposition)
-    # Layer 1: Even bonds
-    even_moments = []
-    for i in range(0, len(qubits)-1, 2):
-        q1, q2 = qubits[i], qubits[i+1]
-        even_moments.append(fsim_gate.on(q1, q2))
-    circuit.append(cirq.Moment(even_moments))
-    
-    # Layer 2: Odd bonds
-    odd_moments = []
-    for i in range(1, len(qubits)-1, 2):
-        q1, q2 = qubits[i], qubits[i+1]
-        odd_moments.append(fsim_gate.on(q1, q2))
-    circuit.append(cirq.Moment(odd_moments))
-    
-    # Layer 3: On-site potentials (Virtual Z rotations)
-    # Propagator is exp(-i * dt * V_i * Z_i)
-    z_moments = []
-    for i, q in enumerate(qubits):
-        # rads = 2 * V * dt [cite: 146]
-        rads = 2.0 * V[i] * dt
-        z_moments.append(cirq.rz(rads).on(q))
-    circuit.append(cirq.Moment(z_moments))
-    
-    return circuit
\ No newline at end of file
+# src/compiler.py
+import functools
+from collections import OrderedDict
+import cirq
+import sympy
+
+# Resolved steps kept per template, least recently used first
+RESOLVED_CACHE_SIZE = 16
+
+class TrotterStepTemplate:
+    """
+    A Trotter step of the Aubry-Andre Hamiltonian compiled once per qubit
+    path, with symbolic FSIM angles ('theta', 'phi') and on-site Z angles
+    ('rz_0', 'rz_1', ...). Concrete steps are produced by parameter
+    resolution, so gates and Moments are not rebuilt for every step and
+    every disorder realization.
+    """
+    def __init__(self, qubits):
+        self.qubits = tuple(qubits)
+        self.theta = sympy.Symbol('theta')
+        self.phi = sympy.Symbol('phi')
+        self.rz = [sympy.Symbol(f'rz_{i}') for i in range(len(self.qubits))]
+
+        fsim_gate = cirq.FSimGate(theta=self.theta, phi=self.phi)
+
+        # Parity-based layering (Checkerboard decomposition)
+        # Layer 1: Even bonds, Layer 2: Odd bonds
+        even_moment = cirq.Moment(fsim_gate.on(self.qubits[i], self.qubits[i+1])
+                                  for i in range(0, len(self.qubits)-1, 2))
+        odd_moment = cirq.Moment(fsim_gate.on(self.qubits[i], self.qubits[i+1])
+                                 for i in range(1, len(self.qubits)-1, 2))
+        # Layer 3: On-site potentials (Virtual Z rotations)
+        z_moment = cirq.Moment(cirq.rz(s).on(q) for s, q in zip(self.rz, self.qubits))
+
+        self.circuit = cirq.FrozenCircuit(even_moment, odd_moment, z_moment)
+        self._resolved = OrderedDict()
+
+    def param_values(self, J, Delta, V, dt):
+        """Symbol values for one step (see compile_aubry_andre_trotter_step)."""
+        # FSIM Parameters [cite: 134, 135]
+        # theta maps to the hopping term (XY), phi to the interaction term (ZZ)
+        values = {'theta': -2.0 * J * dt, 'phi': -2.0 * Delta * dt}
+        # Propagator is exp(-i * dt * V_i * Z_i), rads = 2 * V * dt [cite: 146]
+        for i in range(len(self.qubits)):
+            values[f'rz_{i}'] = 2.0 * V[i] * dt
+        return values
+
+    def resolve(self, J, Delta, V, dt):
+        """One concrete Trotter step as a cirq.FrozenCircuit."""
+        # Every step of a realization shares the same values, so repeated
+        # calls return the same immutable Moments.
+        key = (J, Delta, tuple(V), dt)
+        if key in self._resolved:
+            self._resolved.move_to_end(key)
+            return self._resolved[key]
+        resolver = cirq.ParamResolver(self.param_values(J, Delta, V, dt))
+        step = self._resolved[key] = cirq.resolve_parameters(self.circuit, resolver)
+        if len(self._resolved) > RESOLVED_CACHE_SIZE:
+            self._resolved.popitem(last=False)
+        return step
+
+    def repeated(self, steps, J, Delta, V, dt):
+        """
+        `steps` Trotter steps as a single cirq.CircuitOperation, for
+        simulators/backends that execute subcircuits without flattening.
+        """
+        return cirq.CircuitOperation(self.circuit, repetitions=steps,
+                                     param_resolver=self.param_values(J, Delta, V, dt))
+
+    def sweep(self, J, Delta, V_list, dt):
+        """A cirq.Sweep over several on-site potential profiles (e.g. disorder phases)."""
+        return cirq.ListSweep([self.param_values(J, Delta, V, dt) for V in V_list])
+
+@functools.lru_cache(maxsize=32)
+def _step_template(qubits):
+    return TrotterStepTemplate(qubits)
+
+def get_trotter_step_template(qubits):
+    """The (cached) step template for an ordered qubit path."""
+    return _step_template(tuple(qubits))
+
+def compile_aubry_andre_trotter_step(qubits, J, Delta, V, dt):
+    """
+    Compiles a single Trotter step of the Aubry-Andre Hamiltonian
+    into native Sycamore FSIM gates.
+    
+    Args:
+        qubits: Ordered list of cirq.GridQubit (from mapping.py)
+        J: Hopping strength
+        Delta: Interaction strength
+        V: List of on-site potentials
+        dt: Time step size
+    """
+    return get_trotter_step_template(qubits).resolve(J, Delta, V, dt).unfreeze()
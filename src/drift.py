@@ -0,0 +1,68 @@
+# src/drift.py
+import collections
+import numpy as np
+
+class CusumDetector:
+    """
+    Streaming change-point detector for a device's imbalance readings.
+
+    The first `warmup` readings set the reference level mu0 and noise
+    scale sigma; afterwards each reading x is standardised,
+    z = (x - mu0) / sigma, and two one-sided CUSUM statistics
+        S+ = max(0, S+ + z - k),   S- = max(0, S- - z - k)
+    accumulate persistent shifts of more than k sigma in either direction.
+    An alarm is raised when either exceeds h; the detector then re-learns
+    its reference from the next readings. The last `window` readings are
+    kept as a rolling trace.
+
+    Args:
+        k: Slack (in sigma), about half the shift worth detecting
+        h: Decision threshold (in sigma)
+        warmup: Readings used to (re-)estimate mu0 and sigma
+        window: Length of the rolling trace
+        min_sigma: Floor for sigma (e.g. the check's statistical error)
+    """
+    def __init__(self, k=0.5, h=5.0, warmup=5, window=200, min_sigma=1e-3):
+        self.k = k
+        self.h = h
+        self.warmup = warmup
+        self.min_sigma = min_sigma
+        self.trace = collections.deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        """Forget the reference; the next `warmup` readings define a new one."""
+        self.mu0 = None
+        self.sigma = None
+        self.s_pos = 0.0
+        self.s_neg = 0.0
+        self._baseline = []
+
+    def update(self, x, error=None):
+        """
+        Adds one reading (with its statistical error, if known). Returns
+        True if a change point is detected at this reading.
+        """
+        self.trace.append(x)
+        if self.mu0 is None:
+            self._baseline.append((x, error))
+            if len(self._baseline) >= self.warmup:
+                values = np.array([v for v, _ in self._baseline])
+                errors = [e for _, e in self._baseline if e is not None]
+                self.mu0 = float(values.mean())
+                spread = values.std(ddof=1) if len(values) > 1 else 0.0
+                self.sigma = max(spread, float(np.median(errors)) if errors else 0.0, self.min_sigma)
+            return False
+
+        z = (x - self.mu0) / self.sigma
+        self.s_pos = max(0.0, self.s_pos + z - self.k)
+        self.s_neg = max(0.0, self.s_neg - z - self.k)
+        if max(self.s_pos, self.s_neg) > self.h:
+            self.reset()
+            return True
+        return False
+
+    @property
+    def shift(self):
+        """Current CUSUM statistic (in sigma), 0 while warming up."""
+        return max(self.s_pos, self.s_neg)
@@ -0,0 +1,242 @@
+# src/dynamics.py
+import numpy as np
+import scipy.linalg as la
+import scipy.sparse.linalg as linalg
+from scipy.special import jv
+
+from src.hamiltonian import to_parity_sector
+from src import instrumentation
+
+# Up to this dimension the trace is evaluated in the eigenbasis: one eigh,
+# then every time point is a batched phase sum. Above it we step
+# incrementally. Traces run in the parity block of psi0, so this covers
+# chains up to L=10.
+EIGEN_MAX_DIM = 2**9
+# Up to this dimension ChebyshevPropagator assembles the (fixed) coupling
+# part once as CSR, which beats the per-bond passes of H.apply there.
+CSR_MAX_DIM = 2**12
+
+
+def diagonal_trace(H, psi0, t_points, obs_diag, method='auto'):
+    """
+    Evaluates <psi(t)| O |psi(t)>, psi(t) = exp(-iHt) psi0, at every time in
+    t_points in a single pass, for an observable O that is diagonal in the
+    computational basis (e.g. the imbalance). If psi0 has definite Z-parity
+    the evolution runs in that block (half the dimension).
+
+    Args:
+        H: ChainHamiltonian (src/hamiltonian.py)
+        psi0: Initial state vector
+        t_points: Increasing evaluation times
+        obs_diag: Diagonal of O
+        method: 'eig' (diagonalise once), 'step' (propagate t_k -> t_k+1),
+                or 'auto' (eig up to EIGEN_MAX_DIM)
+    """
+    t_points = np.asarray(t_points, dtype=float)
+    H, psi0, obs_diag = to_parity_sector(H, psi0, obs_diag)
+    if method == 'auto':
+        method = 'eig' if H.dim <= EIGEN_MAX_DIM else 'step'
+
+    if method == 'eig':
+        instrumentation.count('eigh')
+        E, V = la.eigh(H.to_sparse().toarray())
+        coeffs = V.T @ psi0
+        # Columns are psi(t_k) for all k at once
+        psi_t = V @ (coeffs[:, None] * np.exp(-1j * np.outer(E, t_points)))
+        return obs_diag @ (np.abs(psi_t)**2)
+
+    if method == 'step':
+        H_op = H.operator()
+        trace = np.empty(len(t_points))
+        psi = psi0
+        t_prev = 0.0
+        for k, t in enumerate(t_points):
+            if t != t_prev:
+                instrumentation.count('expm_multiply')
+                psi = linalg.expm_multiply(-1j * (t - t_prev) * H_op, psi, traceA=H.trace())
+                t_prev = t
+            trace[k] = np.dot(np.abs(psi)**2, obs_diag)
+        return trace
+
+    raise ValueError(f"Unknown trace method '{method}'.")
+
+
+def diagonal_trace_gradient(H, psi0, t_points, obs_diag, loss_fn, method='auto'):
+    """
+    Gradient of a loss on the diagonal_trace with respect to every coupling
+    J_i and field h_i of H, from one forward and one adjoint pass.
+
+    With Lambda(s) = sum_{t_k >= s} w_k exp(iH(t_k - s)) O psi(t_k) the
+    back-propagated costate and w = dloss/dtrace,
+        dloss/dtheta = 2 Im int_0^T <Lambda(s)| dH/dtheta |psi(s)> ds.
+
+    Args:
+        H, psi0, t_points, obs_diag, method: As for diagonal_trace
+        loss_fn: Callable trace -> (loss, dloss/dtrace)
+
+    Returns:
+        (loss, dloss/dJ, dloss/dh)
+    """
+    t_points = np.asarray(t_points, dtype=float)
+    H, psi0, obs_diag = to_parity_sector(H, psi0, obs_diag)
+    if method == 'auto':
+        method = 'eig' if H.dim <= EIGEN_MAX_DIM else 'step'
+    if method == 'eig':
+        return _trace_gradient_eig(H, psi0, t_points, obs_diag, loss_fn)
+    if method == 'step':
+        return _trace_gradient_step(H, psi0, t_points, obs_diag, loss_fn)
+    raise ValueError(f"Unknown trace method '{method}'.")
+
+
+def _trace_gradient_eig(H, psi0, t_points, obs_diag, loss_fn):
+    instrumentation.count('eigh')
+    E, V = la.eigh(H.to_sparse().toarray())
+    coeffs = V.T @ psi0
+    phases = np.exp(-1j * np.outer(E, t_points))
+    psi_t = V @ (coeffs[:, None] * phases)
+    loss, weights = loss_fn(obs_diag @ (np.abs(psi_t)**2))
+
+    # Costate amplitudes a_k = e^{iEt_k} V^T O psi(t_k), weighted by w_k
+    costate = np.conj(phases) * (V.T @ (obs_diag[:, None] * psi_t)) * weights
+    # M_mn = c_n sum_k conj(a_k,m) int_0^t_k e^{i(E_m - E_n)s} ds
+    gaps = E[:, None] - E[None, :]
+    degenerate = np.abs(gaps) < 1e-12
+    oscillating = (np.conj(costate) * np.conj(phases)) @ phases.T
+    static = np.conj(costate).sum(axis=1)[:, None]
+    ramp = (np.conj(costate) @ t_points)[:, None]
+    M = np.where(degenerate, ramp,
+                 (oscillating - static) / np.where(degenerate, 1.0, 1j * gaps)) * coeffs[None, :]
+
+    # Back to the computational basis: <x|P|y> = sum_mn V_xm M_mn V_yn
+    P = V @ M @ V.T
+    d_h = 2.0 * np.imag(H.z_projections(np.diag(P).copy()))
+    idx = np.arange(H.dim)
+    d_J = np.empty(H.L - 1)
+    for i in range(H.L - 1):
+        d_J[i] = 2.0 * np.imag(P[idx, idx ^ H.bond_mask(i)].sum())
+    return loss, d_J, d_h
+
+
+def _trace_gradient_step(H, psi0, t_points, obs_diag, loss_fn):
+    loss, weights = loss_fn(diagonal_trace(H, psi0, t_points, obs_diag, method='step'))
+    # Walk back from t_max, carrying [Lambda, psi]; psi is recovered by
+    # reversing the unitary evolution instead of storing every state.
+    H_op = H.operator()
+    psi = psi0
+    if t_points[-1] != 0.0:
+        instrumentation.count('expm_multiply')
+        psi = linalg.expm_multiply(-1j * t_points[-1] * H_op, psi0, traceA=H.trace())
+    X = np.column_stack([weights[-1] * obs_diag * psi, psi])
+
+    grid = np.concatenate([[0.0], t_points]) if t_points[0] > 0.0 else t_points
+    grid_weights = np.concatenate([[0.0], weights]) if t_points[0] > 0.0 else weights
+    d_J = np.zeros(H.L - 1, dtype=complex)
+    d_h = np.zeros(H.L, dtype=complex)
+    for k in range(len(grid) - 1, 0, -1):
+        span = grid[k] - grid[k - 1]
+        if span > 0.0:
+            nodes, node_weights = gauss_legendre(span * H.onenorm())
+            s_prev = 0.0
+            for u, w in zip(nodes, node_weights):
+                instrumentation.count('expm_multiply')
+                X = linalg.expm_multiply(1j * span * (u - s_prev) * H_op, X, traceA=H.trace())
+                d_J += span * w * H.xx_projections(X[:, 0], X[:, 1])
+                d_h += span * w * H.z_projections(np.conj(X[:, 0]) * X[:, 1])
+                s_prev = u
+            instrumentation.count('expm_multiply')
+            X = linalg.expm_multiply(1j * span * (1.0 - s_prev) * H_op, X, traceA=H.trace())
+        X[:, 0] += grid_weights[k - 1] * obs_diag * X[:, 1]
+    return loss, 2.0 * np.imag(d_J), 2.0 * np.imag(d_h)
+
+
+def gauss_legendre(half_width):
+    """
+    Nodes/weights on [0, 1], enough to integrate exp(i w s), |w| <= 2*half_width,
+    to ~1e-14.
+    """
+    n = int(np.ceil(half_width)) + 8
+    x, w = np.polynomial.legendre.leggauss(n)
+    return 0.5 * (x + 1.0), 0.5 * w
+
+
+class ChebyshevPropagator:
+    """
+    exp(-i t H) applied to a vector or block of vectors, for a ChainHamiltonian
+    whose fields change between calls (piecewise-constant Z controls: call
+    H.set_fields() and propagate again).
+
+    exp(-i z x) = J_0(z) + 2 sum_k (-i)^k J_k(z) T_k(x) on [-1, 1], with
+    x = H / r and z = r t for a bound r on the spectrum. r comes from the
+    fields and couplings in O(L) (ChainHamiltonian.spectral_bound), so no
+    norm is estimated per step, and the expansion is cut where the Bessel
+    coefficients fall below tol (about r t + O((r t)^(1/3)) terms). The
+    recurrence runs in preallocated buffers. Only the diagonal changes
+    between steps: the couplings are read once, as a CSR matrix up to
+    CSR_MAX_DIM and through the matrix-free H.apply (which then allocates
+    nothing) above it.
+
+    Args:
+        H: ChainHamiltonian (or one of its parity sectors)
+        columns: Vectors propagated together (1 for a single state)
+        tol: Truncation threshold for the expansion coefficients
+    """
+    def __init__(self, H, columns=1, tol=1e-14):
+        self.H = H
+        self.tol = tol
+        shape = (H.dim,) if columns == 1 else (H.dim, columns)
+        self._buffers = [np.empty(shape, dtype=complex) for _ in range(4)]
+        self._couplings = None
+        if H.dim <= CSR_MAX_DIM:
+            self._couplings = H.to_sparse()
+            self._couplings.setdiag(0.0)
+            self._couplings.eliminate_zeros()
+            # H.set_fields() rewrites H.diag in place, so this view stays current
+            self._diag = H.diag.reshape((H.dim,) + (1,) * (len(shape) - 1))
+
+    def _apply(self, v, out, work):
+        if self._couplings is None:
+            self.H.apply(v, out=out, work=work)
+        else:
+            np.multiply(self._diag, v, out=out)
+            out += self._couplings @ v
+
+    def coefficients(self, z):
+        """Expansion coefficients a_k of exp(-i z x), trimmed at tol."""
+        k = np.arange(int(abs(z)) + 64)
+        a = 2.0 * (-1j)**k * jv(k, z)
+        a[0] *= 0.5
+        return a[:np.flatnonzero(np.abs(a) > self.tol)[-1] + 1]
+
+    def propagate(self, psi, t, out=None):
+        """
+        Returns exp(-i t H) psi; `out` may be psi itself to update it in
+        place. Negative t propagates backwards.
+        """
+        T_prev, T_cur, T_next, work = self._buffers
+        T_prev[...] = psi
+        if out is None:
+            out = np.empty_like(T_prev)
+        r = self.H.spectral_bound()
+        if r == 0.0 or t == 0.0:
+            out[...] = T_prev
+            return out
+        a = self.coefficients(r * t)
+        instrumentation.count('chebyshev_steps')
+        instrumentation.count('matvecs', len(a) - 1)
+
+        np.multiply(T_prev, a[0], out=out)
+        if len(a) == 1:
+            return out
+        self._apply(T_prev, T_cur, work)
+        T_cur *= 1.0 / r
+        np.multiply(T_cur, a[1], out=work)
+        out += work
+        for a_k in a[2:]:
+            # T_k+1 = 2 (H / r) T_k - T_k-1
+            self._apply(T_cur, T_next, work)
+            T_next *= 2.0 / r
+            T_next -= T_prev
+            np.multiply(T_next, a_k, out=work)
+            out += work
+            T_prev, T_cur, T_next = T_cur, T_next, T_prev
+        return out
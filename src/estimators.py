@@ -0,0 +1,189 @@
+# src/estimators.py
+import numpy as np
+
+from src.bitstrings import n_words, pack_bits, popcount
+
+# Observables of packed shots (src/bitstrings.py layout) computed without
+# unpacking them to (shots, L) arrays. With Z_i = 1 - 2 b_i:
+#   - the imbalance needs only popcounts under even/odd sign masks,
+#   - <Z_i> needs the number of set bits at every position, counted from a
+#     histogram of byte values per byte column,
+#   - <Z_i Z_{i+d}> is the same count on rows XORed with themselves
+#     shifted by d sites (b_i xor b_{i+d} = 1 exactly when Z_i Z_{i+d} = -1).
+# Chunks are processed CHUNK_SHOTS rows at a time, so temporaries stay small.
+
+CHUNK_SHOTS = 1 << 16
+
+# _BYTE_BITS[v, k] = bit k of byte value v
+_BYTE_BITS = ((np.arange(256)[:, None] >> np.arange(8)) & 1).astype(np.int64)
+
+def parity_masks(num_qubits):
+    """Packed (even-site mask, odd-site mask), one row each."""
+    sites = np.arange(num_qubits)
+    return pack_bits((sites % 2 == 0)[None, :]), pack_bits((sites % 2 == 1)[None, :])
+
+def imbalance_counts(words, num_qubits):
+    """Per-shot k = (set bits on even sites) - (set bits on odd sites)."""
+    even, odd = parity_masks(num_qubits)
+    return popcount(words & even) - popcount(words & odd)
+
+def packed_imbalance(words, num_qubits):
+    """
+    Per-shot imbalance (1/L) sum_i (-1)^i Z_i of packed uint64 rows:
+    with Z_i = 1 - 2 b_i it is (n_even - n_odd - 2 (|b & even| - |b & odd|)) / L.
+    """
+    n_even = (num_qubits + 1) // 2
+    k = imbalance_counts(words, num_qubits)
+    return (n_even - (num_qubits - n_even) - 2.0 * k) / num_qubits
+
+def bit_counts(words, num_qubits, chunk_shots=CHUNK_SHOTS, counts=None):
+    """
+    Number of shots with bit i set, for every site i (int64, length L).
+    `counts` optionally gives the multiplicity of each row (e.g. distinct
+    rows from np.unique).
+    """
+    words = np.ascontiguousarray(words, dtype='<u8')
+    as_bytes = words.view(np.uint8)
+    columns = as_bytes.shape[1]
+    # Bin of byte value v in column c is 256 c + v; intp so any L fits
+    offsets = np.arange(columns, dtype=np.intp) * 256
+    histogram = np.zeros(columns * 256, dtype=np.int64)
+    for start in range(0, len(as_bytes), chunk_shots):
+        block = as_bytes[start:start + chunk_shots] + offsets
+        weights = None if counts is None else np.repeat(counts[start:start + chunk_shots], columns)
+        histogram += np.bincount(block.ravel(), weights=weights, minlength=columns * 256).astype(np.int64)
+    return (histogram.reshape(columns, 256) @ _BYTE_BITS).reshape(-1)[:num_qubits]
+
+def shift_sites(words, d):
+    """Rows moved down by d sites: bit i of the result is bit i + d of the input."""
+    q, r = divmod(d, 64)
+    shifted = np.zeros_like(words)
+    if q >= words.shape[1]:
+        return shifted
+    shifted[:, :words.shape[1] - q] = words[:, q:]
+    if r:
+        carry = np.zeros_like(shifted)
+        carry[:, :-1] = shifted[:, 1:] << np.uint64(64 - r)
+        shifted = (shifted >> np.uint64(r)) | carry
+    return shifted
+
+class ShotStatistics:
+    """
+    Streaming estimator over the packed shots of one realization: feed
+    chunks with update() (or merge() two partial results) and read the
+    imbalance, per-site magnetizations <Z_i> and two-point correlators
+    <Z_i Z_{i+d}> for the requested distances, with error bars.
+
+    State is a histogram of the per-shot imbalance (L + 1 bins) and
+    per-site bit counts, so memory does not grow with the number of shots
+    and the imbalance bootstrap is exact and cheap: shots are resampled as
+    a multinomial over the histogram bins.
+
+    Args:
+        num_qubits: Bits per shot
+        distances: Correlator distances d
+    """
+    def __init__(self, num_qubits, distances=(1,)):
+        self.num_qubits = num_qubits
+        self.distances = tuple(sorted(set(distances)))
+        self.n = 0
+        self._n_odd = num_qubits // 2
+        self._histogram = np.zeros(num_qubits + 1, dtype=np.int64)
+        self._ones = np.zeros(num_qubits, dtype=np.int64)
+        self._differ = {d: np.zeros(max(num_qubits - d, 0), dtype=np.int64) for d in self.distances}
+
+    def update(self, words):
+        """Adds a chunk of packed uint64 rows."""
+        words = np.ascontiguousarray(words, dtype='<u8')
+        if words.shape[1] != n_words(self.num_qubits):
+            raise ValueError(f"Expected {n_words(self.num_qubits)} words per shot, got {words.shape[1]}.")
+        for start in range(0, len(words), CHUNK_SHOTS):
+            chunk = words[start:start + CHUNK_SHOTS]
+            k = imbalance_counts(chunk, self.num_qubits)
+            self._histogram += np.bincount(k + self._n_odd, minlength=len(self._histogram))
+            self._ones += bit_counts(chunk, self.num_qubits)
+            for d, differ in self._differ.items():
+                differ += bit_counts(chunk ^ shift_sites(chunk, d), self.num_qubits)[:len(differ)]
+            self.n += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Combines the counts of another ShotStatistics over the same sites."""
+        if (other.num_qubits, other.distances) != (self.num_qubits, self.distances):
+            raise ValueError("Can only merge statistics over the same sites and distances.")
+        self.n += other.n
+        self._histogram += other._histogram
+        self._ones += other._ones
+        for d in self.distances:
+            self._differ[d] += other._differ[d]
+        return self
+
+    def _imbalance_values(self):
+        """Imbalance of each histogram bin."""
+        k = np.arange(len(self._histogram)) - self._n_odd
+        n_even = self.num_qubits - self._n_odd
+        return (n_even - self._n_odd - 2.0 * k) / self.num_qubits
+
+    @property
+    def imbalance(self):
+        """Shot-averaged imbalance."""
+        return float(self._histogram @ self._imbalance_values() / self.n) if self.n else float('nan')
+
+    def imbalance_error(self, n_boot=None, seed=None):
+        """
+        Standard error of the imbalance: analytic (from the histogram's
+        variance) by default, or from n_boot bootstrap resamples.
+        """
+        if self.n < 2:
+            return float('inf')
+        values = self._imbalance_values()
+        if n_boot is None:
+            variance = self._histogram @ (values - self.imbalance)**2 / (self.n - 1)
+            return float(np.sqrt(variance / self.n))
+        rng = np.random.default_rng(seed)
+        resampled = rng.multinomial(self.n, self._histogram / self.n, size=n_boot) @ values / self.n
+        return float(resampled.std(ddof=1))
+
+    @property
+    def magnetizations(self):
+        """<Z_i> for every site."""
+        return 1.0 - 2.0 * self._ones / self.n
+
+    @property
+    def magnetization_errors(self):
+        """Standard errors of <Z_i> (Z_i = +-1, so Var = 1 - <Z_i>^2)."""
+        return np.sqrt(np.maximum(1.0 - self.magnetizations**2, 0.0) / self.n)
+
+    def zz(self, d=1):
+        """<Z_i Z_{i+d}> for i = 0 .. L-d-1."""
+        return 1.0 - 2.0 * self._differ[d] / self.n
+
+    def zz_errors(self, d=1):
+        return np.sqrt(np.maximum(1.0 - self.zz(d)**2, 0.0) / self.n)
+
+    def connected_zz(self, d=1):
+        """<Z_i Z_{i+d}> - <Z_i><Z_{i+d}>."""
+        z = self.magnetizations
+        return self.zz(d) - z[:self.num_qubits - d] * z[d:]
+
+    def summary(self):
+        """JSON-friendly dict of every estimate."""
+        return {'shots': self.n, 'imbalance': self.imbalance, 'imbalance_error': self.imbalance_error(),
+                'magnetizations': self.magnetizations.tolist(),
+                'zz': {str(d): self.zz(d).tolist() for d in self.distances}}
+
+def shot_statistics(chunks, num_qubits, distances=(1,)):
+    """ShotStatistics over an iterable of packed chunks (e.g. ResultReader.shot_chunks)."""
+    stats = ShotStatistics(num_qubits, distances)
+    for chunk in chunks:
+        stats.update(chunk)
+    return stats
+
+def bootstrap_mean(values, n_boot=1000, seed=None):
+    """(mean, bootstrap standard error) of per-realization values, e.g. imbalances."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return float(values.mean()) if len(values) else float('nan'), 0.0
+    rng = np.random.default_rng(seed)
+    means = values[rng.integers(0, len(values), size=(n_boot, len(values)))].mean(axis=1)
+    return float(values.mean()), float(means.std(ddof=1))
@@ -0,0 +1,341 @@
+# src/hamiltonian.py
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import LinearOperator
+
+# Up to this dimension, handing expm_multiply the CSR form (assembled by
+# index arithmetic, no kron) is cheaper: scipy can take its exact 1-norm
+# instead of running onenormest. Above it the matrix-free form keeps memory
+# at O(2^L).
+ASSEMBLE_MAX_DIM = 2**16
+
+# Site convention (matches the kron chains of lazarus_v2/v4):
+# site 0 is the most significant bit of the basis index, so site i
+# lives on bit (L - 1 - i). Bit value 0 -> Z = +1, bit value 1 -> Z = -1.
+
+
+def z_diagonal(weights, out=None):
+    """
+    Diagonal of sum_i w_i Z_i in the computational basis.
+
+    Built with L strided broadcasts (one per site), never with kron chains.
+    """
+    weights = np.asarray(weights, dtype=float)
+    L = len(weights)
+    if out is None:
+        out = np.zeros(2**L)
+    else:
+        out[:] = 0.0
+    for i, w in enumerate(weights):
+        view = out.reshape(2**i, 2, -1)
+        view[:, 0, :] += w
+        view[:, 1, :] -= w
+    return out
+
+
+def imbalance_diagonal(L):
+    """Diagonal of the staggered magnetisation sum_i (-1)^i Z_i."""
+    return z_diagonal((-1.0) ** np.arange(L))
+
+
+def z_projections(vec):
+    """
+    Returns [sum_k z_i(k) vec_k for i in range(L)], i.e. the contraction of a
+    basis-indexed vector with every single-site Z diagonal.
+    """
+    L = int(np.log2(len(vec)))
+    proj = np.empty(L, dtype=np.result_type(vec, float))
+    for i in range(L):
+        halves = vec.reshape(2**i, 2, -1).sum(axis=(0, 2))
+        proj[i] = halves[0] - halves[1]
+    return proj
+
+
+def xx_projections(bra, ket):
+    """Returns [<bra|X_i X_{i+1}|ket> for every bond i]."""
+    L = int(np.log2(len(ket)))
+    proj = np.empty(L - 1, dtype=np.result_type(bra, ket, float))
+    for i in range(L - 1):
+        shape = (2**i, 4, -1)
+        proj[i] = np.vdot(bra.reshape(shape), ket.reshape(shape)[:, ::-1])
+    return proj
+
+
+def parity_bits(n):
+    """Parity (popcount mod 2) of every n-bit index, as uint8."""
+    par = np.zeros(1, dtype=np.uint8)
+    for _ in range(n):
+        # Setting a new leading bit flips the parity of every existing index
+        par = np.concatenate([par, 1 - par])
+    return par
+
+
+def state_parity(psi):
+    """Returns 0/1 if psi lies entirely in one Z-parity sector, else None."""
+    L = int(np.log2(len(psi)))
+    sectors = np.unique(parity_bits(L)[np.flatnonzero(psi)])
+    return int(sectors[0]) if len(sectors) == 1 else None
+
+
+def to_parity_sector(H, psi, *diagonals):
+    """
+    Moves (H, psi, diagonal observables) into the Z-parity block that psi
+    lives in, so solvers run in dimension 2^(L-1). Returns the inputs
+    unchanged if H is already sector-resolved or psi mixes both sectors.
+    """
+    parity = None if H.parity is not None else state_parity(psi)
+    if parity is None:
+        return (H, psi) + diagonals
+    H_sector = H.sector(parity)
+    return (H_sector, H_sector.restrict(psi)) + tuple(H_sector.restrict(d) for d in diagonals)
+
+
+class ChainHamiltonian(LinearOperator):
+    """
+    Matrix-free H = sum_i J_i X_i X_{i+1} + sum_i h_i Z_i.
+
+    The Z part (and any other diagonal observable) is stored as a single
+    precomputed vector. Each X_i X_{i+1} term flips bits i and i+1: viewing
+    the state as a (2^i, 4, rest) tensor, the flip maps the two-bit index
+    00<->11 and 01<->10, i.e. it reverses the middle axis. H.psi therefore
+    needs no index arrays and no operator storage beyond O(2^L).
+
+    H conserves the global Z-parity prod_i Z_i. With parity=0/1 the operator
+    acts on that block only (dimension 2^(L-1)). A sector state is indexed by
+    the bits of sites 0..L-2; the bit of site L-1 follows from the parity, so
+    the last bond flips a single index bit. restrict()/embed() map vectors
+    between the sector and the full space.
+
+    Scalar multiples (as formed by expm_multiply, e.g. -1j*dt*H) are
+    ScaledChainOperators with the factor folded into the couplings and the
+    diagonal, so they stay matrix-free and cost no extra passes over the
+    state.
+    """
+    def __init__(self, J, h, parity=None):
+        self.h = np.array(h, dtype=float)
+        self.J = np.array(J, dtype=float)
+        self.L = len(self.h)
+        if len(self.J) != self.L - 1:
+            raise ValueError(f"Expected {self.L - 1} couplings for L={self.L}, got {len(self.J)}.")
+        if parity not in (None, 0, 1):
+            raise ValueError(f"Parity sector must be 0, 1 or None, got {parity}.")
+        self.parity = parity
+        self.n_bits = self.L if parity is None else self.L - 1
+        self.dim = 2**self.n_bits
+        super().__init__(dtype=np.float64, shape=(self.dim, self.dim))
+        self._basis = None
+        if parity is not None:
+            # Z of site L-1, implied by the parity of the remaining bits
+            self._z_last = 1.0 - 2.0 * (parity_bits(self.n_bits) ^ parity)
+        self.diag = self.z_diagonal(self.h)
+
+    def z_diagonal(self, weights, out=None):
+        """Diagonal of sum_i w_i Z_i in this operator's basis."""
+        if self.parity is None:
+            return z_diagonal(weights, out=out)
+        out = z_diagonal(weights[:-1], out=out)
+        out += weights[-1] * self._z_last
+        return out
+
+    def set_fields(self, h):
+        """Replace the on-site fields in place (no reallocation)."""
+        self.h[:] = h
+        self.z_diagonal(self.h, out=self.diag)
+
+    def set_couplings(self, J):
+        self.J[:] = J
+
+    def sector(self, parity):
+        """The same Hamiltonian restricted to one Z-parity block."""
+        return ChainHamiltonian(self.J, self.h, parity=parity)
+
+    def basis(self):
+        """Full-space index of every basis state of this operator."""
+        if self._basis is None:
+            k = np.arange(self.dim)
+            if self.parity is None:
+                self._basis = k
+            else:
+                self._basis = (k << 1) | (parity_bits(self.n_bits) ^ self.parity)
+        return self._basis
+
+    def restrict(self, vec):
+        """Full-space vector(s) -> this operator's basis."""
+        return vec if self.parity is None else vec[self.basis()]
+
+    def embed(self, vec):
+        """This operator's basis -> full-space vector(s)."""
+        if self.parity is None:
+            return vec
+        full = np.zeros((2**self.L,) + vec.shape[1:], dtype=vec.dtype)
+        full[self.basis()] = vec
+        return full
+
+    def bond_mask(self, i):
+        """Index bits flipped by X_i X_{i+1} in this operator's basis."""
+        if i == self.n_bits - 1:
+            # Sector mode, last bond: site L-1 is implicit
+            return 1
+        return (1 << (self.n_bits - 1 - i)) | (1 << (self.n_bits - 2 - i))
+
+    def apply(self, psi, out=None, work=None):
+        """
+        Returns H.psi for a vector (dim,) or a block of vectors (dim, k).
+        With `out` and a scratch buffer `work` shaped like psi, nothing is
+        allocated.
+        """
+        return _chain_apply(self.diag, self.J, self.n_bits, psi, out, work)
+
+    def z_projections(self, vec):
+        """[sum_k z_i(k) vec_k for every site i] in this operator's basis."""
+        if self.parity is None:
+            return z_projections(vec)
+        return np.append(z_projections(vec), np.dot(self._z_last, vec))
+
+    def xx_projections(self, bra, ket):
+        """[<bra|X_i X_{i+1}|ket> for every bond i] in this operator's basis."""
+        if self.parity is None:
+            return xx_projections(bra, ket)
+        last = np.vdot(bra.reshape(-1, 2), ket.reshape(-1, 2)[:, ::-1])
+        return np.append(xx_projections(bra, ket), last)
+
+    def _matvec(self, x):
+        return self.apply(x)
+
+    def _matmat(self, X):
+        return self.apply(X)
+
+    def _adjoint(self):
+        return self
+
+    def __mul__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, x)
+        return super().__mul__(x)
+
+    def __rmul__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, x)
+        return super().__rmul__(x)
+
+    def __truediv__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, 1.0 / x)
+        return super().__truediv__(x)
+
+    def __neg__(self):
+        return ScaledChainOperator(self.J, self.diag, self.n_bits, -1.0)
+
+    def trace(self):
+        # Every Pauli string in H is traceless, also within a parity block
+        return 0.0
+
+    def spectral_bound(self):
+        """
+        Bound on |eigenvalues| from the fields and couplings alone (O(L)):
+        every diagonal entry is sum_i +-h_i, and each bond adds at most |J_i|.
+        """
+        return float(np.abs(self.h).sum() + np.abs(self.J).sum())
+
+    def onenorm(self):
+        """Exact induced 1-norm: each column holds one diagonal entry plus one J_i per bond."""
+        return float(np.abs(self.diag).max() + np.abs(self.J).sum())
+
+    def operator(self):
+        """The form of H to hand to expm_multiply (see ASSEMBLE_MAX_DIM)."""
+        return self.to_sparse() if self.dim <= ASSEMBLE_MAX_DIM else self
+
+    def to_sparse(self):
+        """Assembles H as CSR (for eigensolvers / small-L checks)."""
+        idx = np.arange(self.dim)
+        rows = [idx]
+        cols = [idx]
+        vals = [self.diag]
+        for i, J in enumerate(self.J):
+            rows.append(idx)
+            cols.append(idx ^ self.bond_mask(i))
+            vals.append(np.full(self.dim, J))
+        return csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(self.dim, self.dim))
+
+
+class ScaledChainOperator(LinearOperator):
+    """
+    scale * H for a ChainHamiltonian H (any scalar, e.g. -1j*dt), with the
+    factor folded into copies of its couplings and diagonal. Further scalar
+    multiples fold the same way; anything else is plain LinearOperator
+    arithmetic.
+    """
+    def __init__(self, J, diag, n_bits, scale=1.0):
+        self.J = scale * np.asarray(J)
+        self.diag = scale * np.asarray(diag)
+        self.n_bits = n_bits
+        self.dim = 2**n_bits
+        super().__init__(dtype=np.result_type(self.J, self.diag), shape=(self.dim, self.dim))
+
+    def apply(self, psi, out=None, work=None):
+        """As ChainHamiltonian.apply."""
+        return _chain_apply(self.diag, self.J, self.n_bits, psi, out, work)
+
+    def _matvec(self, x):
+        return self.apply(x)
+
+    def _matmat(self, X):
+        return self.apply(X)
+
+    def _adjoint(self):
+        return ScaledChainOperator(np.conj(self.J), np.conj(self.diag), self.n_bits)
+
+    def __mul__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, x)
+        return super().__mul__(x)
+
+    def __rmul__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, x)
+        return super().__rmul__(x)
+
+    def __truediv__(self, x):
+        if np.isscalar(x):
+            return ScaledChainOperator(self.J, self.diag, self.n_bits, 1.0 / x)
+        return super().__truediv__(x)
+
+    def __neg__(self):
+        return ScaledChainOperator(self.J, self.diag, self.n_bits, -1.0)
+
+    def trace(self):
+        return complex(self.diag.sum())
+
+    def onenorm(self):
+        """Exact induced 1-norm, as ChainHamiltonian.onenorm."""
+        return float(np.abs(self.diag).max() + np.abs(self.J).sum())
+
+
+def _chain_apply(diag, J, n_bits, psi, out=None, work=None):
+    """(diag + sum_i J_i X_i X_{i+1}) psi over n_bits index bits (see ChainHamiltonian)."""
+    psi = np.ascontiguousarray(psi)
+    extra = psi.shape[1:]
+    dim = 2**n_bits
+    diag = diag.reshape((dim,) + (1,) * len(extra))
+    if out is None:
+        out = diag * psi
+    else:
+        np.multiply(diag, psi, out=out)
+
+    for i, J_i in enumerate(J):
+        if J_i == 0.0:
+            continue
+        if i < n_bits - 1:
+            shape = (2**i, 4, 2**(n_bits - i - 2)) + extra
+        else:
+            # Sector mode, last bond: site L-1 is implicit
+            shape = (2**(n_bits - 1), 2) + extra
+        flipped = psi.reshape(shape)[:, ::-1]
+        if work is None:
+            out.reshape(shape)[...] += J_i * flipped
+        else:
+            scaled = work.reshape(shape)
+            np.multiply(flipped, J_i, out=scaled)
+            out.reshape(shape)[...] += scaled
+    return out
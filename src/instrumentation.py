@@ -0,0 +1,198 @@
+# src/instrumentation.py
+import os
+import sys
+import json
+import atexit
+import time
+import threading
+import functools
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Unavailable on Windows
+    resource = None
+
+# Lightweight tracing for the pipeline's hot paths: stage spans, named
+# counters and peak-RSS samples, exported as a Chrome trace
+# (chrome://tracing or ui.perfetto.dev). Everything is a no-op until
+# enable() is called (or LAZARUS_TRACE=<path> is set), so instrumented code
+# pays one global check per call when tracing is off. Only the calling
+# process is traced; work done in process-pool workers is not.
+
+_enabled = False
+_trace_path = None
+_origin = 0.0
+_events = []
+_counters = {}
+_span_totals = {}
+_tracks = {}
+_lock = threading.Lock()
+
+def enabled():
+    return _enabled
+
+def enable(trace_path=None):
+    """Starts collecting (clearing any previous data); export() writes to trace_path."""
+    global _enabled, _trace_path, _origin
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _span_totals.clear()
+        _tracks.clear()
+        _trace_path = trace_path
+        _origin = time.perf_counter()
+        _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def configure(config=None, trace_path=None):
+    """
+    Enables tracing from a CLI path or the `instrumentation` config section:
+        instrumentation:
+          enabled: true
+          trace_path: "./results/trace.json"
+    Returns the trace path in effect (None when tracing stays off).
+    """
+    section = (config or {}).get('instrumentation') or {}
+    path = trace_path or (section.get('trace_path', 'lazarus_trace.json') if section.get('enabled') else None)
+    if path:
+        enable(path)
+    return path
+
+def _now_us():
+    return (time.perf_counter() - _origin) * 1e6
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def _tid(track):
+    if track is None:
+        return threading.get_ident()
+    return _tracks.setdefault(track, len(_tracks) + 1)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'track', 'args', 'start')
+
+    def __init__(self, name, track, args):
+        self.name = name
+        self.track = track
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = _now_us()
+        rss = peak_rss_mb()
+        args = dict(self.args, peak_rss_mb=rss) if rss is not None else self.args
+        with _lock:
+            _events.append({'name': self.name, 'ph': 'X', 'ts': self.start, 'dur': end - self.start,
+                            'pid': os.getpid(), 'tid': _tid(self.track), 'args': args})
+            calls, total = _span_totals.get(self.name, (0, 0.0))
+            _span_totals[self.name] = (calls + 1, total + (end - self.start) / 1e6)
+            if rss is not None:
+                _events.append({'name': 'peak_rss_mb', 'ph': 'C', 'ts': end, 'pid': os.getpid(),
+                                'args': {'peak_rss_mb': rss}})
+        return False
+
+    def set(self, **args):
+        """Attaches values (e.g. result sizes) to the span."""
+        self.args.update(args)
+
+def span(name, track=None, **args):
+    """
+    Context manager timing one stage. `track` groups spans on their own
+    row in the trace viewer (e.g. one per monitored device).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, track, args)
+
+def traced(name=None):
+    """Decorator form of span()."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, None, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    """Adds n to a named counter."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def summary():
+    """{'spans': {name: {'calls', 'seconds'}}, 'counters': {...}, 'peak_rss_mb': ...}"""
+    with _lock:
+        return {'spans': {name: {'calls': calls, 'seconds': total}
+                          for name, (calls, total) in _span_totals.items()},
+                'counters': dict(_counters),
+                'peak_rss_mb': peak_rss_mb()}
+
+def export(path=None):
+    """
+    Writes the Chrome trace (JSON object format, with the summary under
+    'summary') to path or the enable() path. Returns the path written.
+    """
+    path = path or _trace_path
+    if path is None:
+        return None
+    with _lock:
+        events = list(_events)
+        names = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': str(track)}}
+                 for track, tid in _tracks.items()]
+        counters = [{'name': name, 'ph': 'C', 'ts': _now_us(), 'pid': os.getpid(), 'args': {name: value}}
+                    for name, value in _counters.items()]
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'traceEvents': names + events + counters, 'displayTimeUnit': 'ms',
+                   'summary': summary()}, f)
+    os.replace(tmp_path, path)
+    return path
+
+def print_summary():
+    report = summary()
+    print("[*] Instrumentation summary:")
+    for name, stats in sorted(report['spans'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"    {name:<28} {stats['seconds']:9.3f} s  ({stats['calls']} calls)")
+    for name, value in sorted(report['counters'].items()):
+        print(f"    {name:<28} {value}")
+    if report['peak_rss_mb'] is not None:
+        print(f"    {'peak RSS':<28} {report['peak_rss_mb']:.1f} MB")
+
+if os.environ.get('LAZARUS_TRACE') and multiprocessing.parent_process() is None:
+    # Tracing for scripts without a --trace option (e.g. lazarus_v4.py).
+    # Pool workers inherit the variable (and re-import this module under
+    # spawn); only the main process may own and write the trace file.
+    enable(os.environ['LAZARUS_TRACE'])
+    atexit.register(export)
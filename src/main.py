@@ -1,96 +1,411 @@
-# src/main.py
-import argparse
-import yaml
-import numpy as np
-import cirq
-from src.mapping import get_sycamore_graph, find_snake_path
-from src.compiler import compile_aubry_andre_trotter_step
-from src.noise_models import SycamoreNoiseModel
-# [CRITICAL UPDATE] Import the REM module
-from src.rem import ReadoutErrorMitigator
-
-def load_config(path):
-    with open(path, 'r') as f:
-        return yaml.safe_load(f)
-
-def run_simulation(config):
-    # 1. Setup System
-    L = config['system']['L']
-    J = config['system']['J']
-    Delta = config['system']['Delta']
-    W = config['system']['W']
-    beta = config['system']['beta']
-    
-    print(f"[*] Initializing Sycamore Supremacy Protocol (L={L}, Delta={Delta})...")
-
-    # 2. Hardware Mapping
-    print("[*] Mapping to Sycamore Hardware Topology...")
-    G = get_sycamore_graph()
-    qubits = find_snake_path(G, length=L)
-    if len(qubits) < L:
-        raise ValueError(f"Could not find path of length {L} on available hardware.")
-    print(f"    -> Found optimized path on {len(qubits)} qubits.")
-
-    # 3. Build Circuit
-    print("[*] Compiling Native FSIM Circuit...")
-    circuit = cirq.Circuit()
-    
-    # Initialize Néel State |0101...>
-    init_moments = []
-    for i, q in enumerate(qubits):
-        if i % 2 == 1:
-            init_moments.append(cirq.X(q))
-    circuit.append(cirq.Moment(init_moments))
-
-    # Time Evolution
-    dt = config['simulation']['dt']
-    steps = config['simulation']['steps']
-    realizations = config['simulation'].get('realizations', 1)
-    
-    for r in range(realizations):
-        phi = 2.0 * np.pi * (r / realizations) 
-        V = [W * np.cos(2 * np.pi * beta * i + phi) for i in range(L)]
-        for step in range(steps):
-            step_circuit = compile_aubry_andre_trotter_step(qubits, J, Delta, V, dt)
-            circuit.append(step_circuit)
-            
-    # Measure all qubits at the end
-    circuit.append(cirq.measure(*qubits, key='result'))
-
-    # 4. Apply Noise & Error Mitigation
-    if config['hardware'].get('noise') == 'sycamore_2025':
-        print("[*] Applying Sycamore High-Fidelity Noise Model (T1/Tphi/ZZ)...")
-        noise_model = SycamoreNoiseModel()
-        circuit = circuit.with_noise(noise_model)
-        
-        # [CRITICAL UPDATE] Activate REM
-        print("[*] Activating Enterprise Readout Error Mitigation (REM)...")
-        rem = ReadoutErrorMitigator(num_qubits=L)
-        # Note: We don't simulate the full inversion here to avoid OOM, 
-        # but we instantiate the object to prove intent to the auditor.
-        calibration_matrix = rem.calibrate_on_hardware("Sycamore_Sim")
-        print(f"    -> Calibrated Inverse Confusion Matrix (Condition Number: {np.linalg.cond(calibration_matrix):.2f})")
-
-    # 5. Execution / Verification
-    print("-" * 40)
-    print(f"[*] Circuit Construction Complete.")
-    print(f"    Depth: {len(circuit)}")
-    print(f"    FSIM Gates: {sum(1 for op in circuit.all_operations() if isinstance(op.gate, cirq.FSimGate))}")
-    
-    if L > 20:
-        print(f"[!] REGIME WARNING: System size L={L} is in the Volume Law regime.")
-        print("[!] Classical simulation is intractable.")
-        print("[!] Ready for submission to Google Quantum AI Service.")
-    else:
-        print("[*] Executing verification simulation...")
-        sim = cirq.DensityMatrixSimulator()
-        result = sim.simulate(circuit)
-        print("    Simulation successful. Imbalance preserved.")
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Stage V: Sycamore Supremacy')
-    parser.add_argument('--config', type=str, required=True, help='Path to configuration YAML')
-    args = parser.parse_args()
-    
-    config = load_config(args.config)
-    run_simulation(config)
+# src/main.py
+import argparse
+import collections
+import yaml
+import numpy as np
+import cirq
+from concurrent.futures import ProcessPoolExecutor
+from src.mapping import get_sycamore_graph, find_snake_path
+from src.compiler import get_trotter_step_template
+from src.noise_models import SycamoreNoiseModel, ReadoutNoiseSampler
+from src.trajectories import TrajectoryRunner
+from src.statevector import TrotterSimulator, NATIVE_MAX_L, SINGLE_PRECISION_MIN_L
+from src.results import ResultStore, ResultReader
+from src.estimators import packed_imbalance, ShotStatistics
+from src.bitstrings import pack_bits
+from src.sampling import readout_flips
+from src import instrumentation
+# [CRITICAL UPDATE] Import the REM module
+from src.rem import ReadoutErrorMitigator
+
+def load_config(path):
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
+
+def run_simulation(config):
+    # 1. Setup System
+    L = config['system']['L']
+    J = config['system']['J']
+    Delta = config['system']['Delta']
+    W = config['system']['W']
+    beta = config['system']['beta']
+    
+    print(f"[*] Initializing Sycamore Supremacy Protocol (L={L}, Delta={Delta})...")
+
+    # 2. Hardware Mapping
+    print("[*] Mapping to Sycamore Hardware Topology...")
+    with instrumentation.span('mapping', L=L):
+        G = get_sycamore_graph()
+        qubits = find_snake_path(G, length=L)
+    if len(qubits) < L:
+        raise ValueError(f"Could not find path of length {L} on available hardware.")
+    print(f"    -> Found optimized path on {len(qubits)} qubits.")
+
+    # 3. Build Circuits (one per disorder realization)
+    print("[*] Compiling Native FSIM Circuit...")
+    sim_cfg = config['simulation']
+    realizations = sim_cfg.get('realizations', 1)
+    phases = disorder_phases(realizations)
+    
+    # 4. Noise (readout error mitigation is set up once the backend is known)
+    noise_model = rem = device_readout = None
+    if config['hardware'].get('noise') == 'sycamore_2025':
+        print("[*] Applying Sycamore High-Fidelity Noise Model (T1/Tphi/ZZ)...")
+        # ZZ crosstalk only on couplers of the mapped device
+        with instrumentation.span('noise_model'):
+            noise_model = SycamoreNoiseModel(device_graph=G)
+    store = open_result_store(config, qubits, phases)
+
+    # Circuits are built lazily; only the first one is materialised for the report
+    with instrumentation.span('compile'):
+        _, circuit = next(realization_circuits(qubits, config, phases[:1]))
+    if noise_model is not None and instrumentation.enabled():
+        # Wrapping cost for one realization, traced only (the runs wrap their own circuits)
+        with instrumentation.span('noise_wrapping'):
+            circuit.with_noise(noise_model)
+
+    # 5. Execution / Verification
+    print("-" * 40)
+    print(f"[*] Circuit Construction Complete ({realizations} realizations).")
+    print(f"    Depth per realization: {len(circuit)}")
+    print(f"    FSIM Gates per realization: {sum(1 for op in circuit.all_operations() if isinstance(op.gate, cirq.FSimGate))}")
+    
+    # Noisy runs need trajectories or density matrices; noiseless ones go
+    # to the native statevector backend, which reaches further
+    max_L = 20 if noise_model is not None else NATIVE_MAX_L
+    if L <= max_L and (noise_model is not None or config['hardware'].get('readout_error')) \
+            and measures_shots(sim_cfg, noise_model):
+        # [CRITICAL UPDATE] Activate REM
+        print("[*] Activating Enterprise Readout Error Mitigation (REM)...")
+        rem = ReadoutErrorMitigator(num_qubits=L)
+        # Mitigation works on per-qubit inverses and the observed-bitstring
+        # subspace, so no 2^L matrix is ever formed. The device is simulated
+        # with the Sycamore-like default A; the mitigator only sees its own
+        # calibrated estimate of it.
+        device_readout = rem.A_qubits.copy()
+        device = ReadoutNoiseSampler(dict(zip(qubits, device_readout)))
+        with instrumentation.span('rem_calibration'):
+            calibration_matrix = rem.calibrate_on_hardware("Sycamore_Sim", qubits=qubits, sampler=device,
+                                                           cache_dir=config['hardware'].get('calibration_cache'))
+        print(f"    -> Calibrated Inverse Confusion Matrix (Worst Condition Number: {np.linalg.cond(calibration_matrix).max():.2f})")
+    if L > max_L:
+        print(f"[!] REGIME WARNING: System size L={L} is in the Volume Law regime.")
+        print("[!] Classical simulation is intractable.")
+        print("[!] Ready for submission to Google Quantum AI Service.")
+        if store is not None:
+            store.write_summary(status='awaiting_hardware', realizations=realizations)
+    else:
+        print("[*] Executing verification simulation...")
+        with instrumentation.span('verification', realizations=realizations):
+            mean, err = verify_imbalance(config, qubits, noise_model=noise_model, verbose=True, store=store,
+                                         readout=rem, device_readout=device_readout)
+        print(f"    Simulation successful. Disorder-averaged imbalance: {mean:.4f} +/- {err:.4f}")
+        if store is not None:
+            store.write_summary(status='complete', realizations=realizations,
+                                imbalance={'mean': mean, 'error': err})
+    if store is not None:
+        store.close()
+        print(f"[*] Results written to {store.path}")
+
+def open_result_store(config, qubits, phases):
+    """
+    ResultStore for the `output` section of config (None without a
+    save_path): output.format picks the summary sidecar ('json'/'yaml'),
+    output.packing ('uint64'/'uint8'), output.chunk_shots and output.mode
+    ('w'/'a') are passed through.
+    """
+    out_cfg = config.get('output') or {}
+    if not out_cfg.get('save_path'):
+        return None
+    # Sections that do not change the results stay out, so a resumed run
+    # (output.mode 'a') matches the stored metadata
+    run_config = {key: value for key, value in config.items() if key not in ('output', 'instrumentation')}
+    metadata = {'config': run_config, 'qubits': [str(q) for q in qubits], 'phases': phases}
+    return ResultStore(out_cfg['save_path'], num_qubits=len(qubits), metadata=metadata,
+                       packing=out_cfg.get('packing', 'uint64'),
+                       chunk_shots=out_cfg.get('chunk_shots', 1 << 20),
+                       summary_format=out_cfg.get('format', 'json'), mode=out_cfg.get('mode', 'w'))
+
+def verify_imbalance(config, qubits, noise_model=None, sampler=None, verbose=False, store=None, readout=None,
+                     device_readout=None):
+    """
+    The MBL imbalance check: runs every disorder realization of `config`
+    on `qubits` and returns the disorder-averaged imbalance and its error.
+
+    Noisy runs use statevector trajectories unless simulation.backend is
+    'density_matrix'; noiseless runs use the native Trotter simulator
+    (src/statevector.py) unless it is 'cirq'. A cirq sampler (e.g. a hardware backend) can be
+    given instead, in which case simulation.shots are taken per realization.
+    With a ResultStore, measured shots (or, for trajectories, the
+    per-realization estimates) are streamed into it as they arrive; the
+    realizations it already completed (a resumed store, output.mode 'a')
+    are not run again but read back from it.
+
+    A ReadoutErrorMitigator as `readout` corrects the imbalance of every
+    backend that measures shots (see measures_shots). The simulated ones
+    flip their shots with `device_readout`, the confusion matrix
+    A[measured, true] of the simulated device (one 2x2 or one per qubit);
+    a sampler's shots are taken to carry the device's own. Trajectories
+    evaluate the imbalance exactly on each final state, so there is
+    nothing to mitigate there.
+    """
+    sim_cfg = config['simulation']
+    phases = disorder_phases(sim_cfg.get('realizations', 1))
+    done = sorted(store.completed) if store is not None else []
+    todo = [r for r in range(len(phases)) if r not in done]
+    if done and verbose:
+        print(f"    -> Resuming: {len(done)} realizations already in {store.path}")
+    if not todo:
+        imbalances = []
+    elif sampler is not None:
+        circuits = [circuit for _, circuit in realization_circuits(qubits, config, phases[todo])]
+        results = sampler.run_batch(circuits, repetitions=sim_cfg.get('shots', 1000))
+        imbalances = []
+        for r, result in zip(todo, results):
+            phi = phases[r]
+            bits = result[0].measurements['result']
+            if store is not None:
+                store.append_shots(r, bits, phi=phi)
+            imbalances.append(measured_imbalance(bits) if readout is None else readout.mitigated_imbalance(bits))
+    elif noise_model is None and sim_cfg.get('backend') != 'cirq':
+        imbalances = run_native(qubits, config, phases, verbose=verbose, store=store, readout=readout,
+                                device_readout=device_readout, realizations=todo)
+    elif noise_model is not None and sim_cfg.get('backend', 'trajectories') == 'trajectories':
+        # Statevector trajectories: O(2^L) memory instead of 4^L
+        runner = TrajectoryRunner(workers=sim_cfg.get('workers'),
+                                  max_trajectories=sim_cfg.get('trajectories', 1000),
+                                  target_error=sim_cfg.get('target_error'))
+        imbalances = []
+        for r, (phi, circuit) in zip(todo, realization_circuits(qubits, config, phases[todo])):
+            with instrumentation.span('trajectories', realization=r):
+                n, mean, err = runner.run(circuit, qubits, noise_model=noise_model, seed=r)
+            instrumentation.count('trajectories', n)
+            if verbose:
+                print(f"    -> Realization {r}: I={mean:.4f} +/- {err:.4f} ({n} trajectories)")
+            if store is not None:
+                store.record(r, phi=phi, imbalance=mean, error=err, trajectories=n)
+            imbalances.append(mean)
+    else:
+        imbalances = run_realizations(realization_circuits(qubits, config, phases[todo]),
+                                      shots=sim_cfg.get('shots', 1000), noise_model=noise_model,
+                                      workers=sim_cfg.get('workers'), store=store, readout=readout,
+                                      device_readout=device_readout, realizations=todo)
+    if done:
+        imbalances = np.concatenate([stored_imbalances(store.path, done, readout), imbalances])
+    return disorder_average(imbalances)
+
+def stored_imbalances(path, realizations, readout=None):
+    """
+    Imbalances of realizations already in the ResultStore at `path`: the
+    recorded trajectory estimate, else the (readout-corrected) imbalance
+    of the stored shots.
+    """
+    reader = ResultReader(path)
+    values = reader.values()
+    imbalances = []
+    for r in realizations:
+        if 'imbalance' in values.get(r, {}):
+            imbalances.append(values[r]['imbalance'])
+        elif readout is not None:
+            imbalances.append(reader.mitigated_imbalance(r, readout))
+        else:
+            imbalances.append(reader.imbalance(r))
+    return np.array(imbalances)
+
+def measures_shots(sim_cfg, noise_model=None):
+    """Whether verify_imbalance samples measurement shots (and so has readout error to mitigate)."""
+    return noise_model is None or sim_cfg.get('backend', 'trajectories') != 'trajectories'
+
+def run_native(qubits, config, phases, seed=None, verbose=False, store=None, readout=None, device_readout=None,
+               realizations=None):
+    """
+    Noiseless realizations on the native statevector simulator: evolves
+    the Néel state through `steps` Trotter steps and samples
+    simulation.shots from it as packed rows (src/sampling.py), as cirq
+    would from realization_circuits(). The confusion matrices
+    `device_readout` flip the sampled bits, and with a
+    ReadoutErrorMitigator as `readout` the imbalance is readout-corrected.
+    `realizations` restricts the run to those indices of `phases` (default
+    all). Returns their imbalances.
+    """
+    J, Delta = config['system']['J'], config['system']['Delta']
+    sim_cfg = config['simulation']
+    shots = sim_cfg.get('shots', 1000)
+    L = len(qubits)
+    template = get_trotter_step_template(qubits)
+    flips = readout_probabilities(device_readout)
+    seeds = np.random.SeedSequence(seed).spawn(len(phases))
+    imbalances = []
+    dtype = np.complex64 if L >= SINGLE_PRECISION_MIN_L else np.complex128
+    with TrotterSimulator(L, threads=sim_cfg.get('threads'), dtype=dtype) as sim:
+        for r in range(len(phases)) if realizations is None else realizations:
+            phi = phases[r]
+            values = template.param_values(J, Delta, on_site_potentials(config, phi), sim_cfg['dt'])
+            psi = sim.evolve(sim.neel_state(), values, sim_cfg['steps'])
+            with instrumentation.span('sampling', shots=shots):
+                packed = sim.sample(psi, shots, rng=seeds[r], readout=flips)
+            instrumentation.count('shots', shots)
+            del psi  # Free the state before the next realization allocates one
+            stats = ShotStatistics(L).update(packed)
+            if store is not None:
+                store.append_shots(r, packed, phi=phi)
+                store.record(r, magnetizations=stats.magnetizations, zz=stats.zz(1),
+                             imbalance_error=stats.imbalance_error())
+            if readout is None:
+                imbalances.append(stats.imbalance)
+            else:
+                imbalances.append(readout.mitigated_imbalance(packed))
+            if verbose:
+                print(f"    -> Realization {r}: I={imbalances[-1]:.4f} ({shots} shots)")
+    return np.array(imbalances)
+
+def readout_probabilities(confusion_matrix):
+    """(P(1|0), P(0|1)) of confusion matrices A[measured, true], as taken by readout_flips (None passes through)."""
+    if confusion_matrix is None:
+        return None
+    A = np.asarray(confusion_matrix, dtype=float)
+    return A[..., 1, 0], A[..., 0, 1]
+
+def disorder_phases(realizations):
+    """Quasi-periodic phases phi_r = 2 pi r / R, one per realization."""
+    return 2.0 * np.pi * np.arange(realizations) / realizations
+
+def on_site_potentials(config, phi):
+    L, W, beta = config['system']['L'], config['system']['W'], config['system']['beta']
+    return [W * np.cos(2 * np.pi * beta * i + phi) for i in range(L)]
+
+def neel_preparation(qubits):
+    """Initialize Néel State |0101...>"""
+    return cirq.Moment(cirq.X(q) for i, q in enumerate(qubits) if i % 2 == 1)
+
+def realization_circuits(qubits, config, phases):
+    """
+    Yields (phi, circuit) for each disorder phase: Néel preparation,
+    `steps` Trotter steps and a final measurement under key 'result'.
+    Circuits are produced one at a time, so peak memory is one realization.
+    """
+    J, Delta = config['system']['J'], config['system']['Delta']
+    dt, steps = config['simulation']['dt'], config['simulation']['steps']
+    # The step is compiled once for this path; each realization only
+    # resolves its on-site angles and repeats the resolved Moments.
+    template = get_trotter_step_template(qubits)
+    for phi in phases:
+        step_circuit = template.resolve(J, Delta, on_site_potentials(config, phi), dt)
+        circuit = cirq.Circuit(neel_preparation(qubits))
+        circuit.append(step_circuit.unfreeze(copy=False) * steps)
+        circuit.append(cirq.measure(*qubits, key='result'))
+        if instrumentation.enabled():
+            instrumentation.count('circuits_built')
+            instrumentation.count('gates_emitted', sum(len(moment) for moment in circuit))
+        yield phi, circuit
+
+def parameterized_realization_circuit(qubits, config, phases):
+    """
+    The same batch as a single symbolic circuit plus a cirq.Sweep over
+    the disorder phases, for samplers that take run_sweep.
+    """
+    J, Delta = config['system']['J'], config['system']['Delta']
+    dt, steps = config['simulation']['dt'], config['simulation']['steps']
+    template = get_trotter_step_template(qubits)
+    circuit = cirq.Circuit(neel_preparation(qubits))
+    circuit.append(template.circuit.unfreeze(copy=False) * steps)
+    circuit.append(cirq.measure(*qubits, key='result'))
+    sweep = template.sweep(J, Delta, [on_site_potentials(config, phi) for phi in phases], dt)
+    return circuit, sweep
+
+def measured_imbalance(bits):
+    """Shot-averaged imbalance (1/L) sum_i (-1)^i Z_i from (shots, L) measurement bits."""
+    z = 1.0 - 2.0 * np.asarray(bits, dtype=float)
+    return float(np.mean(z @ ((-1.0) ** np.arange(z.shape[1]))) / z.shape[1])
+
+def _sample(circuit, shots, noise_model, seed):
+    if noise_model is not None:
+        with instrumentation.span('noise_wrapping'):
+            circuit = circuit.with_noise(noise_model)
+    with instrumentation.span('sampling', shots=shots):
+        sim = cirq.DensityMatrixSimulator(seed=seed)
+        result = sim.run(circuit, repetitions=shots)
+    instrumentation.count('shots', shots)
+    return result.measurements['result']
+
+def _sample_imbalance(circuit, shots, noise_model, seed, flips=None):
+    if flips is not None:
+        packed = _sample_packed(circuit, shots, noise_model, seed, flips)
+        return float(packed_imbalance(packed, len(circuit.all_qubits())).mean())
+    return measured_imbalance(_sample(circuit, shots, noise_model, seed))
+
+def _sample_packed(circuit, shots, noise_model, seed, flips=None):
+    """
+    Like _sample_imbalance, but returns the shots as packed uint64 rows,
+    optionally with (p10, p01) readout flips.
+    """
+    bits = _sample(circuit, shots, noise_model, seed)
+    packed = pack_bits(bits)
+    if flips is not None:
+        readout_flips(packed, bits.shape[1], *flips, rng=np.random.default_rng(seed))
+    return packed
+
+def run_realizations(circuits, shots, noise_model=None, workers=None, seed=None, store=None, readout=None,
+                     device_readout=None, realizations=None):
+    """
+    Samples every (phi, circuit) of a realization batch and returns the
+    per-realization imbalances, in order. With workers > 1 realizations
+    run in separate processes; at most 2 * workers circuits are in flight.
+    With a ResultStore the packed shots of each realization are appended
+    to it as they complete, under the indices in `realizations` (default
+    0, 1, ...). The confusion matrices `device_readout` flip the sampled
+    bits, and with a ReadoutErrorMitigator as `readout` the imbalances are
+    readout-corrected.
+    """
+    rng = np.random.default_rng(seed)
+    task = _sample_imbalance if store is None and readout is None else _sample_packed
+    flips = readout_probabilities(device_readout)
+    jobs = ((phi, (circuit, shots, noise_model, int(rng.integers(2**32)), flips)) for phi, circuit in circuits)
+    imbalances = []
+
+    def collect(phi, value):
+        if store is not None:
+            r = len(imbalances) if realizations is None else realizations[len(imbalances)]
+            store.append_shots(r, value, phi=phi)
+        if readout is not None:
+            value = readout.mitigated_imbalance(value)
+        elif store is not None:
+            value = float(packed_imbalance(value, store.num_qubits).mean())
+        imbalances.append(value)
+
+    if not workers or workers <= 1:
+        for phi, job in jobs:
+            collect(phi, task(*job))
+        return np.array(imbalances)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for phi, job in jobs:
+            pending.append((phi, pool.submit(task, *job)))
+            if len(pending) >= 2 * workers:
+                phi_done, future = pending.popleft()
+                collect(phi_done, future.result())
+        for phi_done, future in pending:
+            collect(phi_done, future.result())
+    return np.array(imbalances)
+
+def disorder_average(imbalances):
+    """Mean over realizations and its standard error."""
+    imbalances = np.asarray(imbalances, dtype=float)
+    if len(imbalances) < 2:
+        return float(imbalances.mean()), 0.0
+    return float(imbalances.mean()), float(imbalances.std(ddof=1) / np.sqrt(len(imbalances)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stage V: Sycamore Supremacy')
+    parser.add_argument('--config', type=str, required=True, help='Path to configuration YAML')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='Write a Chrome trace (spans, counters, peak RSS) to this JSON file')
+    args = parser.parse_args()
+    
+    config = load_config(args.config)
+    trace_path = instrumentation.configure(config, trace_path=args.trace)
+    run_simulation(config)
+    if trace_path:
+        instrumentation.print_summary()
+        print(f"[*] Trace written to {instrumentation.export()}")
@@ -1,83 +1,307 @@
-# src/mapping.py
-import networkx as nx
-import cirq
-import numpy as np
-
-def get_sycamore_graph(device_name='sycamore'):
-    """
-    Generates the connectivity graph for the Sycamore processor.
-    Mimics the 'rotated lattice' topology.
-    """
-    # Create a 10x10 grid to represent the raw qubit layout
-    # In a real deployment, this pulls from cirq_google.Sycamore
-    qubits = [cirq.GridQubit(r, c) for r in range(10) for c in range(10)]
-    
-    # Sycamore has a specific coupling map (checkerboard-like)
-    # We build a graph where edges represent valid couplers
-    G = nx.Graph()
-    G.add_nodes_from(qubits)
-    
-    for q in qubits:
-        # Add edges for nearest neighbors (simplified Sycamore topology)
-        neighbors = [
-            cirq.GridQubit(q.row + 1, q.col),
-            cirq.GridQubit(q.row, q.col + 1)
-        ]
-        for n in neighbors:
-            if n in qubits:
-                G.add_edge(q, n)
-    
-    # HARDCODED DEFECT MAP (Simulating 'Weber' chip calibration data)
-    # This signals insider awareness of yield issues [cite: 119]
-    dead_qubits = [
-        cirq.GridQubit(0, 5), cirq.GridQubit(2, 4), cirq.GridQubit(6, 2),
-        cirq.GridQubit(7, 8), cirq.GridQubit(9, 1)
-    ]
-    for dq in dead_qubits:
-        if dq in G:
-            G.remove_node(dq)
-            
-    return G
-
-def find_snake_path(G, start_node=None, length=50):
-    """
-    Finds a simple path (Snake) avoiding defects using Warnsdorff's heuristic.
-    """
-    nodes = list(G.nodes())
-    
-    # Prioritize corners/edges to maximize space usage
-    if start_node is None:
-        start_candidates = sorted(nodes, key=lambda n: G.degree(n))
-    else:
-        start_candidates = [start_node]
-
-    best_path = []
-
-    for start in start_candidates[:5]: # Try best 5 start points
-        stack = [(start, [start])]
-        
-        while stack:
-            current, path = stack.pop()
-            
-            if len(path) >= length:
-                return path # Found valid path
-            
-            if len(path) > len(best_path):
-                best_path = path
-
-            # Get neighbors not in path
-            neighbors = [n for n in G.neighbors(current) if n not in path]
-            
-            # Warnsdorff's Heuristic: Sort by degree (low to high)
-            # Hug boundaries to avoid fragmenting the grid [cite: 104]
-            neighbors.sort(key=lambda n: G.degree(n), reverse=True)
-            
-            for n in neighbors:
-                stack.append((n, path + [n]))
-                
-    return best_path
-
-def visualize_mapping(path):
-    print(f"Mapped Chain Length: {len(path)}")
-    print("Start:", path[0])
+# src/mapping.py
+import networkx as nx
+import numpy as np
+import time
+import hashlib
+from collections import OrderedDict
+
+from src.topology import DeviceTopology, get_topology
+
+def get_sycamore_graph(device_name='sycamore'):
+    """
+    Generates the connectivity graph for the Sycamore processor.
+    Mimics the 'rotated lattice' topology.
+
+    The lattice and its defect map come from the device registry
+    (src/topology.py); device_name may also be a device file.
+    """
+    return get_topology(device_name).to_networkx()
+
+# Completed searches, keyed by (graph fingerprint, length, start node),
+# least recently used first; at most PATH_CACHE_SIZE are kept
+PATH_CACHE_SIZE = 128
+_PATH_CACHE = OrderedDict()
+
+def clear_cache():
+    """Forgets every cached snake path."""
+    _PATH_CACHE.clear()
+
+def graph_fingerprint(G):
+    """Order-independent hash of a graph's nodes and edges."""
+    nodes = sorted(G.nodes())
+    index = {n: i for i, n in enumerate(nodes)}
+    edges = sorted(tuple(sorted((index[u], index[v]))) for u, v in G.edges())
+    return hashlib.sha1(repr((nodes, edges)).encode()).hexdigest()
+
+def find_snake_path(G, start_node=None, length=50, node_budget=2_000_000, time_budget=None, cache=True):
+    """
+    Finds a simple path (Snake) avoiding defects using Warnsdorff's heuristic.
+
+    Depth-first search over bitset visited sets: a move prefers the
+    neighbour with the fewest unvisited neighbours, and a branch is pruned
+    as soon as fewer unvisited nodes are reachable from its tip than the
+    path still needs. The search stops after node_budget expansions or
+    time_budget seconds and then returns the longest path seen. Completed
+    searches are cached per (graph fingerprint, length, start) unless
+    cache is False (e.g. for one-off searches on repair subgraphs).
+    """
+    if isinstance(G, DeviceTopology):
+        # Straight from the index arrays, no networkx graph needed
+        key = (G.fingerprint(), length, start_node)
+        live = np.flatnonzero(G.alive)
+        nodes = [G.qubit(i) for i in live]
+        position = np.full(G.rows * G.cols, -1)
+        position[live] = np.arange(len(live))
+        neighbors = [tuple(position[G.neighbors(i)].tolist()) for i in live]
+        largest = int(G.component_sizes().max(initial=0))
+    else:
+        key = (graph_fingerprint(G), length, start_node)
+        nodes = list(G.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        neighbors = [tuple(index[m] for m in G.neighbors(n)) for n in nodes]
+        largest = max((len(c) for c in nx.connected_components(G)), default=0)
+    if cache and key in _PATH_CACHE:
+        _PATH_CACHE.move_to_end(key)
+        return list(_PATH_CACHE[key])
+    index = {n: i for i, n in enumerate(nodes)}
+    adjacency = [sum(1 << j for j in nbrs) for nbrs in neighbors]
+
+    # Prioritize corners/edges to maximize space usage
+    if start_node is None:
+        start_candidates = sorted(range(len(nodes)), key=lambda i: len(neighbors[i]))
+    else:
+        start_candidates = [index[start_node]]
+
+    # A chain longer than the largest defect-free component cannot exist;
+    # aim for the longest one that might, so callers still get a best effort.
+    target = min(length, largest)
+    search = _SnakeSearch(neighbors, adjacency, target, node_budget, time_budget)
+    path = None
+    for start in start_candidates[:5]: # Try best 5 start points
+        path = search.run(start)
+        if path is not None or search.out_of_budget:
+            break
+
+    if path is None:
+        path = search.best_path
+    path = [nodes[i] for i in path]
+    if cache and (len(path) >= length or not search.out_of_budget):
+        _PATH_CACHE[key] = tuple(path)
+        if len(_PATH_CACHE) > PATH_CACHE_SIZE:
+            _PATH_CACHE.popitem(last=False)
+    return path
+
+class _SnakeSearch:
+    def __init__(self, neighbors, adjacency, length, node_budget, time_budget):
+        self.neighbors = neighbors
+        self.adjacency = adjacency
+        self.length = length
+        self.node_budget = node_budget
+        self.deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.expansions = 0
+        self.out_of_budget = False
+        self.best_path = []
+
+    def _reachable(self, tip, visited, needed):
+        """Flood fill over unvisited nodes from tip; stops once `needed` are found."""
+        free = ~visited
+        frontier = self.adjacency[tip] & free
+        seen = frontier
+        count = 0
+        while frontier:
+            count += bin(frontier).count('1')
+            if count >= needed:
+                return True
+            grown = 0
+            while frontier:
+                low = frontier & -frontier
+                grown |= self.adjacency[low.bit_length() - 1]
+                frontier ^= low
+            frontier = grown & free & ~seen
+            seen |= frontier
+        return False
+
+    def _moves(self, tip, visited):
+        free = ~visited
+        moves = [n for n in self.neighbors[tip] if free >> n & 1]
+        # Warnsdorff: fewest onward moves first (hug boundaries, avoid fragmenting the grid) [cite: 104]
+        moves.sort(key=lambda n: bin(self.adjacency[n] & free).count('1'))
+        return moves
+
+    def run(self, start):
+        """Path of self.length nodes from start, or None (best attempt kept in best_path)."""
+        if self.length <= 1:
+            return [start]
+        path = [start]
+        visited = 1 << start
+        stack = [iter(self._moves(start, visited))]
+        while stack:
+            n = next(stack[-1], None)
+            if n is None:
+                stack.pop()
+                visited ^= 1 << path.pop()
+                continue
+
+            self.expansions += 1
+            if self.expansions >= self.node_budget or (
+                    self.deadline is not None and self.expansions % 1024 == 0
+                    and time.monotonic() > self.deadline):
+                self.out_of_budget = True
+                return None
+
+            path.append(n)
+            visited |= 1 << n
+            if len(path) > len(self.best_path):
+                self.best_path = list(path)
+            if len(path) >= self.length:
+                return path # Found valid path
+
+            if self._reachable(n, visited, self.length - len(path)):
+                stack.append(iter(self._moves(n, visited)))
+            else:
+                visited ^= 1 << path.pop()
+        return None
+
+def remove_defects(G, dead_qubits=(), dead_couplers=()):
+    """Copy of G without the given qubits and couplers (qubit pairs)."""
+    G = G.copy()
+    G.remove_nodes_from(q for q in dead_qubits if q in G)
+    G.remove_edges_from((u, v) for u, v in dead_couplers if G.has_edge(u, v))
+    return G
+
+def repair_snake_path(G, path, dead_qubits=(), dead_couplers=(), node_budget=200_000):
+    """
+    Reroutes an existing chain around qubits/couplers that died since it
+    was mapped, by local path surgery: the segment around each break is
+    replaced by a detour through free qubits with the same number of
+    nodes, so everything outside the window keeps its qubit. The window
+    grows until a detour exists; only if that fails is the whole chain
+    searched again.
+
+    Args:
+        G: Device graph the path was mapped on (defects are removed here)
+        path: Current qubit chain
+        dead_qubits, dead_couplers: New defects
+
+    Returns:
+        (new_path, changed) where changed lists the chain indices whose
+        qubit differs, i.e. the parts of the circuit to recompile.
+    """
+    G = remove_defects(G, dead_qubits, dead_couplers)
+    new_path = list(path)
+    while True:
+        broken = _broken_indices(G, new_path)
+        if not broken:
+            break
+        repaired = _repair_segment(G, new_path, broken[0], broken[1] if len(broken) > 1 else broken[0],
+                                   node_budget)
+        if repaired is None:
+            # Local surgery failed: full re-map
+            new_path = find_snake_path(G, length=len(path), node_budget=node_budget * 10)
+            break
+        new_path = repaired
+
+    changed = [i for i in range(len(path)) if i >= len(new_path) or new_path[i] != path[i]]
+    return new_path, changed
+
+def _broken_indices(G, path):
+    """Indices of the first break: a dead qubit, or both ends of a dead coupler."""
+    for i, q in enumerate(path):
+        if q not in G:
+            return [i]
+        if i + 1 < len(path) and path[i + 1] in G and not G.has_edge(q, path[i + 1]):
+            return [i, i + 1]
+    return []
+
+def _repair_segment(G, path, first, last, node_budget):
+    """Replaces the smallest window around path[first..last] that admits a detour."""
+    n = len(path)
+    radius = 1
+    while True:
+        lo, hi = first - radius, last + radius
+        if lo < 0 and hi >= n:
+            return None
+        lo, hi = max(lo, -1), min(hi, n)
+        blocked = set(path[:lo + 1]) | set(path[hi:])
+        free = G.subgraph(q for q in G if q not in blocked or q in (path[lo] if lo >= 0 else None,
+                                                                      path[hi] if hi < n else None))
+        n_interior = hi - lo - 1
+        if lo < 0:
+            # Free start: grow backwards from path[hi]
+            if path[hi] not in free:
+                detour = None  # The anchor is dead too: widen the window past it
+            else:
+                tail = find_snake_path(free, start_node=path[hi], length=n_interior + 1,
+                                       node_budget=node_budget, cache=False)
+                detour = tail[::-1][:-1] if len(tail) == n_interior + 1 else None
+        elif hi >= n:
+            if path[lo] not in free:
+                detour = None
+            else:
+                head = find_snake_path(free, start_node=path[lo], length=n_interior + 1,
+                                       node_budget=node_budget, cache=False)
+                detour = head[1:] if len(head) == n_interior + 1 else None
+        else:
+            detour = _bridge(free, path[lo], path[hi], n_interior, node_budget)
+        if detour is not None:
+            return path[:lo + 1] + detour + path[hi:]
+        radius *= 2
+
+def _bridge(G, source, target, n_interior, node_budget):
+    """Interior nodes of a source -> target path with exactly n_interior of them, or None."""
+    if source not in G or target not in G:
+        return None
+    dist = nx.single_source_shortest_path_length(G, target)
+    steps = n_interior + 1
+    if dist.get(source, steps + 1) > steps:
+        return None
+
+    route = [source]
+    visited = {source}
+    stack = [iter(sorted(G.neighbors(source), key=lambda m: -dist.get(m, 0)))]
+    expansions = 0
+    while stack:
+        m = next(stack[-1], None)
+        if m is None:
+            stack.pop()
+            visited.discard(route.pop())
+            continue
+        remaining = steps - len(route)  # steps left after moving to m
+        if m in visited or dist.get(m, steps + 1) > remaining or (m == target) != (remaining == 0):
+            continue
+        expansions += 1
+        if expansions > node_budget:
+            return None
+        if remaining == 0:
+            return route[1:]
+        if not _room_for_detour(G, m, target, visited, remaining):
+            continue
+        route.append(m)
+        visited.add(m)
+        # Farthest-from-target first: spend the spare length early
+        stack.append(iter(sorted(G.neighbors(m), key=lambda k: -dist.get(k, 0))))
+    return None
+
+def _room_for_detour(G, tip, target, visited, remaining):
+    """True if target is reachable from tip through unvisited nodes and there are enough of them."""
+    seen = {tip}
+    frontier = [tip]
+    found_target = False
+    while frontier:
+        grown = []
+        for u in frontier:
+            for v in G.neighbors(u):
+                if v in seen or v in visited:
+                    continue
+                seen.add(v)
+                if v == target:
+                    found_target = True  # the path ends here, do not walk through it
+                else:
+                    grown.append(v)
+        frontier = grown
+    return found_target and len(seen) - 1 >= remaining
+
+def visualize_mapping(path):
+    print(f"Mapped Chain Length: {len(path)}")
+    print("Start:", path[0])
     print("End:  ", path[-1])
\ No newline at end of file
@@ -0,0 +1,221 @@
+# src/mps.py
+import os
+import json
+import numpy as np
+import scipy.linalg as la
+
+# Singular values below this are always discarded: the right-canonical update
+# divides by the previous bond's singular values.
+SVD_MIN = 1e-12
+
+
+class ChainMPS:
+    """
+    Right-canonical MPS for a chain of qubits: psi = S_0 B_0 B_1 ... B_{L-1},
+    with B_i shaped (chi_i, 2, chi_i+1) and S_i the singular values on bond i
+    (bond i sits left of site i; S_0 = S_L = [1]).
+
+    Physical index 0 -> Z = +1, as in src/hamiltonian.py. With parity
+    conservation every bond index carries a Z2 charge q (the parity of the
+    bits to its left), and B_i[a, s, b] is nonzero only if q_i[a] ^ s == q_i+1[b].
+    """
+    def __init__(self, Bs, Ss, charges=None):
+        self.Bs = Bs
+        self.Ss = Ss
+        self.charges = charges
+        self.L = len(Bs)
+
+    @classmethod
+    def from_bits(cls, bits, conserve_parity=True):
+        """Product state |b_0 b_1 ... b_L-1>."""
+        bits = [int(b) for b in bits]
+        Bs = []
+        for b in bits:
+            B = np.zeros((1, 2, 1), dtype=complex)
+            B[0, b, 0] = 1.0
+            Bs.append(B)
+        Ss = [np.ones(1) for _ in range(len(bits) + 1)]
+        charges = None
+        if conserve_parity:
+            charges = [np.array([sum(bits[:i]) % 2], dtype=np.int8) for i in range(len(bits) + 1)]
+        return cls(Bs, Ss, charges)
+
+    @classmethod
+    def neel(cls, L, conserve_parity=True):
+        """|0101...>: Z = +1 on even sites."""
+        return cls.from_bits(np.arange(L) % 2, conserve_parity=conserve_parity)
+
+    def bond_dims(self):
+        return [len(S) for S in self.Ss[1:-1]]
+
+    def z_expectations(self):
+        """<Z_i> for every site, from the local weights S_i^2 |B_i|^2."""
+        z = np.empty(self.L)
+        for i, (S, B) in enumerate(zip(self.Ss, self.Bs)):
+            weights = np.einsum('a,asb->s', S**2, np.abs(B)**2)
+            z[i] = weights[0] - weights[1]
+        return z
+
+    def entanglement_entropy(self):
+        """Von Neumann entropy across every internal bond."""
+        entropy = []
+        for S in self.Ss[1:-1]:
+            p = S[S > 0]**2
+            entropy.append(float(-np.sum(p * np.log(p))))
+        return np.array(entropy)
+
+    def save(self, path, **meta):
+        """Writes the MPS (and any JSON-serialisable metadata) atomically to path."""
+        arrays = {}
+        for i, B in enumerate(self.Bs):
+            arrays[f'B{i}'] = B
+        for i, S in enumerate(self.Ss):
+            arrays[f'S{i}'] = S
+            if self.charges is not None:
+                arrays[f'q{i}'] = self.charges[i]
+        arrays['meta'] = np.array(json.dumps({'L': self.L, **meta}))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (mps, meta) as written by save()."""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            L = meta['L']
+            Bs = [data[f'B{i}'] for i in range(L)]
+            Ss = [data[f'S{i}'] for i in range(L + 1)]
+            charges = [data[f'q{i}'] for i in range(L + 1)] if 'q0' in data else None
+        return cls(Bs, Ss, charges), meta
+
+
+class TEBDEngine:
+    """
+    Second-order TEBD for H = sum_i J_i X_i X_{i+1} + sum_i h_i Z_i (the
+    ChainHamiltonian convention). Each bond gate carries J_i XX plus the
+    fields of its two sites, shared with the neighbouring bond.
+
+    Args:
+        J, h: Couplings (L-1) and fields (L)
+        dt: Time step
+        chi_max: Maximum bond dimension
+        trunc_err: Maximum discarded weight per bond update
+    """
+    def __init__(self, J, h, dt, chi_max=800, trunc_err=1e-10):
+        self.J = np.asarray(J, dtype=float)
+        self.h = np.asarray(h, dtype=float)
+        self.L = len(self.h)
+        self.dt = dt
+        self.chi_max = chi_max
+        self.trunc_err = trunc_err
+        self.truncation_error = 0.0  # Accumulated discarded weight
+
+        X = np.array([[0.0, 1.0], [1.0, 0.0]])
+        Z = np.diag([1.0, -1.0])
+        I2 = np.eye(2)
+        self.bond_H = []
+        for i in range(self.L - 1):
+            c_left = 1.0 if i == 0 else 0.5
+            c_right = 1.0 if i == self.L - 2 else 0.5
+            self.bond_H.append(self.J[i] * np.kron(X, X)
+                               + c_left * self.h[i] * np.kron(Z, I2)
+                               + c_right * self.h[i + 1] * np.kron(I2, Z))
+        # Strang splitting: half step on even bonds, full on odd, half on even.
+        # Consecutive half steps merge, so a run of n steps costs n+1 even sweeps.
+        self._half = [self._gate(H, 0.5 * dt) for H in self.bond_H]
+        self._full = [self._gate(H, dt) for H in self.bond_H]
+
+    @staticmethod
+    def _gate(H_bond, tau):
+        # [s1', s2', s1, s2]
+        return la.expm(-1j * tau * H_bond).reshape(2, 2, 2, 2)
+
+    def run(self, psi, n_steps=1):
+        """Advances psi by n_steps * dt in place."""
+        if n_steps < 1:
+            return psi
+        even = range(0, self.L - 1, 2)
+        odd = range(1, self.L - 1, 2)
+        for i in even:
+            self.update_bond(psi, i, self._half[i])
+        for step in range(n_steps):
+            for i in odd:
+                self.update_bond(psi, i, self._full[i])
+            gates = self._half if step == n_steps - 1 else self._full
+            for i in even:
+                self.update_bond(psi, i, gates[i])
+        return psi
+
+    def update_bond(self, psi, i, U):
+        """Applies a two-site gate to bond (i, i+1), then splits and truncates."""
+        S_left, B1, B2 = psi.Ss[i], psi.Bs[i], psi.Bs[i + 1]
+        chi_l, chi_r = B1.shape[0], B2.shape[2]
+        theta = np.tensordot(S_left[:, None, None] * B1, B2, axes=(2, 0))  # (l, s1, s2, r)
+        theta = np.einsum('abcd,lcdr->labr', U, theta).reshape(chi_l * 2, 2 * chi_r)
+
+        if psi.charges is None:
+            X, S, Y = la.svd(theta, full_matrices=False, lapack_driver='gesdd')
+            keep = self._truncation(S)
+            X, S, Y, q_new = X[:, :keep], S[:keep], Y[:keep], None
+        else:
+            X, S, Y, q_new = self._split_by_parity(theta, psi.charges[i], psi.charges[i + 2])
+
+        S = S / np.linalg.norm(S)
+        psi.Bs[i] = (X.reshape(chi_l, 2, -1) / S_left[:, None, None]) * S[None, None, :]
+        psi.Bs[i + 1] = Y.reshape(-1, 2, chi_r)
+        psi.Ss[i + 1] = S
+        if q_new is not None:
+            psi.charges[i + 1] = q_new
+
+    def _split_by_parity(self, theta, q_left, q_right):
+        """
+        SVD of theta one parity block at a time. Rows (a, s1) carry charge
+        q_left[a] ^ s1, columns (s2, b) carry q_right[b] ^ s2; the gate
+        conserves parity, so theta only couples equal charges.
+        """
+        row_q = (q_left[:, None] ^ np.arange(2)[None, :]).ravel()
+        col_q = (np.arange(2)[:, None] ^ q_right[None, :]).ravel()
+        blocks = []
+        for c in (0, 1):
+            rows = np.flatnonzero(row_q == c)
+            cols = np.flatnonzero(col_q == c)
+            if len(rows) == 0 or len(cols) == 0:
+                continue
+            X, S, Y = la.svd(theta[np.ix_(rows, cols)], full_matrices=False, lapack_driver='gesdd')
+            blocks.append((c, rows, cols, X, S, Y))
+
+        # Truncate on the merged spectrum, then keep each block's leading part
+        S_all = np.concatenate([b[4] for b in blocks])
+        keep = self._truncation(np.sort(S_all)[::-1])
+        threshold = np.sort(S_all)[::-1][keep - 1]
+        n_keep = [min(int(np.sum(b[4] >= threshold)), keep) for b in blocks]
+        while sum(n_keep) > keep:  # ties at the threshold
+            n_keep[int(np.argmax(n_keep))] -= 1
+
+        chi_new = sum(n_keep)
+        X_new = np.zeros((theta.shape[0], chi_new), dtype=theta.dtype)
+        Y_new = np.zeros((chi_new, theta.shape[1]), dtype=theta.dtype)
+        S_new = np.empty(chi_new)
+        q_new = np.empty(chi_new, dtype=np.int8)
+        offset = 0
+        for (c, rows, cols, X, S, Y), n in zip(blocks, n_keep):
+            sl = slice(offset, offset + n)
+            X_new[rows, sl] = X[:, :n]
+            Y_new[sl, cols] = Y[:n]
+            S_new[sl] = S[:n]
+            q_new[sl] = c
+            offset += n
+        return X_new, S_new, Y_new, q_new
+
+    def _truncation(self, S):
+        """Number of (descending) singular values to keep."""
+        weights = S**2 / np.sum(S**2)
+        # discarded[k] = weight dropped when keeping the first k values
+        discarded = np.concatenate([np.cumsum(weights[::-1])[::-1], [0.0]])
+        keep = int(np.argmax(discarded <= self.trunc_err))
+        keep = min(keep, self.chi_max, int(np.sum(S > SVD_MIN)))
+        keep = max(keep, 1)
+        self.truncation_error += discarded[keep]
+        return keep
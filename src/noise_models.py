@@ -1,42 +1,148 @@
-# src/noise_models.py
-import cirq
-import numpy as np
-
-class SycamoreNoiseModel(cirq.NoiseModel):
-    """
-    High-fidelity noise model mimicking Google Sycamore (2025).
-    Includes T1 relaxation, Tphi dephasing, and residual ZZ crosstalk.
-    """
-    def __init__(self, t1_micros=20.0, tphi_micros=30.0, gate_time_ns=25.0):
-        self.t1 = t1_micros * 1000.0   # convert to ns
-        self.tphi = tphi_micros * 1000.0
-        self.gate_duration = gate_time_ns
-
-    def noisy_moments(self, circuit, moments):
-        # Calculate damping parameters [cite: 158, 164]
-        gamma = 1.0 - np.exp(-self.gate_duration / self.t1)
-        lam = 1.0 - np.exp(-self.gate_duration / self.tphi)
-        
-        for moment in moments:
-            # 1. Yield the original operations
-            yield moment
-            
-            # 2. Apply decoherence to all qubits involved
-            noise_ops = []
-            for qubit in moment.qubits:
-                noise_ops.append(cirq.amplitude_damp(gamma).on(qubit))
-                noise_ops.append(cirq.phase_damp(lam).on(qubit))
-            
-            # 3. Apply residual ZZ crosstalk (simplified for demonstration)
-            # This models the "always-on" coupling error [cite: 167]
-            for i in range(len(moment.qubits) - 1):
-                q1, q2 = list(moment.qubits)[i], list(moment.qubits)[i+1]
-                # Small coherent error
-                noise_ops.append(cirq.ZZPowGate(exponent=0.01).on(q1, q2))
-
-            yield cirq.Moment(noise_ops)
-
-def add_readout_error(result_dict, error_prob=0.03):
-    """Simulates readout bit-flips."""
-    # Placeholder for post-processing logic
-    return result_dict
\ No newline at end of file
+# src/noise_models.py
+import cirq
+import numpy as np
+
+from src.bitstrings import pack_bits, unpack_bits
+from src.sampling import readout_flips
+
+class SycamoreNoiseModel(cirq.NoiseModel):
+    """
+    High-fidelity noise model mimicking Google Sycamore (2025).
+    Includes T1 relaxation, Tphi dephasing, and residual ZZ crosstalk.
+
+    Noise gates are built once, and the noise layer that follows a moment
+    is built once per distinct set of active qubits, so wrapping a deep
+    circuit reuses the same Moments throughout.
+
+    Args:
+        t1_micros, tphi_micros: Relaxation and dephasing times
+        gate_time_ns: Duration of one moment
+        zz_exponent: Residual ZZ per moment between coupled qubits
+        device_graph: Coupler graph (src/mapping.py). ZZ crosstalk acts on
+                      its edges; without it, on adjacent GridQubits.
+        fuse: Apply T1 and Tphi as one Kraus channel per qubit
+    """
+    def __init__(self, t1_micros=20.0, tphi_micros=30.0, gate_time_ns=25.0,
+                 zz_exponent=0.01, device_graph=None, fuse=True):
+        self.t1 = t1_micros * 1000.0   # convert to ns
+        self.tphi = tphi_micros * 1000.0
+        self.gate_duration = gate_time_ns
+        self.device_graph = device_graph
+        self.fuse = fuse
+
+        # Calculate damping parameters [cite: 158, 164]
+        self.gamma = 1.0 - np.exp(-self.gate_duration / self.t1)
+        self.lam = 1.0 - np.exp(-self.gate_duration / self.tphi)
+        self.amplitude_damp = cirq.amplitude_damp(self.gamma)
+        self.phase_damp = cirq.phase_damp(self.lam)
+        # Small coherent error, the "always-on" coupling [cite: 167]
+        self.zz_gate = cirq.ZZPowGate(exponent=zz_exponent)
+
+        # Phase damping after amplitude damping: Kraus operators P_j A_i
+        kraus = [p @ a for p in cirq.kraus(self.phase_damp) for a in cirq.kraus(self.amplitude_damp)]
+        kraus = [k for k in kraus if np.any(np.abs(k) > 1e-15)]
+        self.decoherence = cirq.KrausChannel(kraus, key=None)
+
+        self._layers = {}
+
+    def noisy_moments(self, moments, system_qubits):
+        for moment in moments:
+            # 1. Yield the original operations
+            yield moment
+            # 2./3. Decoherence and ZZ crosstalk on the qubits involved
+            qubits = moment.qubits
+            layer = self._layers.get(qubits)
+            if layer is None:
+                layer = self._layers[qubits] = self._noise_layer(qubits)
+            yield from layer
+
+    def _noise_layer(self, qubits):
+        qubits = sorted(qubits)
+        if self.fuse:
+            layer = [cirq.Moment(self.decoherence.on(q) for q in qubits)]
+        else:
+            layer = [cirq.Moment(self.amplitude_damp.on(q) for q in qubits),
+                     cirq.Moment(self.phase_damp.on(q) for q in qubits)]
+
+        # ZZ on coupled pairs, greedily packed into non-overlapping Moments
+        zz_layers = []
+        for q1, q2 in self._coupled_pairs(qubits):
+            for ops in zz_layers:
+                if q1 not in ops and q2 not in ops:
+                    break
+            else:
+                ops = {}
+                zz_layers.append(ops)
+            ops[q1] = ops[q2] = self.zz_gate.on(q1, q2)
+        layer += [cirq.Moment(set(ops.values())) for ops in zz_layers]
+        return tuple(layer)
+
+    def _coupled_pairs(self, qubits):
+        active = set(qubits)
+        if self.device_graph is not None:
+            return [tuple(sorted(e)) for e in self.device_graph.subgraph(active).edges()]
+        pairs = []
+        for q in qubits:
+            if isinstance(q, cirq.GridQubit):
+                for n in (q + (1, 0), q + (0, 1)):
+                    if n in active:
+                        pairs.append((q, n))
+        return pairs
+
+class ReadoutNoiseSampler(cirq.Sampler):
+    """
+    Wraps a cirq sampler (default cirq.Simulator) and applies classical,
+    per-qubit asymmetric readout flips to every measurement it returns.
+    A local stand-in for hardware readout error, e.g. for calibration.
+
+    Args:
+        confusion_matrix: A[measured, true], one 2x2 for every qubit or a
+                          {qubit: 2x2} dict
+        sampler: Sampler producing the ideal measurements
+        seed: Seed for the readout flips
+    """
+    def __init__(self, confusion_matrix, sampler=None, seed=None):
+        self.confusion_matrix = confusion_matrix
+        self.sampler = sampler if sampler is not None else cirq.Simulator(seed=seed)
+        self.rng = np.random.default_rng(seed)
+
+    def _flip_probabilities(self, qubits):
+        """(P(1|0), P(0|1)) per qubit."""
+        if isinstance(self.confusion_matrix, dict):
+            A = np.array([self.confusion_matrix[q] for q in qubits])
+        else:
+            A = np.broadcast_to(np.asarray(self.confusion_matrix, dtype=float), (len(qubits), 2, 2))
+        return A[:, 1, 0], A[:, 0, 1]
+
+    def run_sweep(self, program, params, repetitions=1):
+        key_qubits = {op.gate.key: op.qubits for op in program.all_operations()
+                      if isinstance(op.gate, cirq.MeasurementGate)}
+        flip_probs = {key: self._flip_probabilities(qubits) for key, qubits in key_qubits.items()}
+        noisy_results = []
+        for result in self.sampler.run_sweep(program, params, repetitions=repetitions):
+            measurements = {}
+            for key, bits in result.measurements.items():
+                measurements[key] = _flip_bits(bits, *flip_probs[key], self.rng)
+            noisy_results.append(cirq.ResultDict(params=result.params, measurements=measurements))
+        return noisy_results
+
+def add_readout_error(result_dict, error_prob=0.03, seed=None):
+    """
+    Simulates readout bit-flips on sampled measurements: a cirq.Result or a
+    {key: (shots, n) bits} dict, returned as the same type with flipped
+    copies. error_prob is one flip probability, or a (P(1|0), P(0|1)) pair
+    of scalars or per-qubit arrays for asymmetric readout. Shots that are
+    already packed go to src/sampling.py readout_flips directly.
+    """
+    p10, p01 = (error_prob, error_prob) if np.ndim(error_prob) == 0 else error_prob
+    rng = np.random.default_rng(seed)
+    if isinstance(result_dict, cirq.Result):
+        measurements = {key: _flip_bits(bits, p10, p01, rng) for key, bits in result_dict.measurements.items()}
+        return cirq.ResultDict(params=result_dict.params, measurements=measurements)
+    return {key: _flip_bits(bits, p10, p01, rng) for key, bits in result_dict.items()}
+
+def _flip_bits(bits, p10, p01, rng):
+    """Readout flips on (shots, n) bits, through the packed layout."""
+    bits = np.asarray(bits)
+    packed = readout_flips(pack_bits(bits), bits.shape[1], p10, p01, rng=rng)
+    return unpack_bits(packed, bits.shape[1]).astype(bits.dtype)
@@ -0,0 +1,213 @@
+# src/reliability.py
+import numpy as np
+from scipy.optimize import minimize
+from typing import Optional
+
+from src.hamiltonian import ChainHamiltonian, imbalance_diagonal, to_parity_sector
+from src.dynamics import diagonal_trace, diagonal_trace_gradient, ChebyshevPropagator
+from src.control import pulse_gradient
+from src import instrumentation
+
+# --- CONFIGURATION & CONSTANTS ---
+# Tuned for guaranteed convergence in demo
+L = 6                       # System Size 
+DT = 0.2                    # Slightly coarser step for speed
+T_GATE = 8.0                # DOUBLED TIME: Gives the system time to actually flip
+STEPS = int(T_GATE / DT)    
+J_NOMINAL = 1.0             
+BANDWIDTH_LIMIT = 2.0       
+FIELD_DRIFT_LIMIT = 1.0     # Max |h - h_nominal| explored when learning fields
+TRACE_NOISE = 0.002         # Per-point noise of a measured calibration trace
+
+class QuantumReliabilityEngine:
+    """
+    Stage III & IV: Automated Calibration and Optimal Control Synthesis.
+    """
+    
+    def __init__(self, L: int = L): 
+        self.L = L
+        self.dim = 2**L
+        self._cache_operators()
+
+    def _cache_operators(self):
+        # All Z terms and the imbalance observable are diagonal: one vector each.
+        # The XX terms are applied matrix-free by ChainHamiltonian.
+        # Init state |0101...>
+        self.init_idx = int("".join(["01" for _ in range(self.L // 2)]), 2)
+        self.meas_diag = imbalance_diagonal(self.L)
+
+    def get_evolution(self, J_map: np.ndarray, h_map: np.ndarray, 
+                      control_pulse: Optional[np.ndarray] = None) -> np.ndarray:
+        H_drift = ChainHamiltonian(J_map, h_map)
+            
+        psi = np.zeros(self.dim)
+        psi[self.init_idx] = 1.0
+        
+        if control_pulse is None:
+            # Stage 3: Calibration Mode (More data points for better fit)
+            # All time points in one pass (eigenbasis for small L, stepping otherwise)
+            t_points = np.linspace(0, 10.0, 100) 
+            return diagonal_trace(H_drift, psi, t_points, self.meas_diag) / self.L
+            
+        else:
+            # Stage 4: Control Mode
+            # Z controls only shift the diagonal and conserve parity: evolve
+            # in the Néel state's parity block, updating the fields in place
+            # and stepping with one reused Chebyshev workspace
+            H_t, current_psi = to_parity_sector(H_drift, psi)
+            current_psi = current_psi.astype(complex)
+            propagator = ChebyshevPropagator(H_t)
+            for controls in control_pulse:
+                H_t.set_fields(h_map + controls)
+                propagator.propagate(current_psi, DT, out=current_psi)
+            return H_t.embed(current_psi)
+
+    # --- STAGE 3: DIGITAL TWIN ---
+    def calibrate_system(self, experimental_trace, learn_fields=False, J_init=None, h_init=None,
+                         active_couplers=None, J_window=None):
+        """
+        Fits the coupler map J (and optionally the fields h) to a measured
+        imbalance trace.
+
+        Args:
+            J_init, h_init: Warm start, e.g. the last recovered map
+                            (default: J_NOMINAL and the nominal fields)
+            active_couplers: Indices of the couplers to refit; the others
+                             stay at J_init (see changed_couplers)
+            J_window: Keep refitted couplers within J_init +/- J_window. The
+                      loss is steep and L-BFGS-B's first step otherwise
+                      tends to land on the (0, 2) bounds.
+        """
+        print(f"[Stage III] Starting Digital Twin Calibration...")
+        h_known = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(self.L))
+        t_points = np.linspace(0, 10.0, 100)
+        psi = np.zeros(self.dim)
+        psi[self.init_idx] = 1.0
+        J_start = np.ones(self.L - 1) * J_NOMINAL if J_init is None else np.array(J_init, dtype=float)
+        h_start = h_known if h_init is None else np.array(h_init, dtype=float)
+        active = np.arange(self.L - 1) if active_couplers is None else np.asarray(active_couplers, dtype=int)
+        
+        def trace_loss(raw_trace):
+            residual = raw_trace / self.L - experimental_trace
+            d_trace = 2.0 * residual * 1e5 / (len(residual) * self.L)
+            return np.mean(residual**2) * 1e5, d_trace
+        
+        def loss(params):
+            # Loss and its analytic gradient (one forward + one adjoint pass)
+            instrumentation.count('calibration.loss_evaluations')
+            J_guess = J_start.copy()
+            J_guess[active] = params[:len(active)]
+            h_guess = params[len(active):] if learn_fields else h_start
+            value, d_J, d_h = diagonal_trace_gradient(ChainHamiltonian(J_guess, h_guess), psi,
+                                                      t_points, self.meas_diag, trace_loss)
+            return value, (np.concatenate([d_J[active], d_h]) if learn_fields else d_J[active])
+        
+        guess = J_start[active]
+        if J_window is None:
+            bounds = [(0.0, 2.0) for _ in active]
+        else:
+            bounds = [(max(0.0, J - J_window), min(2.0, J + J_window)) for J in guess]
+        if learn_fields:
+            # On-site fields are refined around the nominal quasi-periodic pattern
+            guess = np.concatenate([guess, h_start])
+            bounds += [(h - FIELD_DRIFT_LIMIT, h + FIELD_DRIFT_LIMIT) for h in h_known]
+        
+        with instrumentation.span('calibrate_system', L=self.L, active=len(active)) as span:
+            res = minimize(loss, guess, method='L-BFGS-B', jac=True, bounds=bounds, 
+                           options={'ftol': 1e-9})
+            span.set(iterations=int(res.nit), loss=float(res.fun))
+        instrumentation.count('calibration.iterations', res.nit)
+        J_fit = J_start.copy()
+        J_fit[active] = res.x[:len(active)]
+        self.h_recovered = res.x[len(active):] if learn_fields else h_start
+        self.calibration_iterations = res.nit
+        return J_fit, res.fun
+
+    def changed_couplers(self, experimental_trace, J_prev, h_prev=None, noise=TRACE_NOISE,
+                         z=4.0, probes=8, seed=None):
+        """
+        Couplers whose value has moved since the map (J_prev, h_prev) was
+        recovered, judged from a new trace.
+
+        The gradient g = dT/dJ^T r of the misfit 0.5 |T(J_prev) - trace|^2
+        comes from one forward + one adjoint pass (diagonal_trace_gradient).
+        Trace noise of std `noise` per point alone spreads g_i by
+        noise * |dT/dJ_i|; that spread is measured with `probes` further
+        adjoint passes on pure-noise residuals, and couplers with
+        |g_i| >= z * spread_i are kept (or the most significant one if none is).
+        """
+        h_prev = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(self.L)) if h_prev is None else h_prev
+        H = ChainHamiltonian(np.asarray(J_prev, dtype=float), h_prev)
+        t_points = np.linspace(0, 10.0, 100)
+        psi = np.zeros(self.dim)
+        psi[self.init_idx] = 1.0
+
+        def misfit(raw_trace):
+            residual = raw_trace / self.L - experimental_trace
+            return 0.5 * np.sum(residual**2), residual / self.L
+
+        _, gradient, _ = diagonal_trace_gradient(H, psi, t_points, self.meas_diag, misfit)
+        rng = np.random.default_rng(seed)
+        null = np.empty((probes, self.L - 1))
+        for k in range(probes):
+            residual = rng.normal(0.0, noise, size=len(t_points))
+            null[k] = diagonal_trace_gradient(H, psi, t_points, self.meas_diag,
+                                              lambda _: (0.0, residual / self.L))[1]
+        score = np.abs(gradient) / np.sqrt(np.mean(null**2, axis=0))
+        changed = np.flatnonzero(score >= z)
+        return changed if len(changed) else np.array([int(np.argmax(score))])
+
+    # --- STAGE 4: LAZARUS PULSE ---
+    def synthesize_pulse(self, J_defect, h_known, target_state_idx=None, t_gate=T_GATE):
+        print(f"[Stage IV] Synthesizing Lazarus Pulse (Deep Optimization)...")
+        print(f"Goal: Logical Flip |010101> -> |101010> on BROKEN Hardware.")
+        
+        if target_state_idx is None:
+            target_state_idx = int("".join(["10" for _ in range(self.L // 2)]), 2)
+        
+        target_psi = np.zeros(self.dim)
+        target_psi[target_state_idx] = 1.0
+        psi_init = np.zeros(self.dim)
+        psi_init[self.init_idx] = 1.0
+        steps = int(t_gate / DT)
+        
+        # AGGRESSIVE INITIALIZATION: Random kicks to find the gradient
+        initial_controls = np.random.normal(0, 2.0, size=steps * self.L)
+        
+        self.iteration_count = 0
+        def callback(xk):
+            self.iteration_count += 1
+            if self.iteration_count % 50 == 0:
+                print(f"Optimizer Step {self.iteration_count}...")
+
+        def control_loss(ctrl_flat):
+            # Loss and its exact gradient (one forward + one adjoint sweep)
+            instrumentation.count('pulse.loss_evaluations')
+            ctrl_shaped = ctrl_flat.reshape((steps, self.L))
+            fidelity, d_fidelity = pulse_gradient(J_defect, h_known, ctrl_shaped, DT,
+                                                  psi_init, target_psi)
+            infidelity = 1.0 - fidelity
+            
+            # Relaxed penalties to allow the solver to find a solution
+            diffs = np.diff(ctrl_shaped, axis=0)
+            smoothness_penalty = np.sum(diffs**2) * 0.0001
+            power_penalty = np.sum(ctrl_shaped**2) * 0.00001
+            
+            d_smoothness = np.zeros_like(ctrl_shaped)
+            d_smoothness[1:] += 2.0 * diffs
+            d_smoothness[:-1] -= 2.0 * diffs
+            grad = -d_fidelity * 100 + d_smoothness * 0.0001 + 2.0 * ctrl_shaped * 0.00001
+            
+            return infidelity * 100 + smoothness_penalty + power_penalty, grad.ravel()
+
+        with instrumentation.span('synthesize_pulse', L=self.L, steps=steps) as span:
+            res = minimize(control_loss, initial_controls, method='L-BFGS-B', jac=True,
+                           options={'maxiter': 1000, 'ftol': 1e-6}, callback=callback)
+            span.set(iterations=int(res.nit), loss=float(res.fun))
+        instrumentation.count('pulse.iterations', res.nit)
+        
+        final_pulse = res.x.reshape((steps, self.L))
+        final_psi = self.get_evolution(J_defect, h_known, control_pulse=final_pulse)
+        final_fid = np.abs(np.vdot(target_psi, final_psi))**2
+        
+        return final_pulse, final_fid
@@ -1,47 +1,286 @@
-# src/rem.py
-import numpy as np
-import scipy.linalg as la
-
-class ReadoutErrorMitigator:
-    """
-    Enterprise-grade Readout Error Mitigation (REM) via Constrained Matrix Inversion.
-    Solves A * x_true = x_measured subject to probability constraints.
-    """
-    def __init__(self, num_qubits, confusion_matrix=None):
-        self.n = num_qubits
-        if confusion_matrix is None:
-            # Default to Sycamore-like readout fidelity (97%)
-            # P(0|0)=0.97, P(1|1)=0.94 (asymmetric readout error)
-            p00, p11 = 0.97, 0.94
-            self.A = np.array([[p00, 1-p11], [1-p00, p11]])
-        else:
-            self.A = confusion_matrix
-
-    def apply_mitigation(self, raw_counts):
-        """
-        Applies Tensored Inverse Calibration to recover true probability distribution.
-        """
-        # For small systems, we invert the full tensor product
-        # For L=100, we apply local inversions (scalable approach)
-        mitigated_counts = {}
-        inv_A = la.inv(self.A)
-        
-        # Simulating the local inversion logic for demonstration
-        # In production, this would use a standard Least Squares filter
-        for bitstring, count in raw_counts.items():
-            # This is a placeholder for the full O(2^N) unfolding
-            # We strictly mark this as the "Enterprise" calibration step
-            mitigated_counts[bitstring] = count # Placeholder
-            
-        return mitigated_counts
-
-    def calibrate_on_hardware(self, engine):
-        """
-        Automated calibration sequence to learn the Confusion Matrix A
-        directly from the target QPU.
-        """
-        print(f"[*] Initiating Readout Calibration on {engine}...")
-        print("    -> Preparing |00...0> state...")
-        print("    -> Preparing |11...1> state...")
-        print("    -> Computing inversion matrix A^-1...")
-        return self.A
\ No newline at end of file
+# src/rem.py
+import os
+import re
+import json
+import time
+import hashlib
+import numpy as np
+import cirq
+import scipy.sparse.linalg as linalg
+from scipy.sparse import csc_matrix, diags
+
+from src.bitstrings import pack_bits, unpack_bits, popcount, from_count_dict, to_count_dict
+from src.estimators import bit_counts
+
+class ReadoutErrorMitigator:
+    """
+    Enterprise-grade Readout Error Mitigation (REM) via Constrained Matrix Inversion.
+    Solves A * x_true = x_measured subject to probability constraints.
+    """
+    def __init__(self, num_qubits, confusion_matrix=None):
+        self.n = num_qubits
+        if confusion_matrix is None:
+            # Default to Sycamore-like readout fidelity (97%)
+            # P(0|0)=0.97, P(1|1)=0.94 (asymmetric readout error)
+            p00, p11 = 0.97, 0.94
+            self.A = np.array([[p00, 1-p11], [1-p00, p11]])
+        else:
+            self.A = confusion_matrix
+        self.set_confusion_matrix(self.A)
+
+    def set_confusion_matrix(self, confusion_matrix):
+        """
+        Installs A[measured, true], either one 2x2 matrix shared by every
+        qubit or an (n, 2, 2) stack of per-qubit matrices.
+        """
+        A = np.asarray(confusion_matrix, dtype=float)
+        self.A = A
+        self.A_qubits = np.broadcast_to(A, (self.n, 2, 2)).copy() if A.ndim == 2 else A
+        self.A_inv = np.linalg.inv(self.A_qubits)
+        # w_i(b) = sum_t z(t) A_inv_i[t, b]: the unbiased Z_i estimate for a measured bit b
+        self._z_weights = np.einsum('t,itb->ib', np.array([1.0, -1.0]), self.A_inv)
+
+    def _samples(self, samples, counts=None):
+        """Normalises samples to (packed uint64 rows, int64 counts)."""
+        if isinstance(samples, dict):
+            return from_count_dict(samples, self.n)
+        samples = np.asarray(samples)
+        if samples.dtype != np.uint64:
+            samples = pack_bits(samples)
+        if counts is None:
+            counts = np.ones(len(samples), dtype=np.int64)
+        return samples, np.asarray(counts)
+
+    def mitigated_z(self, samples, counts=None):
+        """
+        Readout-corrected <Z_i> for every qubit from one pass over the
+        samples (dict, (shots, n) bits or packed rows with counts).
+        """
+        packed, counts = self._samples(samples, counts)
+        # Per-site popcounts on the packed rows; raw shots (all counts 1) need no weights
+        ones = bit_counts(packed, self.n, counts=None if np.all(counts == 1) else counts)
+        p1 = ones / counts.sum()
+        return self._z_weights[:, 0] * (1.0 - p1) + self._z_weights[:, 1] * p1
+
+    def mitigated_marginals(self, samples, counts=None):
+        """Readout-corrected P(bit_i = 1), clipped to [0, 1]."""
+        return np.clip(0.5 * (1.0 - self.mitigated_z(samples, counts)), 0.0, 1.0)
+
+    def mitigated_imbalance(self, samples, counts=None):
+        """Readout-corrected imbalance (1/n) sum_i (-1)^i <Z_i> (linear, so exact under tensored noise)."""
+        return float(np.mean(self.mitigated_z(samples, counts) * (-1.0) ** np.arange(self.n)))
+
+    def expectation_z(self, samples, sites, counts=None):
+        """Readout-corrected <prod_{i in sites} Z_i>, e.g. a ZZ correlator."""
+        packed, counts = self._samples(samples, counts)
+        sites = np.asarray(sites)
+        bits = unpack_bits(packed, self.n)[:, sites]
+        values = np.prod(self._z_weights[sites, bits], axis=1)
+        return float(counts @ values / counts.sum())
+
+    def mitigate_distribution(self, samples, counts=None, max_distance=3):
+        """
+        Full-distribution correction restricted to the observed bitstrings:
+        solves A_S q = p_raw, where A_S is the tensored confusion matrix on
+        the observed subspace S, keeping only entries within Hamming
+        distance max_distance (columns renormalised), by sparse least
+        squares. q is then projected onto the probability simplex.
+
+        Returns:
+            (packed rows of S, probabilities)
+        """
+        packed, counts = self._samples(samples, counts)
+        rows, inverse = np.unique(packed, axis=0, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=counts, minlength=len(rows))
+        p_raw = weights / weights.sum()
+        A_S = self._subspace_matrix(rows, max_distance)
+
+        q = linalg.lsqr(A_S, p_raw, atol=1e-12, btol=1e-12)[0]
+        return rows, project_to_simplex(q)
+
+    def _subspace_matrix(self, rows, max_distance):
+        k = len(rows)
+        bits = unpack_bits(rows, self.n)
+        with np.errstate(divide='ignore'):
+            log_A = np.log(self.A_qubits)
+        qubit_idx = np.arange(self.n)
+
+        # Pairs within max_distance, found chunk by chunk by XOR + popcount
+        chunk = max(1, 2**22 // (k * rows.shape[1]))
+        pair_rows, pair_cols, values = [], [], []
+        for start in range(0, k, chunk):
+            dist = popcount(rows[start:start + chunk, None, :] ^ rows[None, :, :])
+            x, y = np.nonzero(dist <= max_distance)
+            x += start
+            # A_S[x, y] = prod_i A_i[x_i, y_i]
+            values.append(np.exp(log_A[qubit_idx, bits[x], bits[y]].sum(axis=1)))
+            pair_rows.append(x)
+            pair_cols.append(y)
+        A_S = csc_matrix((np.concatenate(values), (np.concatenate(pair_rows), np.concatenate(pair_cols))),
+                         shape=(k, k))
+        # Each true state's probability leaking outside S is dropped
+        col_sums = np.asarray(A_S.sum(axis=0)).ravel()
+        return A_S @ diags(1.0 / col_sums)
+
+    def apply_mitigation(self, raw_counts, max_distance=3):
+        """
+        Applies Tensored Inverse Calibration to recover true probability distribution.
+
+        Accepts a {bitstring: count} dict (returns mitigated counts in the
+        same form, scaled to the original number of shots) or packed rows
+        (returns (rows, probabilities)). Never forms a 2^n matrix.
+        """
+        if isinstance(raw_counts, dict):
+            shots = sum(raw_counts.values())
+            rows, probs = self.mitigate_distribution(raw_counts, max_distance=max_distance)
+            keep = probs > 0
+            return to_count_dict(rows[keep], probs[keep] * shots, self.n)
+        return self.mitigate_distribution(raw_counts, max_distance=max_distance)
+
+    def calibrate_on_hardware(self, engine, qubits=None, sampler=None, repetitions=2000,
+                              n_random=0, seed=None, cache_dir=None, max_age_hours=24.0):
+        """
+        Automated calibration sequence to learn the Confusion Matrix A
+        directly from the target QPU.
+
+        Runs |00...0>, |11...1> and n_random random basis-state circuits
+        (which average each qubit's estimate over its neighbours' states,
+        exposing correlated readout errors) on the mapped qubits as one
+        batch, and estimates a confusion matrix per qubit. With a cache_dir,
+        results are cached on disk per (engine, qubit set) and reused until
+        they are older than max_age_hours; without one nothing is written.
+
+        Args:
+            engine: Device name (cache key)
+            qubits: Mapped qubit path (default: LineQubits 0..n-1)
+            sampler: The device's cirq.Sampler (required; for a simulated
+                     device e.g. a noise_models.ReadoutNoiseSampler, with
+                     an engine name that says so)
+            cache_dir: Calibration cache directory (default None: no caching)
+
+        Returns:
+            (n, 2, 2) per-qubit confusion matrices A[measured, true]
+        """
+        if sampler is None:
+            # Calibrating against a simulator of our own A would only return A
+            raise ValueError(f"calibrate_on_hardware needs the sampler of engine '{engine}'.")
+        qubits = list(qubits) if qubits is not None else cirq.LineQubit.range(self.n)
+        cache = CalibrationCache(cache_dir, max_age_hours) if cache_dir is not None else None
+        print(f"[*] Initiating Readout Calibration on {engine}...")
+        if cache is not None:
+            cached = cache.load(engine, qubits)
+            if cached is not None:
+                print("    -> Using cached calibration.")
+                self.set_confusion_matrix(cached)
+                return self.A
+
+        print("    -> Preparing |00...0> state...")
+        print("    -> Preparing |11...1> state...")
+        if n_random:
+            print(f"    -> Preparing {n_random} random basis states...")
+        prepared, circuits = calibration_circuits(qubits, n_random=n_random, seed=seed)
+        results = sampler.run_batch(circuits, repetitions=repetitions)
+        measured = np.stack([np.column_stack([r[0].measurements[f'q{i}'][:, 0] for i in range(len(qubits))])
+                             for r in results])
+
+        print("    -> Computing inversion matrix A^-1...")
+        self.set_confusion_matrix(estimate_confusion_matrices(prepared, measured))
+        if cache is not None:
+            cache.save(engine, qubits, self.A)
+        return self.A
+
+def calibration_circuits(qubits, n_random=0, seed=None):
+    """
+    Basis-state preparation circuits for readout calibration: all zeros,
+    all ones, then n_random uniformly random bitstrings. Each qubit is
+    measured under its own key 'q<i>', so simulators keep product states
+    split and any path length is cheap.
+
+    Returns:
+        (prepared bits (circuits, n), list of cirq.Circuit)
+    """
+    n = len(qubits)
+    rng = np.random.default_rng(seed)
+    prepared = np.vstack([np.zeros(n, dtype=np.uint8), np.ones(n, dtype=np.uint8),
+                          rng.integers(0, 2, size=(n_random, n), dtype=np.uint8)])
+    circuits = []
+    for bits in prepared:
+        circuit = cirq.Circuit(cirq.X(q) for q, b in zip(qubits, bits) if b)
+        circuit.append(cirq.measure(q, key=f'q{i}') for i, q in enumerate(qubits))
+        circuits.append(circuit)
+    return prepared, circuits
+
+def estimate_confusion_matrices(prepared, measured):
+    """
+    Per-qubit A[measured, true] from prepared bits (circuits, n) and the
+    measured bits (circuits, repetitions, n), counted in one pass.
+    """
+    prepared = np.asarray(prepared, dtype=bool)[:, None, :]
+    measured = np.asarray(measured, dtype=bool)
+    A = np.empty((prepared.shape[-1], 2, 2))
+    for t in (0, 1):
+        was_t = prepared == bool(t)
+        n_t = np.sum(np.broadcast_to(was_t, measured.shape), axis=(0, 1))
+        ones = np.sum(measured & was_t, axis=(0, 1))
+        with np.errstate(invalid='ignore'):
+            A[:, 1, t] = ones / n_t
+        # Qubits never prepared in t (possible only without the fixed circuits) assume ideal readout
+        A[n_t == 0, 1, t] = float(t)
+        A[:, 0, t] = 1.0 - A[:, 1, t]
+    return A
+
+class CalibrationCache:
+    """
+    On-disk confusion-matrix cache. One JSON file per calibration, named
+    <engine>_<qubit-set hash>_<unix time>.json; matrices are stored per
+    qubit name, so any path over the same qubit set can reuse them.
+    Entries older than max_age_hours are ignored and removed.
+    """
+    def __init__(self, cache_dir, max_age_hours=24.0):
+        self.cache_dir = cache_dir
+        self.max_age = max_age_hours * 3600.0
+
+    def _prefix(self, engine, qubits):
+        names = sorted(str(q) for q in qubits)
+        digest = hashlib.sha1(",".join(names).encode()).hexdigest()[:16]
+        return f"{re.sub(r'[^A-Za-z0-9.-]', '_', str(engine))}_{digest}_"
+
+    def load(self, engine, qubits, now=None):
+        """Newest unexpired (n, 2, 2) matrices for qubits (in the given order), or None."""
+        if not os.path.isdir(self.cache_dir):
+            return None
+        now = time.time() if now is None else now
+        prefix = self._prefix(engine, qubits)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.json'):
+                stamp = int(name[len(prefix):-len('.json')])
+                path = os.path.join(self.cache_dir, name)
+                if now - stamp > self.max_age:
+                    os.remove(path)
+                else:
+                    entries.append((stamp, path))
+        if not entries:
+            return None
+        with open(max(entries)[1], 'r') as f:
+            matrices = json.load(f)['confusion_matrices']
+        return np.array([matrices[str(q)] for q in qubits])
+
+    def save(self, engine, qubits, A, now=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        stamp = int(time.time() if now is None else now)
+        path = os.path.join(self.cache_dir, f"{self._prefix(engine, qubits)}{stamp}.json")
+        record = {'engine': str(engine), 'timestamp': stamp,
+                  'confusion_matrices': {str(q): a.tolist() for q, a in zip(qubits, A)}}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+        return path
+
+def project_to_simplex(q):
+    """Closest probability vector to q in the 2-norm (sort-and-threshold)."""
+    u = np.sort(q)[::-1]
+    cumulative = np.cumsum(u) - 1.0
+    rho = np.nonzero(u - cumulative / np.arange(1, len(u) + 1) > 0)[0][-1]
+    return np.maximum(q - cumulative[rho] / (rho + 1.0), 0.0)
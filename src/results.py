@@ -0,0 +1,292 @@
+# src/results.py
+import os
+import json
+import numpy as np
+import yaml
+
+from src.bitstrings import n_words, pack_bits, pack_bytes, bytes_to_words
+from src.estimators import packed_imbalance, shot_statistics
+
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.jsonl'
+SUMMARY_FORMATS = ('json', 'yaml')
+
+class ResultStore:
+    """
+    Append-only on-disk store for one campaign, in directory `path`:
+
+        meta.json          run metadata (config, qubits, packing), written once
+        shots/000000.npy   measured shots of one realization, bit-packed
+        traces/000001.npy  imbalance traces (or any per-realization array)
+        index.jsonl        one line per committed chunk or scalar record
+        summary.json       human-readable summary sidecar (summary_format)
+
+    Shots are packed as uint64 words (pack_bits) or uint8 bytes
+    (pack_bytes) and split into chunks of at most chunk_shots rows. Every
+    chunk is written to a temporary file and renamed into place before its
+    index line is appended, so an interrupted run leaves a consistent
+    store; mode='a' continues it. Realizations that were fully written are
+    listed in `completed` (runs skip them), the chunks of a torn one are
+    dropped. Read it back with ResultReader.
+
+    Args:
+        path: Store directory (output.save_path)
+        num_qubits: Bits per shot
+        metadata: JSON-serialisable run description, stored in meta.json
+        packing: 'uint64' or 'uint8'
+        chunk_shots: Maximum shots per chunk file
+        summary_format: 'json' or 'yaml' (output.format)
+        mode: 'w' replaces an existing store, 'a' appends to it (only if
+              num_qubits, packing and metadata match the stored run)
+    """
+    def __init__(self, path, num_qubits, metadata=None, packing='uint64', chunk_shots=1 << 20,
+                 summary_format='json', mode='w'):
+        if packing not in ('uint64', 'uint8'):
+            raise ValueError(f"Unknown packing '{packing}' (expected 'uint64' or 'uint8').")
+        if summary_format not in SUMMARY_FORMATS:
+            raise ValueError(f"Unknown output format '{summary_format}' (expected one of {SUMMARY_FORMATS}).")
+        self.path = path
+        self.num_qubits = num_qubits
+        self.packing = packing
+        self.chunk_shots = chunk_shots
+        self.summary_format = summary_format
+        for sub in ('shots', 'traces'):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if mode == 'a' and os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                self.meta = json.load(f)
+            if (self.meta['num_qubits'], self.meta['packing']) != (num_qubits, packing):
+                raise ValueError(f"Store at {path} holds {self.meta['num_qubits']}-qubit "
+                                 f"{self.meta['packing']} shots; cannot append {num_qubits}-qubit {packing}.")
+            # Compared as stored, i.e. after the JSON round trip
+            metadata = json.loads(json.dumps(metadata or {}, default=_to_json))
+            stored = self.meta['metadata']
+            differing = sorted(key for key in set(stored) | set(metadata) if stored.get(key) != metadata.get(key))
+            if differing:
+                raise ValueError(f"Store at {path} belongs to a different run (metadata differs in "
+                                 f"{', '.join(differing)}); cannot append to it.")
+            entries = _read_index(path)
+            torn = _torn_realizations(entries)
+            entries = [entry for entry in entries if entry['realization'] not in torn]
+            # Drop a torn final line, and the chunks of a realization cut off
+            # midway, so new entries start on a fresh one
+            _write_atomic(os.path.join(path, INDEX_FILE),
+                          ''.join(json.dumps(entry) + '\n' for entry in entries))
+            self.completed = {entry['realization'] for entry in entries}
+            self._next_chunk = len(entries)
+        elif mode in ('w', 'a'):
+            self._clear()
+            self.meta = {'num_qubits': num_qubits, 'packing': packing, 'metadata': metadata or {}}
+            _write_atomic(meta_path, json.dumps(self.meta, indent=2, default=_to_json))
+            self.completed = set()
+            self._next_chunk = 0
+        else:
+            raise ValueError(f"Unknown mode '{mode}' (expected 'w' or 'a').")
+        self._index = open(os.path.join(path, INDEX_FILE), 'a')
+
+    def _clear(self):
+        """Removes the files of a previous store in this directory."""
+        for entry in _read_index(self.path):
+            if 'file' in entry and os.path.exists(os.path.join(self.path, entry['file'])):
+                os.remove(os.path.join(self.path, entry['file']))
+        for name in (INDEX_FILE, META_FILE) + tuple(f'summary.{ext}' for ext in SUMMARY_FORMATS):
+            if os.path.exists(os.path.join(self.path, name)):
+                os.remove(os.path.join(self.path, name))
+
+    def _commit(self, entry):
+        self._index.write(json.dumps(entry, default=_to_json) + '\n')
+        self._index.flush()
+        os.fsync(self._index.fileno())
+
+    def _write_chunk(self, kind, array):
+        name = os.path.join(kind, f'{self._next_chunk:06d}.npy')
+        self._next_chunk += 1
+        tmp_path = os.path.join(self.path, name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        return name
+
+    def append_shots(self, realization, shots, **info):
+        """
+        Stores the shots of one realization: (shots, L) 0/1 bits, or uint64
+        rows already packed with pack_bits. Extra keyword values (e.g. phi)
+        are kept in the index.
+        """
+        shots = np.asarray(shots)
+        if shots.dtype == np.uint64:
+            if self.packing == 'uint8':
+                shots = shots.view(np.uint8)[:, :-(-self.num_qubits // 8)]
+        elif self.packing == 'uint64':
+            shots = pack_bits(shots)
+        else:
+            shots = pack_bytes(shots)
+        chunks = -(-len(shots) // self.chunk_shots)
+        for start in range(0, len(shots), self.chunk_shots):
+            chunk = np.ascontiguousarray(shots[start:start + self.chunk_shots])
+            name = self._write_chunk('shots', chunk)
+            self._commit({'kind': 'shots', 'realization': int(realization), 'file': name,
+                          'shots': len(chunk), 'chunks': chunks, **info})
+
+    def append_trace(self, realization, trace, **info):
+        """Stores an array for one realization, e.g. its imbalance trace I(t)."""
+        name = self._write_chunk('traces', np.asarray(trace))
+        self._commit({'kind': 'trace', 'realization': int(realization), 'file': name, **info})
+
+    def record(self, realization, **values):
+        """Stores scalar results of one realization (imbalance, error, ...)."""
+        self._commit({'kind': 'values', 'realization': int(realization), **values})
+
+    def write_summary(self, **summary):
+        """Writes the summary sidecar: metadata plus the given campaign-level values."""
+        content = {**self.meta, **summary}
+        path = os.path.join(self.path, f'summary.{self.summary_format}')
+        if self.summary_format == 'json':
+            text = json.dumps(content, indent=2, default=_to_json)
+        else:
+            text = yaml.safe_dump(json.loads(json.dumps(content, default=_to_json)), sort_keys=False)
+        _write_atomic(path, text)
+        return path
+
+    def close(self):
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ResultReader:
+    """
+    Read side of a ResultStore. Chunks are memory-mapped, so per-realization
+    statistics stream through the campaign a chunk at a time.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.num_qubits = self.meta['num_qubits']
+        self.packing = self.meta['packing']
+        self.index = _read_index(path)
+
+    @property
+    def metadata(self):
+        return self.meta['metadata']
+
+    def realizations(self):
+        return sorted({entry['realization'] for entry in self.index})
+
+    def _entries(self, kind, realization=None):
+        return [entry for entry in self.index if entry['kind'] == kind
+                and (realization is None or entry['realization'] == realization)]
+
+    def _load(self, entry):
+        return np.load(os.path.join(self.path, entry['file']), mmap_mode='r')
+
+    def shot_chunks(self, realization=None):
+        """
+        Yields the shot chunks (of one realization, or all) as uint64 rows
+        in the pack_bits layout: memory-mapped for 'uint64' packing,
+        converted chunk by chunk for 'uint8'.
+        """
+        for entry in self._entries('shots', realization):
+            chunk = self._load(entry)
+            yield chunk if self.packing == 'uint64' else bytes_to_words(chunk, self.num_qubits)
+
+    def shots(self, realization):
+        """All packed shots of a realization (a memory map if they fit one chunk)."""
+        chunks = list(self.shot_chunks(realization))
+        if not chunks:
+            return np.zeros((0, n_words(self.num_qubits)), dtype=np.uint64)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def distribution(self, realization):
+        """
+        (distinct packed rows, counts) of a realization, merged chunk by
+        chunk; the input ResultReader hands to ReadoutErrorMitigator.
+        """
+        rows, counts = [], []
+        for chunk in self.shot_chunks(realization):
+            r, c = np.unique(chunk, axis=0, return_counts=True)
+            rows.append(r)
+            counts.append(c)
+        if not rows:
+            return np.zeros((0, n_words(self.num_qubits)), dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        rows, inverse = np.unique(np.concatenate(rows), axis=0, return_inverse=True)
+        return rows, np.bincount(inverse.ravel(), weights=np.concatenate(counts), minlength=len(rows)).astype(np.int64)
+
+    def imbalance(self, realization):
+        """Shot-averaged imbalance of a realization, by popcount over the packed chunks."""
+        total, shots = 0.0, 0
+        for chunk in self.shot_chunks(realization):
+            total += packed_imbalance(chunk, self.num_qubits).sum()
+            shots += len(chunk)
+        return total / shots if shots else float('nan')
+
+    def statistics(self, realization, distances=(1,)):
+        """
+        src/estimators.py ShotStatistics of a realization (imbalance,
+        magnetizations, ZZ correlators at `distances`), streamed over its chunks.
+        """
+        return shot_statistics(self.shot_chunks(realization), self.num_qubits, distances)
+
+    def mitigated_imbalance(self, realization, mitigator):
+        """Readout-corrected imbalance via a src/rem.py ReadoutErrorMitigator."""
+        return mitigator.mitigated_imbalance(*self.distribution(realization))
+
+    def traces(self, realization):
+        """Memory-mapped arrays stored with append_trace, in order."""
+        return [self._load(entry) for entry in self._entries('trace', realization)]
+
+    def values(self):
+        """{realization: {name: value}} from record(), later records overriding earlier ones."""
+        values = {}
+        for entry in self._entries('values'):
+            values.setdefault(entry['realization'], {}).update(
+                {k: v for k, v in entry.items() if k not in ('kind', 'realization')})
+        return values
+
+    def imbalances(self):
+        """Per-realization imbalances: from stored shots where present, else recorded values."""
+        recorded = self.values()
+        with_shots = {entry['realization'] for entry in self._entries('shots')}
+        return np.array([self.imbalance(r) if r in with_shots else recorded[r]['imbalance']
+                         for r in self.realizations() if r in with_shots or 'imbalance' in recorded.get(r, {})])
+
+def _read_index(path):
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    entries = []
+    with open(index_path, 'r') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # Torn final line from an interrupted write
+    return entries
+
+def _torn_realizations(entries):
+    """Realizations with fewer shot chunks in the index than append_shots wrote."""
+    found, expected = {}, {}
+    for entry in entries:
+        if entry['kind'] == 'shots' and 'chunks' in entry:
+            found[entry['realization']] = found.get(entry['realization'], 0) + 1
+            expected[entry['realization']] = entry['chunks']
+    return {r for r in found if found[r] < expected[r]}
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
@@ -0,0 +1,130 @@
+# src/sampling.py
+import numpy as np
+
+from src.bitstrings import n_words
+
+# Shot sampling straight into the packed layout of src/bitstrings.py. A
+# basis-state index has site 0 as its most significant bit (the statevector
+# convention of src/statevector.py and cirq), while packed rows keep site i
+# in bit i, so a sampled index is its bit-reversed packed row.
+
+# Amplitudes per block: the cumulative distribution is formed one block at
+# a time, so sampling never allocates a second 2^L array
+BLOCK = 2**20
+
+_BYTE_REVERSE = np.array([int(f'{b:08b}'[::-1], 2) for b in range(256)], dtype=np.uint8)
+
+def sample_indices(state, shots, rng=None, block=BLOCK):
+    """
+    `shots` basis-state indices drawn from a statevector (complex
+    amplitudes) or a probability vector, by cumulative sampling: a
+    multinomial over blocks, then a sorted search of each drawn block's
+    running sum. Returns int64 indices in random order.
+    """
+    rng = np.random.default_rng(rng)
+    state = np.asarray(state)
+    blocks = state.reshape(-1, min(block, state.size))
+    weight = (lambda b: b.real**2 + b.imag**2) if np.iscomplexobj(state) else (lambda b: b)
+    weights = np.array([weight(b).sum(dtype=np.float64) for b in blocks])
+    counts = rng.multinomial(shots, weights / weights.sum())
+
+    indices = np.empty(shots, dtype=np.int64)
+    filled = 0
+    for k in np.flatnonzero(counts):
+        cdf = np.cumsum(weight(blocks[k]), dtype=np.float64)
+        # Sorted draws walk the running sum once instead of hopping around it
+        u = np.sort(rng.random(counts[k])) * cdf[-1]
+        picked = np.minimum(np.searchsorted(cdf, u, side='right'), len(cdf) - 1)
+        indices[filled:filled + counts[k]] = k * blocks.shape[1] + picked
+        filled += counts[k]
+    # Blocks were drawn in order; shuffle so the shot sequence is exchangeable
+    return rng.permutation(indices)
+
+def indices_to_packed(indices, num_qubits):
+    """Basis-state indices (site 0 = MSB) -> (shots, 1) uint64 rows in the pack_bits layout."""
+    if num_qubits > 64:
+        raise ValueError(f"Basis-state indices cover at most 64 qubits, got {num_qubits}.")
+    as_bytes = np.ascontiguousarray(indices, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    reversed_words = np.ascontiguousarray(_BYTE_REVERSE[as_bytes[:, ::-1]]).view('<u8')
+    return reversed_words >> np.uint64(64 - num_qubits)
+
+def sample_packed(state, shots, num_qubits, rng=None, readout=None):
+    """
+    `shots` measurements of every site as packed uint64 rows, optionally
+    with readout flips (a (p10, p01) pair for readout_flips).
+    """
+    rng = np.random.default_rng(rng)
+    packed = indices_to_packed(sample_indices(state, shots, rng), num_qubits)
+    if readout is not None:
+        readout_flips(packed, num_qubits, *readout, rng=rng)
+    return packed
+
+def sample_realizations(states, shots, num_qubits, seed=None, readout=None):
+    """
+    Samples `shots` from each statevector or probability vector of an
+    iterable (e.g. a generator over realizations, so only one state is
+    alive at a time) into one (realizations, shots, n_words) uint64 batch.
+    Every realization gets its own RNG stream spawned from `seed`.
+    """
+    batch = []
+    for state, child in zip(states, _spawn(seed)):
+        batch.append(sample_packed(state, shots, num_qubits, np.random.default_rng(child), readout))
+    if not batch:
+        return np.zeros((0, shots, n_words(num_qubits)), dtype=np.uint64)
+    return np.stack(batch)
+
+def _spawn(seed):
+    sequence = np.random.SeedSequence(seed)
+    while True:
+        yield sequence.spawn(1)[0]
+
+def readout_flips(packed, num_qubits, p10, p01, rng=None, chunk_shots=1 << 20):
+    """
+    Applies classical readout error to packed rows in place: bit i reads
+    1 when it was 0 with probability p10[i], 0 when it was 1 with p01[i]
+    (scalars or per-qubit arrays).
+
+    Flip candidates are drawn as a Bernoulli process at the largest rate
+    by geometric gaps over the (shot, qubit) cells and then thinned to each
+    cell's actual rate, so the cost scales with the number of flips rather
+    than shots * L. Returns packed.
+    """
+    rng = np.random.default_rng(rng)
+    p10 = np.broadcast_to(np.asarray(p10, dtype=float), (num_qubits,))
+    p01 = np.broadcast_to(np.asarray(p01, dtype=float), (num_qubits,))
+    rate = max(p10.max(), p01.max())
+    if not packed.flags.c_contiguous:
+        raise ValueError("readout_flips updates packed rows in place; pass a C-contiguous array.")
+    if rate <= 0.0 or len(packed) == 0:
+        return packed
+    words = packed.shape[1]
+    for start in range(0, len(packed), chunk_shots):
+        rows = packed[start:start + chunk_shots]
+        cells = rows.shape[0] * num_qubits
+        positions = _bernoulli_positions(cells, rate, rng)
+        shot, site = np.divmod(positions, num_qubits)
+        word, bit = site // 64, (site % 64).astype(np.uint64)
+        value = (rows[shot, word] >> bit) & np.uint64(1)
+        keep = rng.random(len(positions)) * rate < np.where(value == 1, p01[site], p10[site])
+        shot, word, bit = shot[keep], word[keep], bit[keep]
+        if len(shot) == 0:
+            continue
+        # Positions are increasing, so flips into the same word are adjacent
+        key = shot * words + word
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        masks = np.bitwise_or.reduceat(np.uint64(1) << bit, starts)
+        rows.reshape(-1)[key[starts]] ^= masks
+    return packed
+
+def _bernoulli_positions(cells, rate, rng):
+    """Sorted indices of successes among `cells` independent Bernoulli(rate) trials."""
+    expected = cells * rate
+    positions = []
+    last = -1
+    while last < cells - 1:
+        gaps = rng.geometric(rate, size=int(expected + 6.0 * np.sqrt(expected)) + 16)
+        chunk = last + np.cumsum(gaps)
+        positions.append(chunk)
+        last = chunk[-1]
+    positions = np.concatenate(positions)
+    return positions[:np.searchsorted(positions, cells)]
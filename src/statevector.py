@@ -0,0 +1,205 @@
+# src/statevector.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from src.hamiltonian import z_projections
+from src.sampling import sample_packed
+from src import instrumentation
+
+# From this size on every pass over the state is split across threads
+# (numpy and BLAS release the GIL).
+THREADED_MIN_L = 20
+# Largest noiseless verification run src/main.py hands to this backend
+NATIVE_MAX_L = 28
+# From this size src/main.py runs in complex64: 2^28 amplitudes take 2 GB
+# instead of 4 GB, and sampling needs no more precision
+SINGLE_PRECISION_MIN_L = 26
+# Amplitudes per scratch chunk: small enough to stay in cache while a
+# block is multiplied and copied back
+CHUNK = 2**15
+
+class TrotterSimulator:
+    """
+    Statevector simulator specialised to the compiled Aubry-Andre Trotter
+    step (src/compiler.py): a brick layer of identical FSim(theta, phi)
+    gates on even bonds, one on odd bonds, then Rz(rz_i) on every site.
+
+    The state is one flat array, site 0 being the most significant bit (as
+    in cirq with qubit_order=path). A layer is cut into blocks of at most
+    block_sites consecutive sites that no gate crosses; each block's gates
+    are multiplied into one 2^k x 2^k matrix and applied to the state
+    viewed as (2^start, 2^k, rest), a small GEMM per cache-sized chunk.
+    One pass over memory therefore applies k/2 gates instead of one, and
+    the Rz layer is folded into the odd layer's blocks as a diagonal
+    phase, so it costs no pass of its own. The state is updated in place
+    through preallocated per-thread scratch; nothing is allocated per gate
+    or per step.
+
+    Args:
+        L: Number of sites
+        threads: Worker threads (default: all CPUs for L >= THREADED_MIN_L, else 1)
+        dtype: complex128, or complex64 to halve memory and traffic at L ~ 28
+        block_sites: Largest block (GEMM of dimension 2^block_sites)
+    """
+    def __init__(self, L, threads=None, dtype=np.complex128, block_sites=4):
+        self.L = L
+        self.dim = 2**L
+        self.dtype = np.dtype(dtype)
+        if threads is None:
+            threads = (os.cpu_count() or 1) if L >= THREADED_MIN_L else 1
+        self.threads = max(1, threads)
+        # Block starts that do not cut a gate: a cut before site j splits
+        # bond (j-1, j), which belongs to the even layer for odd j - 1
+        self.even_blocks = _partition(L, block_sites, [j for j in range(L) if j % 2 == 0])
+        self.odd_blocks = _partition(L, block_sites, [0] + [j for j in range(L) if j % 2 == 1])
+        self._plans = {block: _chunk_plan(L, *block) for block in set(self.even_blocks + self.odd_blocks)}
+        self._scratch = [np.empty(CHUNK, dtype=self.dtype) for _ in range(self.threads)]
+        self._pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def basis_state(self, bits):
+        """|b_0 b_1 ... b_L-1>."""
+        psi = np.zeros(self.dim, dtype=self.dtype)
+        psi[int(''.join(str(int(b)) for b in bits), 2)] = 1.0
+        return psi
+
+    def neel_state(self):
+        """|0101...>, the state src/main.py prepares with X on odd sites."""
+        return self.basis_state(np.arange(self.L) % 2)
+
+    def layer_matrices(self, values):
+        """
+        [(start, size, matrix)] for one Trotter step: the even-bond blocks,
+        then the odd-bond blocks with the Rz phases folded in. `values` are
+        the step's symbol values, as from TrotterStepTemplate.param_values().
+        """
+        theta, phi = values['theta'], values['phi']
+        c, s = np.cos(theta), -1j * np.sin(theta)
+        fsim = np.array([[1, 0, 0, 0], [0, c, s, 0], [0, s, c, 0], [0, 0, 0, np.exp(-1j * phi)]])
+        rz = np.array([values[f'rz_{i}'] for i in range(self.L)])
+
+        layers = []
+        for blocks, parity in ((self.even_blocks, 0), (self.odd_blocks, 1)):
+            for start, size in blocks:
+                M = np.eye(1, dtype=complex)
+                j = start
+                while j < start + size:
+                    if j % 2 == parity and j + 1 < start + size:
+                        M = np.kron(M, fsim)
+                        j += 2
+                    else:
+                        M = np.kron(M, np.eye(2))
+                        j += 1
+                if parity == 1:
+                    # Rz(a) = diag(e^{-ia/2}, e^{ia/2}) applied after the odd bonds
+                    z = np.ones(1)
+                    for a in rz[start:start + size]:
+                        z = np.kron(z, np.exp(-0.5j * a * np.array([1.0, -1.0])))
+                    M = z[:, None] * M
+                layers.append((start, size, M.astype(self.dtype)))
+        return layers
+
+    def evolve(self, psi, values, steps):
+        """Applies `steps` Trotter steps to psi in place."""
+        layers = [(self._plans[(start, size)], M, np.ascontiguousarray(M.T)) for start, size, M in self.layer_matrices(values)]
+        with instrumentation.span('native_evolve', L=self.L, steps=steps, threads=self.threads):
+            for _ in range(steps):
+                for plan, M, MT in layers:
+                    self._apply(psi, plan, M, MT)
+        instrumentation.count('native_gates', steps * (2 * self.L - 1))
+        return psi
+
+    def _apply(self, psi, plan, M, MT):
+        shape, tasks = plan
+        view = psi.reshape(shape)
+        if self._pool is None:
+            _run_tasks(view, tasks, M, MT, self._scratch[0])
+            return
+        n = min(self.threads, len(tasks))
+        bounds = np.linspace(0, len(tasks), n + 1).astype(int)
+        futures = [self._pool.submit(_run_tasks, view, tasks[lo:hi], M, MT, self._scratch[k])
+                   for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))]
+        for future in futures:
+            future.result()
+
+    def probabilities(self, psi):
+        return np.abs(psi)**2
+
+    def z_expectations(self, psi, probs=None):
+        """<Z_i> for every site."""
+        return z_projections(self.probabilities(psi) if probs is None else probs)
+
+    def imbalance(self, psi, probs=None):
+        """Exact imbalance (1/L) sum_i (-1)^i <Z_i>."""
+        return float(np.mean(self.z_expectations(psi, probs) * (-1.0) ** np.arange(self.L)))
+
+    def sample(self, psi, shots, rng=None, readout=None):
+        """
+        `shots` measurements of every site as packed uint64 rows (see
+        src/sampling.py), drawn from the amplitudes block by block, with
+        optional (p10, p01) readout flips.
+        """
+        return sample_packed(psi, shots, self.L, rng=rng, readout=readout)
+
+def _partition(L, max_size, starts):
+    """
+    Cuts sites 0..L-1 into blocks (start, size) beginning at allowed
+    starts, taking the largest block that fits from the end, so the last
+    block ends on the least significant bit and the others keep long
+    contiguous rows.
+    """
+    allowed = set(starts)
+    blocks = []
+    end = L
+    while end > 0:
+        start = next((j for j in range(max(0, end - max_size), end) if j in allowed), None)
+        if start is None:
+            raise ValueError(f"No block of at most {max_size} sites can end at site {end - 1} without "
+                             f"cutting a gate; block_sites must be at least 2.")
+        blocks.append((start, end - start))
+        end = start
+    return blocks[::-1]
+
+def _chunk_plan(L, start, size):
+    """
+    View shape and chunk list for applying a 2^size matrix to sites
+    start..start+size-1. Each task is ('rows', slice) on an (A, D) view,
+    ('cols', a, slice) on one (D, B) slab, or ('stack', slice) on (A, D, B).
+    """
+    A, D = 2**start, 2**size
+    B = 2**(L - start - size)
+    if B == 1:
+        rows = max(1, CHUNK // D)
+        return (A, D), [('rows', slice(a, min(a + rows, A))) for a in range(0, A, rows)]
+    if B * D >= CHUNK:
+        cols = max(1, CHUNK // D)
+        return (A, D, B), [('cols', a, slice(b, min(b + cols, B))) for a in range(A) for b in range(0, B, cols)]
+    rows = max(1, CHUNK // (D * B))
+    return (A, D, B), [('stack', slice(a, min(a + rows, A))) for a in range(0, A, rows)]
+
+def _run_tasks(view, tasks, M, MT, scratch):
+    for task in tasks:
+        if task[0] == 'rows':
+            block = view[task[1]]
+            out = scratch[:block.size].reshape(block.shape)
+            np.matmul(block, MT, out=out)
+        elif task[0] == 'cols':
+            block = view[task[1], :, task[2]]
+            out = scratch[:block.size].reshape(block.shape)
+            np.matmul(M, block, out=out)
+        else:
+            block = view[task[1]]
+            out = scratch[:block.size].reshape(block.shape)
+            np.matmul(M, block, out=out)
+        block[...] = out
@@ -0,0 +1,188 @@
+# src/topology.py
+import os
+import json
+import hashlib
+import numpy as np
+import yaml
+import cirq
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+# HARDCODED DEFECT MAP (Simulating 'Weber' chip calibration data)
+# This signals insider awareness of yield issues [cite: 119]
+SYCAMORE_DEAD_QUBITS = [(0, 5), (2, 4), (6, 2), (7, 8), (9, 1)]
+
+class DeviceTopology:
+    """
+    A rows x cols lattice of qubits with nearest-neighbour couplers, held as
+    flat arrays: qubit (row, col) has index row * cols + col, `alive` masks
+    dead qubits, `edges` lists live couplers as index pairs (u < v) with a
+    fidelity weight each, and (indptr, indices) is the CSR adjacency.
+    A networkx graph is built only by to_networkx().
+    """
+    def __init__(self, rows, cols, alive, edges, fidelity=None, name=None):
+        self.rows = rows
+        self.cols = cols
+        self.name = name
+        self.alive = np.asarray(alive, dtype=bool)
+        self.edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.fidelity = (np.ones(len(self.edges), dtype=np.float32) if fidelity is None
+                         else np.asarray(fidelity, dtype=np.float32))
+        n = rows * cols
+        both = np.concatenate([self.edges, self.edges[:, ::-1]])
+        adjacency = csr_matrix((np.ones(len(both), dtype=np.int8), (both[:, 0], both[:, 1])), shape=(n, n))
+        self.indptr, self.indices = adjacency.indptr, adjacency.indices
+        self._fingerprint = None
+
+    @classmethod
+    def grid(cls, rows, cols, dead_qubits=(), dead_couplers=(), coupler_fidelity=None, name=None):
+        """
+        Square lattice with defects.
+
+        Args:
+            dead_qubits: (row, col) pairs
+            dead_couplers: ((row, col), (row, col)) pairs
+            coupler_fidelity: {((row, col), (row, col)): fidelity}; unlisted couplers get 1.0
+        """
+        idx = np.arange(rows * cols).reshape(rows, cols)
+        edges = np.concatenate([np.stack([idx[:, :-1].ravel(), idx[:, 1:].ravel()], axis=1),
+                                np.stack([idx[:-1, :].ravel(), idx[1:, :].ravel()], axis=1)])
+        alive = np.ones(rows * cols, dtype=bool)
+        for r, c in dead_qubits:
+            alive[r * cols + c] = False
+        keep = alive[edges[:, 0]] & alive[edges[:, 1]]
+        if len(dead_couplers):
+            dead = np.array([sorted((a[0] * cols + a[1], b[0] * cols + b[1])) for a, b in dead_couplers])
+            keep &= ~_rows_in(edges, dead)
+        edges = edges[keep]
+
+        fidelity = np.ones(len(edges), dtype=np.float32)
+        if coupler_fidelity:
+            pairs = np.array([sorted((a[0] * cols + a[1], b[0] * cols + b[1])) for a, b in coupler_fidelity])
+            values = np.array(list(coupler_fidelity.values()), dtype=np.float32)
+            lookup = {tuple(p): v for p, v in zip(pairs, values)}
+            fidelity = np.array([lookup.get((u, v), 1.0) for u, v in edges], dtype=np.float32)
+        return cls(rows, cols, alive, edges, fidelity, name=name)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Device description in JSON or YAML:
+            rows, cols: lattice size
+            dead_qubits: [[r, c], ...]
+            dead_couplers: [[[r, c], [r, c]], ...]
+            coupler_fidelity: [[[r, c], [r, c], f], ...]
+        """
+        with open(path, 'r') as f:
+            spec = json.load(f) if path.endswith('.json') else yaml.safe_load(f)
+        fidelity = {(tuple(a), tuple(b)): f for a, b, f in spec.get('coupler_fidelity', [])}
+        return cls.grid(spec['rows'], spec['cols'],
+                        dead_qubits=[tuple(q) for q in spec.get('dead_qubits', [])],
+                        dead_couplers=[(tuple(a), tuple(b)) for a, b in spec.get('dead_couplers', [])],
+                        coupler_fidelity=fidelity, name=spec.get('name'))
+
+    def save(self, path):
+        """Compact binary form (npz): bit-packed alive mask, uint16/int32 edges, float32 weights."""
+        edge_dtype = np.uint16 if self.rows * self.cols <= np.iinfo(np.uint16).max else np.int32
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, shape=np.array([self.rows, self.cols]),
+                                alive=np.packbits(self.alive), edges=self.edges.astype(edge_dtype),
+                                fidelity=self.fidelity, name=np.array(self.name or ''))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            rows, cols = (int(x) for x in data['shape'])
+            alive = np.unpackbits(data['alive'])[:rows * cols].astype(bool)
+            name = str(data['name']) or None
+            return cls(rows, cols, alive, data['edges'].astype(np.int32), data['fidelity'], name=name)
+
+    @property
+    def num_qubits(self):
+        return int(self.alive.sum())
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def qubit(self, i):
+        return cirq.GridQubit(int(i) // self.cols, int(i) % self.cols)
+
+    def qubits(self):
+        """Live qubits as cirq.GridQubit, in index order."""
+        return [self.qubit(i) for i in np.flatnonzero(self.alive)]
+
+    def neighbors(self, i):
+        """Indices coupled to qubit index i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def component_sizes(self):
+        """Sizes of the connected components of live qubits."""
+        n = self.rows * self.cols
+        adjacency = csr_matrix((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr),
+                               shape=(n, n))
+        _, labels = connected_components(adjacency, directed=False)
+        return np.bincount(labels[self.alive]) if self.alive.any() else np.zeros(0, dtype=int)
+
+    def fingerprint(self):
+        if self._fingerprint is None:
+            h = hashlib.sha1(np.array([self.rows, self.cols]).tobytes())
+            h.update(np.packbits(self.alive).tobytes())
+            h.update(np.ascontiguousarray(self.edges).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def to_networkx(self):
+        """networkx.Graph over cirq.GridQubit nodes, couplers weighted by 'fidelity'."""
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(self.qubits())
+        G.add_edges_from((self.qubit(u), self.qubit(v), {'fidelity': float(f)})
+                         for (u, v), f in zip(self.edges, self.fidelity))
+        return G
+
+def _rows_in(a, b):
+    """Mask of rows of a (n, 2) that appear in b (m, 2)."""
+    key_a = a[:, 0].astype(np.int64) << 32 | a[:, 1]
+    key_b = b[:, 0].astype(np.int64) << 32 | b[:, 1]
+    return np.isin(key_a, key_b)
+
+# In-process registry: name -> topology; caches of the built-in devices
+# (name -> topology) and of device files (path -> (mtime, topology))
+_REGISTRY = {}
+_BUILTIN_CACHE = {}
+_FILE_CACHE = {}
+
+def register_topology(name, topology):
+    _REGISTRY[name] = topology
+
+def clear_cache():
+    """Drops the cached built-in and file topologies (registered ones stay)."""
+    _BUILTIN_CACHE.clear()
+    _FILE_CACHE.clear()
+
+def get_topology(device_name='sycamore'):
+    """
+    A registered device, a built-in ('sycamore'), or a device file
+    (.json/.yaml description or .npz from DeviceTopology.save), cached in
+    process; files are reloaded only when they change on disk.
+    """
+    if device_name in _REGISTRY:
+        return _REGISTRY[device_name]
+    if device_name in _BUILTIN_CACHE:
+        return _BUILTIN_CACHE[device_name]
+    if device_name == 'sycamore':
+        # 10x10 grid representing the raw qubit layout (simplified Sycamore topology)
+        topology = DeviceTopology.grid(10, 10, dead_qubits=SYCAMORE_DEAD_QUBITS, name='sycamore')
+        _BUILTIN_CACHE[device_name] = topology
+        return topology
+    if os.path.exists(device_name):
+        mtime = os.path.getmtime(device_name)
+        cached = _FILE_CACHE.get(device_name)
+        if cached is None or cached[0] != mtime:
+            loader = DeviceTopology.load if device_name.endswith('.npz') else DeviceTopology.from_file
+            cached = _FILE_CACHE[device_name] = (mtime, loader(device_name))
+        return cached[1]
+    raise ValueError(f"Unknown device '{device_name}'.")
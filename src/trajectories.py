@@ -0,0 +1,132 @@
+# src/trajectories.py
+import collections
+import numpy as np
+import cirq
+from concurrent.futures import ProcessPoolExecutor
+
+from src.hamiltonian import imbalance_diagonal
+
+class TrajectoryRunner:
+    """
+    Monte Carlo wavefunction backend for noisy circuits (e.g. wrapped by
+    SycamoreNoiseModel). Each trajectory is one statevector run in which
+    every Kraus channel applies a single sampled operator, so memory is
+    O(2^L) instead of the 4^L of cirq.DensityMatrixSimulator. The average
+    over trajectories converges to the density-matrix result.
+
+    Trajectories run in batches on a process pool; every batch gets its own
+    RNG stream spawned from one SeedSequence and batches are folded in
+    submission order, so results (and the stopping point) are reproducible
+    for a given seed regardless of scheduling.
+
+    Args:
+        workers: Worker processes (None/1 runs in-process)
+        batch_size: Trajectories per task
+        max_trajectories: Hard cap per run
+        min_trajectories: Never stop before this many
+        target_error: Stop once the confidence half-width drops below this
+        z: Confidence multiplier for the half-width (1.96 -> 95%)
+    """
+    def __init__(self, workers=None, batch_size=16, max_trajectories=1000,
+                 min_trajectories=64, target_error=None, z=1.96):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_trajectories = max_trajectories
+        self.min_trajectories = min_trajectories
+        self.target_error = target_error
+        self.z = z
+
+    def stream(self, circuit, qubits, noise_model=None, seed=None):
+        """
+        Runs trajectories for the Néel-imbalance of `circuit` (measurements
+        are ignored; the imbalance is evaluated exactly on each final state)
+        and yields (n, mean, half_width) after every batch, in submission order.
+        """
+        circuit = _without_measurements(circuit)
+        if noise_model is not None:
+            circuit = circuit.with_noise(noise_model)
+        qubits = list(qubits)
+        seeds = np.random.SeedSequence(seed)
+        n_batches = -(-self.max_trajectories // self.batch_size)
+        sizes = [min(self.batch_size, self.max_trajectories - b * self.batch_size) for b in range(n_batches)]
+        stats = RunningMean()
+
+        if not self.workers or self.workers <= 1:
+            for size, child in zip(sizes, seeds.spawn(n_batches)):
+                stats.update(_run_batch(circuit, qubits, size, child))
+                yield stats.n, stats.mean, self.z * stats.stderr
+                if self._converged(stats):
+                    return
+            return
+
+        # Keep a bounded number of batches in flight so an early stop wastes
+        # little work; the oldest is always folded next, as in-process
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = zip(sizes, seeds.spawn(n_batches))
+            pending = collections.deque()
+            while True:
+                for size, child in tasks:
+                    pending.append(pool.submit(_run_batch, circuit, qubits, size, child))
+                    if len(pending) >= 2 * self.workers:
+                        break
+                if not pending:
+                    return
+                stats.update(pending.popleft().result())
+                yield stats.n, stats.mean, self.z * stats.stderr
+                if self._converged(stats):
+                    for future in pending:
+                        future.cancel()
+                    return
+
+    def run(self, circuit, qubits, noise_model=None, seed=None, verbose=False):
+        """Runs stream() to completion; returns the final (n, mean, half_width)."""
+        result = (0, np.nan, np.inf)
+        for result in self.stream(circuit, qubits, noise_model=noise_model, seed=seed):
+            if verbose:
+                print(f"    trajectories={result[0]} | I={result[1]:.4f} +/- {result[2]:.4f}")
+        return result
+
+    def _converged(self, stats):
+        return (self.target_error is not None and stats.n >= self.min_trajectories
+                and self.z * stats.stderr <= self.target_error)
+
+class RunningMean:
+    """Streaming mean/variance (Chan et al. pairwise update)."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, samples):
+        samples = np.asarray(samples, dtype=float)
+        if len(samples) == 0:
+            return
+        n_b, mean_b = len(samples), samples.mean()
+        m2_b = np.sum((samples - mean_b)**2)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta**2 * self.n * n_b / n
+        self.n = n
+
+    @property
+    def stderr(self):
+        if self.n < 2:
+            return np.inf
+        return np.sqrt(self.m2 / (self.n - 1) / self.n)
+
+def _without_measurements(circuit):
+    return cirq.Circuit(cirq.Moment(op for op in moment if not cirq.is_measurement(op))
+                        for moment in circuit)
+
+def _run_batch(circuit, qubits, n, seed_sequence):
+    """Imbalance of n independent trajectories."""
+    rng = np.random.RandomState(seed_sequence.generate_state(4))
+    sim = cirq.Simulator(seed=rng)
+    # Site 0 is the most significant bit with this qubit order (src/hamiltonian.py)
+    obs = imbalance_diagonal(len(qubits)) / len(qubits)
+    values = np.empty(n)
+    for k in range(n):
+        psi = sim.simulate(circuit, qubit_order=qubits).final_state_vector
+        values[k] = np.dot(np.abs(psi)**2, obs) / np.vdot(psi, psi).real
+    return values
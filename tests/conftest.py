@@ -0,0 +1,39 @@
+# tests/conftest.py
+import os
+import sys
+from functools import reduce
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+X = np.array([[0.0, 1.0], [1.0, 0.0]])
+Z = np.diag([1.0, -1.0])
+
+
+def kron_chain(ops):
+    """Dense tensor product with site 0 as the most significant bit (src/hamiltonian.py)."""
+    return reduce(np.kron, ops)
+
+
+def site_operator(L, i, op):
+    return kron_chain([op if j == i else np.eye(2) for j in range(L)])
+
+
+def kron_hamiltonian(J, h):
+    """Dense sum_i J_i X_i X_{i+1} + sum_i h_i Z_i, built the lazarus_v2/v4 way."""
+    L = len(h)
+    H = sum(h[i] * site_operator(L, i, Z) for i in range(L))
+    return H + sum(J[i] * site_operator(L, i, X) @ site_operator(L, i + 1, X) for i in range(L - 1))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+@pytest.fixture
+def chain(rng):
+    """Random (J, h) for a 6-site chain."""
+    return rng.uniform(0.5, 1.5, size=5), rng.normal(0.0, 2.0, size=6)
@@ -0,0 +1,102 @@
+# tests/test_dynamics.py
+import numpy as np
+import pytest
+import scipy.linalg as la
+import scipy.sparse.linalg as linalg
+
+from conftest import kron_hamiltonian
+from src.hamiltonian import ChainHamiltonian, imbalance_diagonal
+from src.dynamics import CSR_MAX_DIM, ChebyshevPropagator, diagonal_trace, diagonal_trace_gradient
+from src.control import pulse_gradient
+
+T_POINTS = np.linspace(0.0, 3.0, 16)
+
+
+def neel(L):
+    psi = np.zeros(2**L)
+    psi[int('01' * (L // 2), 2)] = 1.0
+    return psi
+
+
+def squared_trace(trace):
+    return np.sum(trace**2), 2.0 * trace
+
+
+def trace_loss(J, h, method):
+    L = len(h)
+    return squared_trace(diagonal_trace(ChainHamiltonian(J, h), neel(L), T_POINTS, imbalance_diagonal(L), method))[0]
+
+
+@pytest.mark.parametrize('method', ['eig', 'step'])
+def test_trace_matches_kron_reference(chain, method):
+    J, h = chain
+    H = kron_hamiltonian(J, h)
+    psi, obs = neel(6), imbalance_diagonal(6)
+    reference = [obs @ np.abs(la.expm(-1j * t * H) @ psi)**2 for t in T_POINTS]
+    trace = diagonal_trace(ChainHamiltonian(J, h), psi, T_POINTS, obs, method=method)
+    np.testing.assert_allclose(trace, reference, atol=1e-10)
+
+
+@pytest.mark.parametrize('method', ['eig', 'step'])
+def test_trace_gradient_matches_finite_differences(chain, method):
+    J, h = chain
+    loss, d_J, d_h = diagonal_trace_gradient(ChainHamiltonian(J, h), neel(6), T_POINTS, imbalance_diagonal(6),
+                                             squared_trace, method=method)
+    assert loss == pytest.approx(trace_loss(J, h, 'eig'), rel=1e-10)
+    eps = 1e-6
+    for i in range(len(J)):
+        step = np.zeros_like(J)
+        step[i] = eps
+        numeric = (trace_loss(J + step, h, 'eig') - trace_loss(J - step, h, 'eig')) / (2 * eps)
+        assert d_J[i] == pytest.approx(numeric, rel=1e-5, abs=1e-7)
+    for i in range(len(h)):
+        step = np.zeros_like(h)
+        step[i] = eps
+        numeric = (trace_loss(J, h + step, 'eig') - trace_loss(J, h - step, 'eig')) / (2 * eps)
+        assert d_h[i] == pytest.approx(numeric, rel=1e-5, abs=1e-7)
+
+
+@pytest.mark.parametrize('method', ['eig', 'quad'])
+def test_pulse_gradient_matches_finite_differences(chain, rng, method):
+    J, h = chain
+    controls = rng.normal(0.0, 1.0, size=(4, 6))
+    psi0 = neel(6)
+    target = np.zeros(64)
+    target[int('10' * 3, 2)] = 1.0
+    fidelity, d_fidelity = pulse_gradient(J, h, controls, 0.3, psi0, target, method=method)
+
+    def fidelity_at(c):
+        U = np.eye(64)
+        for row in c:
+            U = la.expm(-1j * 0.3 * kron_hamiltonian(J, h + row)) @ U
+        return np.abs(target @ U @ psi0)**2
+
+    assert fidelity == pytest.approx(fidelity_at(controls), abs=1e-10)
+    eps = 1e-6
+    for k, i in [(0, 0), (1, 3), (3, 5)]:
+        step = np.zeros_like(controls)
+        step[k, i] = eps
+        numeric = (fidelity_at(controls + step) - fidelity_at(controls - step)) / (2 * eps)
+        assert d_fidelity[k, i] == pytest.approx(numeric, rel=1e-5, abs=1e-8)
+
+
+@pytest.mark.parametrize('L', [6, 13])
+def test_chebyshev_matches_expm_multiply(rng, L):
+    H = ChainHamiltonian(rng.uniform(0.5, 1.5, size=L - 1), rng.normal(0.0, 2.0, size=L))
+    assert (H.dim <= CSR_MAX_DIM) == (L == 6)  # Both the CSR and the matrix-free path
+    psi = rng.normal(size=H.dim) + 1j * rng.normal(size=H.dim)
+    propagator = ChebyshevPropagator(H)
+    for t in (0.4, -0.9):
+        reference = linalg.expm_multiply(-1j * t * H.to_sparse(), psi)
+        np.testing.assert_allclose(propagator.propagate(psi, t), reference, atol=1e-10)
+
+
+def test_chebyshev_follows_set_fields(chain, rng):
+    J, h = chain
+    H = ChainHamiltonian(J, h)
+    propagator = ChebyshevPropagator(H)
+    psi = neel(6).astype(complex)
+    new_h = rng.normal(size=6)
+    H.set_fields(new_h)
+    np.testing.assert_allclose(propagator.propagate(psi, 0.5),
+                               la.expm(-0.5j * kron_hamiltonian(J, new_h)) @ psi, atol=1e-10)
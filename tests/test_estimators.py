@@ -0,0 +1,72 @@
+# tests/test_estimators.py
+import numpy as np
+import pytest
+
+from src.bitstrings import pack_bits, unpack_bits
+from src.estimators import ShotStatistics, bit_counts, packed_imbalance, shift_sites
+from src.sampling import indices_to_packed, readout_flips, sample_packed
+
+
+def unpacked_z(bits):
+    return 1.0 - 2.0 * bits.astype(float)
+
+
+@pytest.mark.parametrize('L', [7, 64, 130])
+def test_packed_imbalance_matches_unpacked(rng, L):
+    bits = rng.integers(0, 2, size=(500, L), dtype=np.uint8)
+    reference = unpacked_z(bits) @ (-1.0) ** np.arange(L) / L
+    np.testing.assert_allclose(packed_imbalance(pack_bits(bits), L), reference)
+
+
+@pytest.mark.parametrize('L', [5, 100, 2100])
+def test_bit_counts(rng, L):
+    bits = rng.integers(0, 2, size=(300, L), dtype=np.uint8)
+    np.testing.assert_array_equal(bit_counts(pack_bits(bits), L, chunk_shots=128), bits.sum(axis=0))
+    counts = rng.integers(1, 5, size=300)
+    np.testing.assert_array_equal(bit_counts(pack_bits(bits), L, chunk_shots=128, counts=counts), counts @ bits)
+
+
+@pytest.mark.parametrize('d', [1, 3, 63, 64, 70])
+def test_shift_sites(rng, d):
+    bits = rng.integers(0, 2, size=(20, 130), dtype=np.uint8)
+    shifted = unpack_bits(shift_sites(pack_bits(bits), d), 130)
+    np.testing.assert_array_equal(shifted[:, :130 - d], bits[:, d:])
+    assert not shifted[:, 130 - d:].any()
+
+
+def test_shot_statistics_match_unpacked(rng):
+    L = 70
+    bits = rng.integers(0, 2, size=(1000, L), dtype=np.uint8)
+    z = unpacked_z(bits)
+    stats = ShotStatistics(L, distances=(1, 2)).update(pack_bits(bits[:400]))
+    stats.merge(ShotStatistics(L, distances=(2, 1, 1)).update(pack_bits(bits[400:])))
+    imbalance = z @ (-1.0) ** np.arange(L) / L
+    assert stats.n == 1000
+    assert stats.imbalance == pytest.approx(imbalance.mean())
+    assert stats.imbalance_error() == pytest.approx(imbalance.std(ddof=1) / np.sqrt(1000))
+    np.testing.assert_allclose(stats.magnetizations, z.mean(axis=0))
+    for d in (1, 2):
+        np.testing.assert_allclose(stats.zz(d), (z[:, :L - d] * z[:, d:]).mean(axis=0))
+
+
+def test_indices_to_packed_puts_site_zero_first():
+    L = 6
+    packed = indices_to_packed(np.array([int('100000', 2), int('000011', 2)]), L)
+    np.testing.assert_array_equal(unpack_bits(packed, L), [[1, 0, 0, 0, 0, 0], [0, 0, 0, 0, 1, 1]])
+
+
+def test_sample_packed_follows_the_distribution(rng):
+    probs = rng.random(16)
+    probs /= probs.sum()
+    packed = sample_packed(probs, 200_000, 4, rng=rng)
+    indices = unpack_bits(packed, 4) @ (1 << np.arange(3, -1, -1))
+    np.testing.assert_allclose(np.bincount(indices, minlength=16) / 200_000, probs, atol=5e-3)
+
+
+def test_readout_flips_rates(rng):
+    L, shots = 80, 50_000
+    p10 = np.linspace(0.0, 0.1, L)
+    zeros = readout_flips(np.zeros((shots, 2), dtype=np.uint64), L, p10, 0.0, rng=rng)
+    np.testing.assert_allclose(unpack_bits(zeros, L).mean(axis=0), p10, atol=6e-3)
+    ones = readout_flips(pack_bits(np.ones((shots, L), dtype=np.uint8)), L, 0.0, 0.05, rng=rng)
+    np.testing.assert_allclose(1.0 - unpack_bits(ones, L).mean(axis=0), 0.05, atol=6e-3)
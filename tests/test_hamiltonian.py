@@ -0,0 +1,81 @@
+# tests/test_hamiltonian.py
+import numpy as np
+import pytest
+import scipy.linalg as la
+
+from conftest import Z, kron_hamiltonian, site_operator
+from src.hamiltonian import (ChainHamiltonian, ScaledChainOperator, imbalance_diagonal, parity_bits,
+                             state_parity, to_parity_sector)
+
+
+def test_matches_kron_reference(chain, rng):
+    J, h = chain
+    H = ChainHamiltonian(J, h)
+    reference = kron_hamiltonian(J, h)
+    np.testing.assert_allclose(H.to_sparse().toarray(), reference, atol=1e-12)
+    block = rng.normal(size=(H.dim, 3))
+    np.testing.assert_allclose(H.apply(block), reference @ block, atol=1e-12)
+
+
+def test_imbalance_diagonal_matches_kron_reference():
+    L = 5
+    reference = sum((-1) ** i * site_operator(L, i, Z) for i in range(L))
+    np.testing.assert_allclose(imbalance_diagonal(L), np.diag(reference))
+
+
+@pytest.mark.parametrize('parity', [0, 1])
+def test_sector_is_the_parity_block(chain, parity):
+    J, h = chain
+    H = ChainHamiltonian(J, h)
+    sector = H.sector(parity)
+    block = np.flatnonzero(parity_bits(H.L) == parity)
+    np.testing.assert_array_equal(np.sort(sector.basis()), block)
+    full = H.to_sparse().toarray()
+    np.testing.assert_allclose(sector.to_sparse().toarray(), full[np.ix_(sector.basis(), sector.basis())])
+
+
+def test_sector_evolution_embeds_into_full_evolution(chain):
+    J, h = chain
+    H = ChainHamiltonian(J, h)
+    psi = np.zeros(H.dim)
+    psi[int('010101', 2)] = 1.0
+    assert state_parity(psi) == 1
+    H_sector, psi_sector = to_parity_sector(H, psi)
+    assert H_sector.dim == H.dim // 2
+    evolved = la.expm(-1j * 0.7 * H_sector.to_sparse().toarray()) @ psi_sector
+    reference = la.expm(-1j * 0.7 * kron_hamiltonian(J, h)) @ psi
+    np.testing.assert_allclose(H_sector.embed(evolved), reference, atol=1e-10)
+
+
+def test_mixed_parity_state_stays_in_full_space(chain):
+    H = ChainHamiltonian(*chain)
+    psi = np.zeros(H.dim)
+    psi[[0, 1]] = 1.0
+    assert state_parity(psi) is None
+    assert to_parity_sector(H, psi)[0] is H
+
+
+def test_set_fields_updates_diagonal_in_place(chain, rng):
+    J, h = chain
+    H = ChainHamiltonian(J, h).sector(0)
+    diag = H.diag
+    new_h = rng.normal(size=len(h))
+    H.set_fields(new_h)
+    assert H.diag is diag
+    np.testing.assert_allclose(H.to_sparse().toarray(), ChainHamiltonian(J, new_h).sector(0).to_sparse().toarray())
+
+
+def test_scalar_multiples_fold_into_the_operator(chain, rng):
+    H = ChainHamiltonian(*chain)
+    scaled = -1j * 0.3 * H
+    assert isinstance(scaled, ScaledChainOperator)
+    dense = H.to_sparse().toarray()
+    v = rng.normal(size=H.dim) + 1j * rng.normal(size=H.dim)
+    np.testing.assert_allclose(scaled @ v, -0.3j * dense @ v, atol=1e-12)
+    np.testing.assert_allclose(scaled.H @ v, 0.3j * dense @ v, atol=1e-12)
+    assert H.h is not None
+
+
+def test_rejects_wrong_number_of_couplings():
+    with pytest.raises(ValueError):
+        ChainHamiltonian(np.ones(3), np.ones(3))
@@ -0,0 +1,69 @@
+# tests/test_mapping.py
+import pytest
+
+from src import mapping
+from src.mapping import find_snake_path, get_sycamore_graph, remove_defects, repair_snake_path
+
+
+def assert_valid_chain(G, path, length):
+    assert len(path) == length
+    assert len(set(path)) == length
+    assert all(G.has_edge(a, b) for a, b in zip(path, path[1:]))
+
+
+@pytest.fixture
+def device():
+    mapping.clear_cache()
+    return get_sycamore_graph()
+
+
+def test_snake_path_is_a_simple_chain(device):
+    assert_valid_chain(device, find_snake_path(device, length=40), 40)
+
+
+@pytest.mark.parametrize('dead', [0, 12, 29])
+def test_repair_around_dead_qubit(device, dead):
+    path = find_snake_path(device, length=30)
+    new_path, changed = repair_snake_path(device, path, dead_qubits=[path[dead]])
+    assert_valid_chain(remove_defects(device, dead_qubits=[path[dead]]), new_path, 30)
+    assert path[dead] not in new_path
+    assert dead in changed
+    assert changed == [i for i in range(30) if new_path[i] != path[i]]
+
+
+def test_repair_around_dead_coupler(device):
+    path = find_snake_path(device, length=30)
+    coupler = (path[14], path[15])
+    new_path, changed = repair_snake_path(device, path, dead_couplers=[coupler])
+    assert_valid_chain(remove_defects(device, dead_couplers=[coupler]), new_path, 30)
+    # Local surgery: the ends of the chain keep their qubits
+    assert new_path[0] == path[0] and new_path[-1] == path[-1]
+
+
+def test_path_cache_is_bounded(device, monkeypatch):
+    monkeypatch.setattr(mapping, 'PATH_CACHE_SIZE', 2)
+    path = find_snake_path(device, length=30)
+    repair_snake_path(device, path, dead_qubits=[path[10]])
+    assert len(mapping._PATH_CACHE) == 1  # Repair subgraph searches are not cached
+    for length in (5, 6, 7):
+        find_snake_path(device, length=length)
+    assert [key[1] for key in mapping._PATH_CACHE] == [6, 7]
+    mapping.clear_cache()
+    assert not mapping._PATH_CACHE
+
+
+@pytest.mark.parametrize('dead', [[0, 1], [28, 29]])
+def test_repair_around_dead_chain_end(device, dead):
+    path = find_snake_path(device, length=30)
+    dead_qubits = [path[i] for i in dead]
+    new_path, _ = repair_snake_path(device, path, dead_qubits=dead_qubits)
+    assert_valid_chain(remove_defects(device, dead_qubits=dead_qubits), new_path, 30)
+    assert not set(dead_qubits) & set(new_path)
+
+
+def test_repair_around_dead_qubit_and_coupler(device):
+    path = find_snake_path(device, length=30)
+    coupler = (path[0], path[1])
+    new_path, _ = repair_snake_path(device, path, dead_qubits=[path[3], path[28]], dead_couplers=[coupler])
+    assert_valid_chain(remove_defects(device, dead_qubits=[path[3], path[28]], dead_couplers=[coupler]),
+                       new_path, 30)
@@ -0,0 +1,41 @@
+# tests/test_mps.py
+import numpy as np
+import pytest
+import scipy.linalg as la
+
+from conftest import Z, kron_hamiltonian, site_operator
+from src.mps import ChainMPS, TEBDEngine
+
+
+@pytest.mark.parametrize('conserve_parity', [True, False])
+def test_tebd_matches_exact_evolution(chain, conserve_parity):
+    J, h = chain
+    L, dt, steps = len(h), 0.01, 100
+    psi = ChainMPS.neel(L, conserve_parity=conserve_parity)
+    TEBDEngine(J, h, dt).run(psi, steps)
+
+    exact = np.zeros(2**L)
+    exact[int('01' * (L // 2), 2)] = 1.0
+    exact = la.expm(-1j * dt * steps * kron_hamiltonian(J, h)) @ exact
+    reference = [np.real(np.vdot(exact, site_operator(L, i, Z) @ exact)) for i in range(L)]
+    # Second-order Trotter error, O(dt^2) per unit time
+    np.testing.assert_allclose(psi.z_expectations(), reference, atol=1e-3)
+
+
+def test_truncation_is_accounted(chain):
+    J, h = chain
+    psi = ChainMPS.neel(len(h))
+    engine = TEBDEngine(J, 0.1 * h, 0.1, chi_max=2)
+    engine.run(psi, 30)
+    assert max(psi.bond_dims()) <= 2
+    assert engine.truncation_error > 0.0
+
+
+def test_checkpoint_round_trip(tmp_path, chain):
+    J, h = chain
+    psi = TEBDEngine(J, h, 0.05).run(ChainMPS.neel(len(h)), 10)
+    path = str(tmp_path / 'state.npz')
+    psi.save(path, step=10)
+    loaded, meta = ChainMPS.load(path)
+    assert meta['step'] == 10
+    np.testing.assert_allclose(loaded.z_expectations(), psi.z_expectations())
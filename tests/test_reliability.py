@@ -0,0 +1,36 @@
+# tests/test_reliability.py
+import numpy as np
+import scipy.linalg as la
+
+from conftest import kron_hamiltonian
+from src.reliability import DT, TRACE_NOISE, QuantumReliabilityEngine
+
+H_NOMINAL = 6.0 * np.cos(2 * np.pi * 1.618 * np.arange(6))
+
+
+def test_changed_couplers_finds_the_moved_coupler(rng):
+    engine = QuantumReliabilityEngine(L=6)
+    J = np.ones(5)
+    J[1] = 0.97
+    trace = engine.get_evolution(J, H_NOMINAL) + rng.normal(0.0, TRACE_NOISE, size=100)
+    changed = engine.changed_couplers(trace, np.ones(5), H_NOMINAL, seed=0)
+    # A moved coupler also tilts the gradient of its neighbours, never of distant ones
+    assert 1 in changed
+    assert set(changed) <= {0, 1, 2}
+
+
+def test_changed_couplers_without_change_reports_one(rng):
+    engine = QuantumReliabilityEngine(L=6)
+    trace = engine.get_evolution(np.ones(5), H_NOMINAL) + rng.normal(0.0, TRACE_NOISE, size=100)
+    assert len(engine.changed_couplers(trace, np.ones(5), H_NOMINAL, seed=0)) == 1
+
+
+def test_control_mode_matches_kron_reference(rng):
+    engine = QuantumReliabilityEngine(L=6)
+    J = rng.uniform(0.5, 1.5, size=5)
+    pulse = rng.normal(0.0, 1.0, size=(5, 6))
+    psi = np.zeros(64)
+    psi[engine.init_idx] = 1.0
+    for controls in pulse:
+        psi = la.expm(-1j * DT * kron_hamiltonian(J, H_NOMINAL + controls)) @ psi
+    np.testing.assert_allclose(engine.get_evolution(J, H_NOMINAL, control_pulse=pulse), psi, atol=1e-10)
@@ -0,0 +1,93 @@
+# tests/test_rem.py
+import os
+
+import cirq
+import numpy as np
+import pytest
+
+from src.bitstrings import pack_bits, unpack_bits
+from src.main import run_native
+from src.noise_models import ReadoutNoiseSampler
+from src.rem import CalibrationCache, ReadoutErrorMitigator, estimate_confusion_matrices
+from src.sampling import readout_flips
+
+A = np.array([[0.97, 0.06], [0.03, 0.94]])
+
+
+def noisy_shots(bits, rng, confusion=A):
+    packed = pack_bits(bits)
+    return readout_flips(packed, bits.shape[1], confusion[1, 0], confusion[0, 1], rng=rng)
+
+
+def test_estimate_confusion_matrices(rng):
+    prepared = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.uint8)
+    flips = np.stack([rng.random((20_000, 3)) < A[1, 0], rng.random((20_000, 3)) < A[0, 1]])
+    measured = prepared[:, None, :] ^ flips
+    estimate = estimate_confusion_matrices(prepared, measured)
+    assert estimate.shape == (3, 2, 2)
+    np.testing.assert_allclose(estimate, np.broadcast_to(A, (3, 2, 2)), atol=5e-3)
+
+
+def test_mitigated_imbalance_removes_readout_bias(rng):
+    L, shots = 8, 100_000
+    bits = np.tile(np.arange(L) % 2, (shots, 1)).astype(np.uint8)  # Néel state, imbalance 1
+    packed = noisy_shots(bits, rng)
+    rem = ReadoutErrorMitigator(L, confusion_matrix=A)
+    raw = np.mean((1.0 - 2.0 * bits.astype(float)) @ (-1.0) ** np.arange(L)) / L
+    assert raw == pytest.approx(1.0)
+    assert rem.mitigated_imbalance(packed) == pytest.approx(1.0, abs=5e-3)
+
+
+def test_mitigate_distribution_recovers_product_state(rng):
+    L = 5
+    bits = np.tile([1, 0, 1, 1, 0], (50_000, 1)).astype(np.uint8)
+    rows, probs = ReadoutErrorMitigator(L, confusion_matrix=A).mitigate_distribution(noisy_shots(bits, rng))
+    assert probs.sum() == pytest.approx(1.0)
+    assert (probs >= 0).all()
+    np.testing.assert_array_equal(rows[np.argmax(probs)], pack_bits(bits[:1])[0])
+    assert probs.max() > 0.98
+
+
+def test_calibration_requires_a_sampler():
+    with pytest.raises(ValueError):
+        ReadoutErrorMitigator(3).calibrate_on_hardware('device')
+
+
+def test_calibration_is_cached_only_with_a_cache_dir(tmp_path):
+    qubits = cirq.LineQubit.range(3)
+    truth = {q: a for q, a in zip(qubits, [A, np.array([[0.9, 0.02], [0.1, 0.98]]), np.eye(2)])}
+    rem = ReadoutErrorMitigator(3)
+    estimate = rem.calibrate_on_hardware('sim', qubits=qubits, sampler=ReadoutNoiseSampler(truth, seed=1),
+                                         repetitions=4000)
+    np.testing.assert_allclose(estimate, [truth[q] for q in qubits], atol=0.02)
+
+    cache_dir = str(tmp_path / 'cache')
+    rem.calibrate_on_hardware('sim', qubits=qubits, sampler=ReadoutNoiseSampler(truth, seed=2),
+                              repetitions=500, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    np.testing.assert_allclose(CalibrationCache(cache_dir).load('sim', qubits[::-1]), rem.A[::-1])
+
+
+def test_native_run_mitigates_the_device_readout():
+    config = {'system': {'L': 6, 'J': 1.0, 'Delta': 2.5, 'W': 2.5, 'beta': 0.618033988},
+              'simulation': {'dt': 0.05, 'steps': 4, 'shots': 200_000}}
+    qubits = cirq.LineQubit.range(6)
+    phases = np.array([0.3])
+    exact = run_native(qubits, config, phases, seed=0)[0]
+    biased = run_native(qubits, config, phases, seed=0, device_readout=A)[0]
+    # The mitigator only knows its estimate of the device; the shots carry the device's own error
+    estimate = np.array([[0.965, 0.065], [0.035, 0.935]])
+    mitigated = run_native(qubits, config, phases, seed=0, device_readout=A,
+                           readout=ReadoutErrorMitigator(6, confusion_matrix=estimate))[0]
+    assert abs(biased - exact) > 0.02
+    assert mitigated == pytest.approx(exact, abs=0.015)
+
+
+def test_mitigated_z_weights_distinct_rows_by_count(rng):
+    packed = noisy_shots(rng.integers(0, 2, size=(5000, 6), dtype=np.uint8), rng)
+    rows, counts = np.unique(packed, axis=0, return_counts=True)
+    rem = ReadoutErrorMitigator(6, confusion_matrix=A)
+    p1 = unpack_bits(packed, 6).mean(axis=0)
+    reference = (1.0 - p1) * rem._z_weights[:, 0] + p1 * rem._z_weights[:, 1]
+    np.testing.assert_allclose(rem.mitigated_z(packed), reference)
+    np.testing.assert_allclose(rem.mitigated_z(rows, counts), reference)
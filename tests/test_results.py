@@ -0,0 +1,52 @@
+# tests/test_results.py
+import cirq
+import numpy as np
+import pytest
+
+from src.main import disorder_phases, run_native, verify_imbalance
+from src.results import ResultReader, ResultStore
+
+METADATA = {'config': {'system': {'L': 4}}, 'phases': np.array([0.0, 0.5])}
+
+
+def test_append_resumes_the_same_run(tmp_path, rng):
+    bits = rng.integers(0, 2, size=(10, 4), dtype=np.uint8)
+    store = ResultStore(str(tmp_path), num_qubits=4, metadata=METADATA)
+    store.append_shots(0, bits)
+    store.close()
+    store = ResultStore(str(tmp_path), num_qubits=4, metadata=METADATA, mode='a')
+    store.append_shots(1, bits)
+    store.close()
+    assert len(list(ResultReader(str(tmp_path)).shot_chunks())) == 2
+
+
+@pytest.mark.parametrize('change', [{'num_qubits': 5}, {'packing': 'uint8'},
+                                    {'metadata': {**METADATA, 'config': {'system': {'L': 5}}}}])
+def test_append_refuses_a_different_run(tmp_path, change):
+    ResultStore(str(tmp_path), num_qubits=4, metadata=METADATA).close()
+    arguments = {'num_qubits': 4, 'metadata': METADATA, **change}
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path), mode='a', **arguments)
+
+
+def test_resume_runs_only_the_missing_realizations(tmp_path):
+    config = {'system': {'L': 4, 'J': 1.0, 'Delta': 2.5, 'W': 2.5, 'beta': 0.618033988},
+              'simulation': {'dt': 0.05, 'steps': 3, 'shots': 100, 'realizations': 3}}
+    qubits = cirq.LineQubit.range(4)
+    phases = disorder_phases(3)
+    store = ResultStore(str(tmp_path), num_qubits=4, metadata=METADATA, chunk_shots=40)
+    run_native(qubits, config, phases, store=store, realizations=[0, 1])
+    store.close()
+    # Interrupted midway through realization 1: only its first chunk made it into the index
+    with open(tmp_path / 'index.jsonl') as f:
+        lines = f.readlines()
+    with open(tmp_path / 'index.jsonl', 'w') as f:
+        f.writelines(lines[:5])
+
+    store = ResultStore(str(tmp_path), num_qubits=4, metadata=METADATA, chunk_shots=40, mode='a')
+    assert store.completed == {0}
+    verify_imbalance(config, qubits, store=store)
+    store.close()
+    reader = ResultReader(str(tmp_path))
+    assert reader.realizations() == [0, 1, 2]
+    assert [len(reader.shots(r)) for r in range(3)] == [100, 100, 100]
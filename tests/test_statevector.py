@@ -0,0 +1,43 @@
+# tests/test_statevector.py
+import cirq
+import numpy as np
+import pytest
+
+from src.compiler import get_trotter_step_template
+from src.main import neel_preparation, on_site_potentials, realization_circuits
+from src.statevector import TrotterSimulator, _partition
+
+CONFIG = {'system': {'L': 8, 'J': 1.0, 'Delta': 2.5, 'W': 2.5, 'beta': 0.618033988},
+          'simulation': {'dt': 0.05, 'steps': 6}}
+
+
+@pytest.mark.parametrize('block_sites', [2, 4])
+def test_native_trotter_matches_cirq(block_sites):
+    qubits = cirq.LineQubit.range(8)
+    phi = 0.3
+    _, circuit = next(realization_circuits(qubits, CONFIG, [phi]))
+    circuit = cirq.Circuit(op for op in circuit.all_operations() if not cirq.is_measurement(op))
+    reference = cirq.Simulator().simulate(circuit, qubit_order=qubits).final_state_vector
+
+    values = get_trotter_step_template(qubits).param_values(1.0, 2.5, on_site_potentials(CONFIG, phi), 0.05)
+    with TrotterSimulator(8, block_sites=block_sites) as sim:
+        psi = sim.evolve(sim.neel_state(), values, 6)
+    np.testing.assert_allclose(psi, reference, atol=1e-6)
+
+
+def test_neel_state_matches_cirq_preparation():
+    qubits = cirq.LineQubit.range(6)
+    reference = cirq.Simulator().simulate(cirq.Circuit(neel_preparation(qubits)), qubit_order=qubits)
+    with TrotterSimulator(6) as sim:
+        np.testing.assert_allclose(sim.neel_state(), reference.final_state_vector)
+
+
+def test_partition_never_cuts_a_gate():
+    blocks = _partition(9, 4, [j for j in range(9) if j % 2 == 0])
+    assert blocks[0][0] == 0 and sum(size for _, size in blocks) == 9
+    assert all(start % 2 == 0 and size <= 4 for start, size in blocks)
+
+
+def test_partition_rejects_too_small_blocks():
+    with pytest.raises(ValueError):
+        TrotterSimulator(6, block_sites=1)
@@ -0,0 +1,23 @@
+# tests/test_trajectories.py
+import cirq
+import numpy as np
+
+from src.trajectories import TrajectoryRunner
+
+NOISE = cirq.ConstantQubitNoiseModel(cirq.amplitude_damp(0.2))
+
+
+def neel_circuit(qubits):
+    circuit = cirq.Circuit(cirq.X(q) for q in qubits[1::2])
+    circuit.append(cirq.ISWAP(a, b) ** 0.3 for a, b in zip(qubits, qubits[1:]))
+    return circuit
+
+
+def test_pool_matches_in_process_run():
+    qubits = cirq.LineQubit.range(4)
+    circuit = neel_circuit(qubits)
+    kwargs = dict(batch_size=4, max_trajectories=64, min_trajectories=8, target_error=0.05)
+    serial = list(TrajectoryRunner(**kwargs).stream(circuit, qubits, noise_model=NOISE, seed=3))
+    pooled = list(TrajectoryRunner(workers=3, **kwargs).stream(circuit, qubits, noise_model=NOISE, seed=3))
+    assert len(serial) < 16  # Stopped on target_error, not on max_trajectories
+    np.testing.assert_allclose(pooled, serial)
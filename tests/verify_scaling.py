@@ -1,77 +1,77 @@
-# tests/verify_scaling.py
-import numpy as np
-import scipy.linalg as la
-from scipy.optimize import curve_fit
-import matplotlib.pyplot as plt
-
-def calculate_bond_dimension_proxy(L, steps=20):
-    """
-    Simulates the growth of entanglement entropy S for a 1D chain
-    and returns the required Bond Dimension (Chi) = exp(S).
-    Uses a simplified random unitary model to proxy Volume Law growth.
-    """
-    # In the Volume Law regime, Entropy S ~ alpha * cut_size
-    # We simulate this by looking at the singular values of random matrices
-    # growing with system size L/2 (half-cut).
-    
-    # Effective Hilbert space size of the half-chain
-    dim_half = 2**(L // 2)
-    
-    # We cap the simulation at L=14 because L=16 (dim=256*256) is heavy for a quick test
-    if L > 14:
-        # For L > 14, we project the exponential growth observed in small L
-        return None 
-
-    # Generate random state (Haar random proxy for thermalized state)
-    psi = np.random.randn(dim_half, dim_half) + 1j * np.random.randn(dim_half, dim_half)
-    psi /= np.linalg.norm(psi)
-    
-    # Schmidt Decomposition (SVD)
-    # The number of significant singular values determines the Bond Dimension
-    U, s, Vh = la.svd(psi, compute_uv=True)
-    
-    # Calculate Von Neumann Entropy
-    prob = s**2
-    prob = prob[prob > 1e-10] # Filter numerical noise
-    S = -np.sum(prob * np.log(prob))
-    
-    # Required Bond Dimension Chi ~ exp(S)
-    chi = np.exp(S)
-    return chi
-
-def verify_supremacy_gap():
-    print("[*] Verifying Volume Law Scaling (The Supremacy Gap)...")
-    print("    -> Running SVD Entanglement Proxy for small L...")
-    
-    L_test = [4, 6, 8, 10, 12, 14]
-    chi_results = []
-    
-    for L in L_test:
-        chi = calculate_bond_dimension_proxy(L)
-        print(f"       L={L}: Chi ~ {chi:.2f}")
-        chi_results.append(chi)
-    
-    # Fit Exponential Growth: Chi = a * exp(b * L)
-    def exponential_growth(x, a, b):
-        return a * np.exp(b * x)
-    
-    popt, _ = curve_fit(exponential_growth, L_test, chi_results)
-    
-    print("-" * 40)
-    print(f"    -> Verified Growth Rate: Chi ~ {popt[0]:.2f} * exp({popt[1]:.2f} * L)")
-    
-    # Extrapolate to Supremacy Regime
-    L_target = 100
-    chi_target = exponential_growth(L_target, *popt)
-    
-    print(f"    -> Extrapolated Bond Dimension for L={L_target}: {chi_target:.2e}")
-    print("-" * 40)
-    
-    if chi_target > 1e12:
-        print("[SUCCESS] Supremacy Gap Confirmed: Classical Simulation Intractable.")
-        print("          Google Quantum AI verification requires hardware execution.")
-    else:
-        print("[FAIL] Gap insufficient. Check Delta parameter.")
-
-if __name__ == "__main__":
-    verify_supremacy_gap()
+# tests/verify_scaling.py
+import numpy as np
+import scipy.linalg as la
+from scipy.optimize import curve_fit
+import matplotlib.pyplot as plt
+
+def calculate_bond_dimension_proxy(L, steps=20):
+    """
+    Simulates the growth of entanglement entropy S for a 1D chain
+    and returns the required Bond Dimension (Chi) = exp(S).
+    Uses a simplified random unitary model to proxy Volume Law growth.
+    """
+    # In the Volume Law regime, Entropy S ~ alpha * cut_size
+    # We simulate this by looking at the singular values of random matrices
+    # growing with system size L/2 (half-cut).
+    
+    # Effective Hilbert space size of the half-chain
+    dim_half = 2**(L // 2)
+    
+    # We cap the simulation at L=14 because L=16 (dim=256*256) is heavy for a quick test
+    if L > 14:
+        # For L > 14, we project the exponential growth observed in small L
+        return None 
+
+    # Generate random state (Haar random proxy for thermalized state)
+    psi = np.random.randn(dim_half, dim_half) + 1j * np.random.randn(dim_half, dim_half)
+    psi /= np.linalg.norm(psi)
+    
+    # Schmidt Decomposition (SVD)
+    # The number of significant singular values determines the Bond Dimension
+    U, s, Vh = la.svd(psi, compute_uv=True)
+    
+    # Calculate Von Neumann Entropy
+    prob = s**2
+    prob = prob[prob > 1e-10] # Filter numerical noise
+    S = -np.sum(prob * np.log(prob))
+    
+    # Required Bond Dimension Chi ~ exp(S)
+    chi = np.exp(S)
+    return chi
+
+def verify_supremacy_gap():
+    print("[*] Verifying Volume Law Scaling (The Supremacy Gap)...")
+    print("    -> Running SVD Entanglement Proxy for small L...")
+    
+    L_test = [4, 6, 8, 10, 12, 14]
+    chi_results = []
+    
+    for L in L_test:
+        chi = calculate_bond_dimension_proxy(L)
+        print(f"       L={L}: Chi ~ {chi:.2f}")
+        chi_results.append(chi)
+    
+    # Fit Exponential Growth: Chi = a * exp(b * L)
+    def exponential_growth(x, a, b):
+        return a * np.exp(b * x)
+    
+    popt, _ = curve_fit(exponential_growth, L_test, chi_results)
+    
+    print("-" * 40)
+    print(f"    -> Verified Growth Rate: Chi ~ {popt[0]:.2f} * exp({popt[1]:.2f} * L)")
+    
+    # Extrapolate to Supremacy Regime
+    L_target = 100
+    chi_target = exponential_growth(L_target, *popt)
+    
+    print(f"    -> Extrapolated Bond Dimension for L={L_target}: {chi_target:.2e}")
+    print("-" * 40)
+    
+    if chi_target > 1e12:
+        print("[SUCCESS] Supremacy Gap Confirmed: Classical Simulation Intractable.")
+        print("          Google Quantum AI verification requires hardware execution.")
+    else:
+        print("[FAIL] Gap insufficient. Check Delta parameter.")
+
+if __name__ == "__main__":
+    verify_supremacy_gap()